@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CustomUser, FriendRequest, Friendship
+from .models import CustomUser, FriendEdge, FriendRequest, FriendSuggestion, Friendship
 
 
 @admin.register(CustomUser)
@@ -23,3 +23,18 @@ class FriendshipAdmin(admin.ModelAdmin):
     list_filter = ('created_at',)
     search_fields = ('user1__username', 'user2__username')
     readonly_fields = ('created_at',)
+
+
+@admin.register(FriendEdge)
+class FriendEdgeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'friend', 'created_at')
+    search_fields = ('user__username', 'friend__username')
+    raw_id_fields = ('user', 'friend')
+    readonly_fields = ('created_at',)
+
+
+@admin.register(FriendSuggestion)
+class FriendSuggestionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'candidate', 'score', 'mutual_friends', 'shared_clan', 'shared_landmarks', 'updated_at')
+    search_fields = ('user__username', 'candidate__username')
+    raw_id_fields = ('user', 'candidate')
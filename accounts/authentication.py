@@ -0,0 +1,173 @@
+"""
+JWT-аутентификация без обращения к БД на горячих путях.
+
+- Проверенные токены кэшируются в LRU внутри процесса (ключ - sha256 токена),
+  запись живет не дольше exp токена, поэтому подпись не проверяется повторно.
+- Пользователь собирается из claims токена и снимка состояния из общего кэша
+  (auth_version, is_active, coins, experience). Остальные поля отложены
+  (deferred) и загружаются из БД только при первом обращении к ним.
+- credential_version повышается при смене пароля - токены со старой
+  версией отклоняются.
+- auth_version повышается при смене клана или уровня - токен со старой
+  версией принимается, но клан, уровень и имя берутся из снимка, а ответ
+  получает заголовок X-Token-Stale: клиенту нужно обновить токен через refresh
+  (accounts.middleware.StaleTokenMiddleware).
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import AUTH_VERSION_CLAIM, CREDENTIAL_VERSION_CLAIM
+
+User = get_user_model()
+
+# Поля пользователя, которые берутся из claims токена (claim -> поле)
+CLAIM_FIELDS = {'username': 'username', 'clan_id': 'clan_id', 'level': 'level'}
+# Поля снимка состояния пользователя в общем кэше; значения claims - для токенов
+# с устаревшей версией auth_version
+AUTH_STATE_FIELDS = ('auth_version', 'credential_version', 'is_active', 'coins', 'experience', *CLAIM_FIELDS.values())
+
+
+def auth_state_key(user_id):
+    return f'accounts:auth_state:{user_id}'
+
+
+def get_auth_state(user_id):
+    """
+    Возвращает снимок состояния пользователя из кэша.
+    При промахе загружает его из БД одним запросом. None - пользователь не найден.
+    """
+    key = auth_state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        state = User.objects.filter(pk=user_id).values(*AUTH_STATE_FIELDS).first()
+        if state is None:
+            return None
+        cache.set(key, state, getattr(settings, 'ACCOUNTS_AUTH_STATE_TTL', 300))
+    return state
+
+
+def invalidate_auth_state(user_id):
+    """
+    Сбрасывает снимок состояния пользователя.
+    Сброс повторяется после коммита, чтобы параллельный запрос не закэшировал
+    незакоммиченное (старое) состояние.
+    """
+    key = auth_state_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class VerifiedTokenCache:
+    """Потокобезопасный LRU проверенных токенов с учетом exp."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, token = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return token
+
+    def set(self, key, token, expires_at):
+        with self._lock:
+            self._entries[key] = (expires_at, token)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache(
+    getattr(settings, 'ACCOUNTS_VERIFIED_TOKEN_CACHE_SIZE', 10000)
+)
+
+
+def build_lazy_user(validated_token, state):
+    """
+    Собирает экземпляр CustomUser из claims токена и снимка состояния.
+    Если claims устарели (другая auth_version), их поля берутся из снимка.
+    Поля, которых нет ни в claims, ни в снимке, остаются отложенными.
+    """
+    values = {
+        'id': User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM]),
+        'is_active': state['is_active'],
+        'coins': state['coins'],
+        'experience': state['experience'],
+    }
+    # Токены без версии (выданные до ее появления) считаются версией 0
+    stale = validated_token.get(AUTH_VERSION_CLAIM, 0) != state['auth_version']
+    for claim, attname in CLAIM_FIELDS.items():
+        if stale:
+            values[attname] = state[attname]
+        elif claim in validated_token:
+            values[attname] = validated_token[claim]
+
+    field_names = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+    user = User.from_db(DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
+    # Значения из claims и снимка могут быть устаревшими - CustomUser.save() требует update_fields
+    user._from_token = True
+    user._stale_claims = stale
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Замена JWTAuthentication: не проверяет подпись повторно для уже
+    проверенного токена и не загружает пользователя из БД.
+    """
+
+    def get_validated_token(self, raw_token):
+        key = hashlib.sha256(raw_token).digest()
+        token = verified_tokens.get(key)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            verified_tokens.set(key, token, token['exp'])
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        state = get_auth_state(user_id)
+        if state is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not state['is_active']:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+        # Токены без версии (выданные до ее появления) считаются версией 0
+        if validated_token.get(CREDENTIAL_VERSION_CLAIM, 0) != state['credential_version']:
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+
+        return build_lazy_user(validated_token, state)
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None and result[0]._stale_claims:
+            # Отметка для StaleTokenMiddleware: ответ получит заголовок X-Token-Stale
+            request._request.stale_token = True
+        return result
@@ -0,0 +1,330 @@
+"""
+Граф друзей.
+
+Дружба хранится в Friendship (одна запись на пару, user1_id < user2_id) и двумя
+ребрами FriendEdge (по одному в каждую сторону). Множество ID друзей пользователя
+кэшируется в общем кэше компактным массивом (array('q')) под версией пользователя;
+версия повышается при принятии запроса и удалении друга (как в profile_cache).
+
+Отправка, принятие и отклонение запроса - по одной изменяющей операции:
+INSERT, который отклоняет ограничение уникальности на необработанный запрос
+для пары, и UPDATE с условием status='pending'. Повторные и параллельные
+нажатия не создают дубликатов и не принимают запрос дважды.
+
+Счетчики необработанных запросов пользователя (pending_friend_requests_count,
+sent_friend_requests_count) меняются в той же транзакции одним UPDATE.
+"""
+import time
+from array import array
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Q, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from myproject.streaming import iterate_values
+from sync.changes import record_deletions
+
+from .models import FriendEdge, FriendRequest, Friendship
+
+User = get_user_model()
+
+# Поля, которые нужны UserBasicSerializer
+FRIEND_FIELDS = ('id', 'username', 'first_name', 'last_name', 'level', 'gender')
+
+MAX_BULK_FRIEND_REQUESTS = 100  # Максимум запросов дружбы в одном массовом принятии/отклонении
+
+
+def friend_ids_version_key(user_id):
+    return f'accounts:friend_ids_version:{user_id}'
+
+
+def friend_ids_key(user_id, version):
+    return f'accounts:friend_ids:{user_id}:{version}'
+
+
+def _get_friend_ids_version(user_id):
+    key = friend_ids_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Версия от времени исключает совпадение со старыми записями после вытеснения ключа
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_friend_ids_versions(user_ids):
+    for user_id in user_ids:
+        key = friend_ids_version_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def get_friend_ids(user_id):
+    """
+    Множество ID друзей пользователя. При промахе кэша - один запрос по ребрам.
+    Множество записывается под версией, прочитанной до запроса: если дружба
+    изменилась за это время, версия уже повышена и устаревшая запись не читается.
+    """
+    key = friend_ids_key(user_id, _get_friend_ids_version(user_id))
+    packed = cache.get(key)
+    if packed is None:
+        ids = array('q', sorted(FriendEdge.objects.filter(user_id=user_id).values_list('friend_id', flat=True)))
+        cache.add(key, ids.tobytes(), getattr(settings, 'ACCOUNTS_FRIEND_IDS_TTL', 3600))
+        return frozenset(ids)
+    return frozenset(array('q', packed))
+
+
+def invalidate_friend_ids(*user_ids):
+    """Повышает версии множеств друзей сразу и после коммита (как invalidate_player_profile)."""
+    _bump_friend_ids_versions(user_ids)
+    transaction.on_commit(lambda: _bump_friend_ids_versions(user_ids))
+
+
+def are_friends(user_id, other_id):
+    return other_id in get_friend_ids(user_id)
+
+
+def get_friends(user_id):
+    """
+    Друзья пользователя (новые дружбы первыми) двумя запросами:
+    ID друзей по ребрам и пользователи одним IN-запросом.
+    """
+    friend_ids = list(
+        FriendEdge.objects.filter(user_id=user_id).order_by('-created_at', '-id').values_list('friend_id', flat=True)
+    )
+    if not friend_ids:
+        return []
+    users = User.objects.only(*FRIEND_FIELDS).in_bulk(friend_ids)
+    return [users[friend_id] for friend_id in friend_ids if friend_id in users]
+
+
+def iterate_friends(user_id):
+    """
+    Друзья пользователя в формате UserBasicSerializer (в порядке get_friends)
+    одним JOIN-запросом, читаемым курсором, - для потоковых ответов.
+    """
+    edges = FriendEdge.objects.filter(user_id=user_id).order_by('-created_at', '-id')
+    for row in iterate_values(edges, *(f'friend__{field}' for field in FRIEND_FIELDS)):
+        yield dict(zip(FRIEND_FIELDS, row))
+
+
+def canonical_pair(user_id, other_id):
+    """Пара ID в каноническом порядке (min_id, max_id)."""
+    return (user_id, other_id) if user_id < other_id else (other_id, user_id)
+
+
+def adjust_request_counters(pending_deltas, sent_deltas):
+    """
+    Изменяет счетчики запросов дружбы нескольких пользователей одним UPDATE.
+
+    Args:
+        pending_deltas (dict): {user_id: изменение входящих}
+        sent_deltas (dict): {user_id: изменение отправленных}
+    """
+    fields = {}
+    counters = (('pending_friend_requests_count', pending_deltas), ('sent_friend_requests_count', sent_deltas))
+    for field, deltas in counters:
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if deltas:
+            fields[field] = Case(
+                # Счетчик не уходит ниже нуля, даже если разошелся с таблицей запросов
+                *(When(id=user_id, then=Greatest(F(field) + delta, 0)) for user_id, delta in deltas.items()),
+                default=F(field),
+                output_field=User._meta.get_field(field),
+            )
+    user_ids = set(pending_deltas) | set(sent_deltas)
+    if fields and user_ids:
+        User.objects.filter(id__in=user_ids).update(**fields)
+
+
+def _counter_deltas(pairs, sign):
+    """Изменения счетчиков для пар (from_user_id, to_user_id)."""
+    pending_deltas = {}
+    sent_deltas = {}
+    for from_user_id, to_user_id in pairs:
+        pending_deltas[to_user_id] = pending_deltas.get(to_user_id, 0) + sign
+        sent_deltas[from_user_id] = sent_deltas.get(from_user_id, 0) + sign
+    return pending_deltas, sent_deltas
+
+
+def send_friend_request(from_user_id, to_user_id):
+    """
+    Создает необработанный запрос дружбы одним INSERT.
+
+    Returns:
+        FriendRequest | None: Новый запрос или None, если для пары уже есть необработанный запрос
+    """
+    try:
+        with transaction.atomic():
+            friend_request = FriendRequest.objects.create(
+                from_user_id=from_user_id, to_user_id=to_user_id, status='pending'
+            )
+            adjust_request_counters(*_counter_deltas([(from_user_id, to_user_id)], 1))
+            return friend_request
+    except IntegrityError:
+        return None
+
+
+def get_pending_request_between(user_id, other_id):
+    """Необработанный запрос дружбы между пользователями (в любую сторону) или None."""
+    return FriendRequest.objects.filter(
+        Q(from_user_id=user_id, to_user_id=other_id) | Q(from_user_id=other_id, to_user_id=user_id),
+        status='pending'
+    ).first()
+
+
+def respond_to_friend_request(request_id, user_id, new_status):
+    """
+    Переводит необработанный запрос, адресованный пользователю, в new_status
+    одним условным UPDATE. Из нескольких параллельных вызовов успешен только один.
+
+    Returns:
+        int | None: ID отправителя или None, если запрос не найден, уже обработан или адресован другому
+    """
+    with transaction.atomic():
+        updated = FriendRequest.objects.filter(id=request_id, to_user_id=user_id, status='pending').update(
+            status=new_status, updated_at=timezone.now()
+        )
+        if not updated:
+            return None
+        from_user_id = FriendRequest.objects.filter(id=request_id).values_list('from_user_id', flat=True).get()
+        adjust_request_counters(*_counter_deltas([(from_user_id, user_id)], -1))
+    return from_user_id
+
+
+def respond_to_friend_requests(request_ids, user_id, new_status):
+    """
+    Переводит несколько необработанных запросов, адресованных пользователю,
+    в new_status одной транзакцией.
+
+    Returns:
+        dict: {request_id: from_user_id} для обработанных запросов
+    """
+    with transaction.atomic():
+        processed = dict(
+            FriendRequest.objects.select_for_update().filter(
+                id__in=request_ids, to_user_id=user_id, status='pending'
+            ).values_list('id', 'from_user_id')
+        )
+        if processed:
+            FriendRequest.objects.filter(id__in=processed, status='pending').update(
+                status=new_status, updated_at=timezone.now()
+            )
+            adjust_request_counters(*_counter_deltas(
+                [(from_user_id, user_id) for from_user_id in processed.values()], -1
+            ))
+    return processed
+
+
+def rebuild_request_counters():
+    """
+    Пересчитывает счетчики необработанных запросов всех пользователей по таблице запросов.
+
+    Returns:
+        int: Количество пользователей с ненулевыми счетчиками
+    """
+    pending = dict(
+        FriendRequest.objects.filter(status='pending').values('to_user_id').annotate(total=Count('id'))
+        .values_list('to_user_id', 'total').order_by()
+    )
+    sent = dict(
+        FriendRequest.objects.filter(status='pending').values('from_user_id').annotate(total=Count('id'))
+        .values_list('from_user_id', 'total').order_by()
+    )
+    with transaction.atomic():
+        User.objects.exclude(pending_friend_requests_count=0, sent_friend_requests_count=0).update(
+            pending_friend_requests_count=0, sent_friend_requests_count=0
+        )
+        users = [
+            User(
+                id=user_id,
+                pending_friend_requests_count=pending.get(user_id, 0),
+                sent_friend_requests_count=sent.get(user_id, 0),
+            )
+            for user_id in set(pending) | set(sent)
+        ]
+        User.objects.bulk_update(
+            users, ['pending_friend_requests_count', 'sent_friend_requests_count'], batch_size=1000
+        )
+    return len(users)
+
+
+def add_friendship(user_id, friend_id):
+    """
+    Создает дружбу (если ее еще нет) и оба ребра графа.
+    Повторный вызов для той же пары ничего не меняет.
+    """
+    add_friendships(user_id, [friend_id])
+
+
+def add_friendships(user_id, friend_ids):
+    """Создает дружбы пользователя с несколькими пользователями (по одному INSERT на таблицу)."""
+    now = timezone.now()
+    friendships = []
+    edges = []
+    for friend_id in friend_ids:
+        user1_id, user2_id = canonical_pair(user_id, friend_id)
+        friendships.append(Friendship(user1_id=user1_id, user2_id=user2_id, created_at=now))
+        edges.append(FriendEdge(user_id=user_id, friend_id=friend_id, created_at=now))
+        edges.append(FriendEdge(user_id=friend_id, friend_id=user_id, created_at=now))
+    with transaction.atomic():
+        Friendship.objects.bulk_create(friendships, ignore_conflicts=True)
+        FriendEdge.objects.bulk_create(edges, ignore_conflicts=True)
+        invalidate_friend_ids(user_id, *friend_ids)
+
+
+def remove_friendship(user_id, friend_id):
+    """
+    Удаляет дружбу и оба ребра графа.
+
+    Returns:
+        bool: True, если дружба существовала
+    """
+    user1_id, user2_id = canonical_pair(user_id, friend_id)
+    with transaction.atomic():
+        deleted, _ = Friendship.objects.filter(user1_id=user1_id, user2_id=user2_id).delete()
+        FriendEdge.objects.filter(
+            Q(user_id=user_id, friend_id=friend_id) | Q(user_id=friend_id, friend_id=user_id)
+        ).delete()
+        if deleted:
+            record_deletions('friend', [(user_id, friend_id), (friend_id, user_id)])
+        invalidate_friend_ids(user_id, friend_id)
+    return bool(deleted)
+
+
+def rebuild_friend_edges(batch_size=1000):
+    """
+    Пересоздает ребра графа по записям Friendship (после внедрения
+    или при расхождении).
+
+    Returns:
+        int: Количество созданных ребер
+    """
+    created = 0
+    last_id = 0
+    affected = set(FriendEdge.objects.values_list('user_id', flat=True).distinct())
+    with transaction.atomic():
+        FriendEdge.objects.all().delete()
+        while True:
+            chunk = list(
+                Friendship.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'user1_id', 'user2_id', 'created_at')[:batch_size]
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+            edges = []
+            for _, user1_id, user2_id, created_at in chunk:
+                edges.append(FriendEdge(user_id=user1_id, friend_id=user2_id, created_at=created_at))
+                edges.append(FriendEdge(user_id=user2_id, friend_id=user1_id, created_at=created_at))
+            FriendEdge.objects.bulk_create(edges, ignore_conflicts=True)
+            affected.update(edge.user_id for edge in edges)
+            created += len(edges)
+        invalidate_friend_ids(*affected)
+    return created
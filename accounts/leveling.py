@@ -0,0 +1,162 @@
+"""
+Кривая уровней: таблица накопленного опыта для каждого уровня.
+
+Кривые задаются в settings.LEVEL_CURVES по сезонам, активный сезон -
+settings.LEVEL_CURVE_SEASON. Таблица строится один раз на процесс,
+уровень по опыту ищется бинарным поиском.
+
+Формат кривой:
+    {'thresholds': [0, 1000, 2500, ...]}  - накопленный опыт для уровней 1, 2, 3, ...
+    {'xp_per_level': 1000, 'growth': 1.1, 'max_level': 100}
+        - опыт на переход n -> n+1 равен xp_per_level * growth ** (n - 1)
+"""
+from bisect import bisect_right
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+DEFAULT_LEVEL_CURVE = {'xp_per_level': 1000, 'max_level': 1000}
+
+
+class LevelCurve:
+    """Таблица порогов накопленного опыта: thresholds[i] - опыт для уровня i + 1."""
+
+    def __init__(self, thresholds):
+        if not thresholds or thresholds[0] != 0:
+            raise ValueError("Level curve must start with 0 for level 1")
+        if any(b <= a for a, b in zip(thresholds, thresholds[1:])):
+            raise ValueError("Level curve thresholds must be strictly increasing")
+        self.thresholds = tuple(thresholds)
+        self.max_level = len(self.thresholds)
+
+    @classmethod
+    def from_config(cls, config):
+        if 'thresholds' in config:
+            return cls(config['thresholds'])
+        xp_per_level = config['xp_per_level']
+        growth = config.get('growth', 1)
+        thresholds = [0]
+        for level in range(1, config.get('max_level', DEFAULT_LEVEL_CURVE['max_level'])):
+            thresholds.append(thresholds[-1] + max(1, round(xp_per_level * growth ** (level - 1))))
+        return cls(thresholds)
+
+    def level_for(self, total_experience):
+        """Уровень для накопленного опыта."""
+        return bisect_right(self.thresholds, total_experience)
+
+    def threshold(self, level):
+        """Накопленный опыт, необходимый для уровня."""
+        return self.thresholds[min(max(level, 1), self.max_level) - 1]
+
+    def experience_per_level(self, level):
+        """Опыт, необходимый для перехода с уровня на следующий (0 на максимальном уровне)."""
+        if level >= self.max_level:
+            return 0
+        return self.threshold(level + 1) - self.threshold(level)
+
+    def split(self, total_experience):
+        """Возвращает (уровень, опыт внутри уровня) для накопленного опыта."""
+        level = self.level_for(total_experience)
+        return level, total_experience - self.threshold(level)
+
+
+@lru_cache(maxsize=None)
+def get_level_curve(season=None):
+    """Кривая уровней сезона (по умолчанию активного). Строится один раз на процесс."""
+    season = season or getattr(settings, 'LEVEL_CURVE_SEASON', 'default')
+    curves = getattr(settings, 'LEVEL_CURVES', {'default': DEFAULT_LEVEL_CURVE})
+    return LevelCurve.from_config(curves[season])
+
+
+def without_total_experience(queryset=None):
+    """
+    Пользователи с уровнем или опытом, но без накопленного опыта (не заполнен
+    backfill_total_experience). Пересчет по кривой сбросил бы их на 1 уровень.
+    """
+    if queryset is None:
+        queryset = get_user_model().objects.all()
+    return queryset.filter(total_experience=0).exclude(level__lte=1, experience=0)
+
+
+def recompute_levels(queryset=None, curve=None, batch_size=1000):
+    """
+    Пересчитывает уровень и опыт внутри уровня по накопленному опыту
+    (нужно после смены кривой). Пользователям, у которых изменился уровень,
+    повышается версия авторизации - уровень хранится в токене.
+    Пользователи без накопленного опыта (without_total_experience) пропускаются.
+
+    Returns:
+        int: Количество пользователей, у которых изменились уровень или опыт
+    """
+    from .authentication import auth_state_key
+
+    User = get_user_model()
+    curve = curve or get_level_curve()
+    if queryset is None:
+        queryset = User.objects.all()
+
+    rows = queryset.exclude(id__in=without_total_experience(queryset).values('id'))
+    rows = rows.order_by('id').values_list('id', 'total_experience', 'level', 'experience')
+    changed_total = 0
+    last_id = 0
+
+    # Постраничный проход по id, каждая пачка обновляется одной транзакцией
+    while True:
+        chunk = list(rows.filter(id__gt=last_id)[:batch_size])
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+
+        changed = []
+        level_changed_ids = []
+        for user_id, total_experience, level, experience in chunk:
+            new_level, new_experience = curve.split(total_experience)
+            if (new_level, new_experience) == (level, experience):
+                continue
+            changed.append(User(id=user_id, level=new_level, experience=new_experience))
+            if new_level != level:
+                level_changed_ids.append(user_id)
+
+        if changed:
+            with transaction.atomic():
+                User.objects.bulk_update(changed, ['level', 'experience'])
+                User.objects.filter(id__in=level_changed_ids).update(
+                    auth_version=F('auth_version') + 1, profile_updated_at=timezone.now()
+                )
+            cache.delete_many([auth_state_key(user.id) for user in changed])
+            changed_total += len(changed)
+
+    return changed_total
+
+
+def backfill_total_experience(curve, queryset=None, batch_size=1000):
+    """
+    Заполняет накопленный опыт для пользователей, у которых он еще не заполнен,
+    по уровню и опыту внутри уровня согласно кривой, действовавшей до смены.
+
+    Returns:
+        int: Количество обновленных пользователей
+    """
+    User = get_user_model()
+    rows = without_total_experience(queryset).order_by('id').values_list('id', 'level', 'experience')
+    updated_total = 0
+    last_id = 0
+
+    while True:
+        chunk = list(rows.filter(id__gt=last_id)[:batch_size])
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        users = [
+            User(id=user_id, total_experience=curve.threshold(level) + experience)
+            for user_id, level, experience in chunk
+        ]
+        User.objects.bulk_update(users, ['total_experience'])
+        updated_total += len(users)
+
+    return updated_total
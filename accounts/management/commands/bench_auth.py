@@ -0,0 +1,48 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from accounts.authentication import CachedJWTAuthentication
+from accounts.tokens import PlayerRefreshToken
+from accounts.views import GetCurrentUserCoinsView, GetCurrentUserStatsView
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Сравнивает JWTAuthentication и CachedJWTAuthentication: запросы к БД и время на запрос"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help="Количество запросов на каждый endpoint")
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        factory = APIRequestFactory()
+
+        # Все изменения откатываются в конце - база не засоряется
+        with transaction.atomic():
+            user = User.objects.create_user(username=f'bench_auth_{time.time_ns()}', password='bench')
+            header = f'Bearer {PlayerRefreshToken.for_user(user).access_token}'
+
+            for name, view_class in (('coins', GetCurrentUserCoinsView), ('stats', GetCurrentUserStatsView)):
+                for auth_class in (JWTAuthentication, CachedJWTAuthentication):
+                    view = view_class.as_view(authentication_classes=[auth_class])
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        for _ in range(count):
+                            response = view(factory.get('/', HTTP_AUTHORIZATION=header))
+                            assert response.status_code == 200, response.data
+                        elapsed = time.perf_counter() - started
+
+                    self.stdout.write(
+                        f"{name:6} {auth_class.__name__:24} "
+                        f"запросов к БД на запрос: {len(queries) / count:.3f}, "
+                        f"время на запрос: {elapsed / count * 1000:.3f} мс"
+                    )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,80 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.views import (
+    AcceptFriendRequestView, GetFriendsListView, GetPendingFriendRequestsView, GetSentFriendRequestsView,
+    RejectFriendRequestView, RemoveFriendView, SendFriendRequestView
+)
+
+User = get_user_model()
+
+TRANSACTION_CONTROL = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE SAVEPOINT')
+
+
+class Command(BaseCommand):
+    help = "Считает запросы к БД на каждом шаге сценария друзей: отправка, принятие, списки, отклонение, удаление"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pairs', type=int, default=50, help="Количество пар пользователей")
+
+    def handle(self, *args, **options):
+        pairs = options['pairs']
+        factory = APIRequestFactory()
+        views = {
+            'send': SendFriendRequestView.as_view(),
+            'accept': AcceptFriendRequestView.as_view(),
+            'reject': RejectFriendRequestView.as_view(),
+            'friends': GetFriendsListView.as_view(),
+            'pending': GetPendingFriendRequestsView.as_view(),
+            'sent': GetSentFriendRequestsView.as_view(),
+            'remove': RemoveFriendView.as_view(),
+        }
+        stats = {name: [0, 0, 0.0, 0] for name in ('send', 'pending', 'sent', 'accept', 'friends', 'remove', 'reject')}
+
+        def call(name, user, request, expected_status, **kwargs):
+            force_authenticate(request, user=user)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = views[name](request, **kwargs)
+                elapsed = time.perf_counter() - started
+            assert response.status_code == expected_status, (name, response.status_code, response.data)
+            stats[name][0] += len(queries)
+            stats[name][1] += sum(1 for query in queries if query['sql'].startswith(TRANSACTION_CONTROL))
+            stats[name][2] += elapsed
+            stats[name][3] += 1
+            return response
+
+        # Все изменения откатываются в конце - база не засоряется
+        with transaction.atomic():
+            prefix = f'bench_friends_{time.time_ns()}'
+            users = User.objects.bulk_create([
+                User(username=f'{prefix}_{index}') for index in range(pairs * 2)
+            ])
+            users = list(User.objects.filter(username__startswith=prefix).order_by('id'))
+
+            for index in range(pairs):
+                sender, receiver = users[2 * index], users[2 * index + 1]
+                response = call('send', sender, factory.post('/', {'to_user_id': receiver.id}, format='json'), 201)
+                request_id = response.data['friend_request']['id']
+                call('pending', receiver, factory.get('/'), 200)
+                call('sent', sender, factory.get('/'), 200)
+                call('accept', receiver, factory.post('/'), 200, request_id=request_id)
+                call('friends', sender, factory.get('/'), 200)
+                call('remove', sender, factory.delete('/'), 200, friend_id=receiver.id)
+
+                response = call('send', receiver, factory.post('/', {'to_user_id': sender.id}, format='json'), 201)
+                call('reject', sender, factory.post('/'), 200, request_id=response.data['friend_request']['id'])
+
+            transaction.set_rollback(True)
+
+        for name, (queries, control, elapsed, calls) in stats.items():
+            self.stdout.write(
+                f"{name:8} запросов к БД на вызов: {queries / calls:.2f} "
+                f"(из них BEGIN/COMMIT/SAVEPOINT: {control / calls:.2f}), "
+                f"время на вызов: {elapsed / calls * 1000:.3f} мс"
+            )
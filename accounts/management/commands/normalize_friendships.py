@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from accounts.friends import rebuild_request_counters, remove_friendship
+from accounts.models import FriendRequest, Friendship
+
+
+class Command(BaseCommand):
+    help = (
+        "Приводит дружбы и запросы дружбы к каноническому виду перед применением ограничений "
+        "(user1_id < user2_id, не больше одного необработанного запроса на пару)"
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Дружбы с обратным порядком: дубликат удаляется, остальные переворачиваются
+            swapped = 0
+            removed = 0
+            pairs = set(Friendship.objects.filter(user1_id__lt=F('user2_id')).values_list('user1_id', 'user2_id'))
+            for friendship in Friendship.objects.filter(user1_id__gte=F('user2_id')):
+                pair = (friendship.user2_id, friendship.user1_id)
+                if pair[0] == pair[1]:
+                    # Дружба с самим собой: удаляется с ребрами и отметкой для синхронизации (sync)
+                    remove_friendship(*pair)
+                    removed += 1
+                    continue
+                if pair in pairs:
+                    # Дубликат: дружба пары остается в каноническом виде, друг из списков
+                    # не пропадает - отметка об удалении не нужна
+                    friendship.delete()
+                    removed += 1
+                    continue
+                Friendship.objects.filter(id=friendship.id).update(user1_id=pair[0], user2_id=pair[1])
+                pairs.add(pair)
+                swapped += 1
+
+            # Необработанные запросы: для пары остается самый ранний
+            cancelled = []
+            seen = set()
+            pending = FriendRequest.objects.filter(status='pending').order_by('created_at', 'id').values_list(
+                'id', 'from_user_id', 'to_user_id'
+            )
+            for request_id, from_user_id, to_user_id in pending:
+                pair = (min(from_user_id, to_user_id), max(from_user_id, to_user_id))
+                if from_user_id == to_user_id or pair in seen:
+                    cancelled.append(request_id)
+                else:
+                    seen.add(pair)
+            FriendRequest.objects.filter(id__in=cancelled).update(status='cancelled')
+            rebuild_request_counters()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Дружб перевернуто: {swapped}, удалено дубликатов: {removed}, "
+            f"отменено лишних запросов: {len(cancelled)}"
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from accounts.suggestions import process_friendship_updates
+
+
+class Command(BaseCommand):
+    help = (
+        "Обрабатывает отложенные обновления рекомендаций друзей после массового принятия "
+        "запросов (запускать часто, например раз в минуту)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        processed = 0
+        while True:
+            count = process_friendship_updates(options['batch_size'])
+            if not count:
+                break
+            processed += count
+            self.stdout.write(f"Обработано обновлений: {processed}")
+
+        self.stdout.write(self.style.SUCCESS(f"Готово: {processed} обновлений"))
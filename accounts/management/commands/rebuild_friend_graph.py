@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts.friends import rebuild_friend_edges
+
+
+class Command(BaseCommand):
+    help = "Пересоздает ребра графа друзей (FriendEdge) по записям Friendship"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = rebuild_friend_edges(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Создано ребер графа друзей: {created}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts.friends import rebuild_request_counters
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счетчики необработанных запросов дружбы по таблице запросов"
+
+    def handle(self, *args, **options):
+        updated = rebuild_request_counters()
+        self.stdout.write(self.style.SUCCESS(f"Пользователей с необработанными запросами: {updated}"))
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from accounts.suggestions import refresh_suggestions
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Полностью пересчитывает рекомендации друзей для всех пользователей (запускать периодически)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--user-id', type=int, action='append', help="Пересчитать только для этих пользователей")
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True).order_by('id')
+        if options['user_id']:
+            users = users.filter(id__in=options['user_id'])
+
+        processed = 0
+        stored = 0
+        last_id = 0
+        while True:
+            user_ids = list(users.filter(id__gt=last_id).values_list('id', flat=True)[:options['batch_size']])
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+            for user_id in user_ids:
+                stored += len(refresh_suggestions(user_id))
+            processed += len(user_ids)
+            self.stdout.write(f"Обработано пользователей: {processed}")
+
+        self.stdout.write(self.style.SUCCESS(f"Готово: {processed} пользователей, {stored} рекомендаций"))
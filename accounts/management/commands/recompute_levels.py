@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.leveling import backfill_total_experience, get_level_curve, recompute_levels, without_total_experience
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает уровни всех пользователей по кривой уровней (после смены кривой или сезона)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--season', help="Сезон кривой уровней (по умолчанию LEVEL_CURVE_SEASON)")
+        parser.add_argument(
+            '--backfill-from',
+            metavar='SEASON',
+            help="Сначала заполнить накопленный опыт по кривой этого сезона (для пользователей без total_experience)"
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        curves = getattr(settings, 'LEVEL_CURVES', {})
+        for season in (options['season'], options['backfill_from']):
+            if season and season not in curves:
+                raise CommandError(f"Unknown level curve season: {season}")
+
+        if options['backfill_from']:
+            updated = backfill_total_experience(get_level_curve(options['backfill_from']), batch_size=options['batch_size'])
+            self.stdout.write(f"Накопленный опыт заполнен у {updated} пользователей")
+
+        changed = recompute_levels(curve=get_level_curve(options['season']), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Уровень или опыт изменились у {changed} пользователей"))
+
+        skipped = without_total_experience().count()
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f"Пропущено {skipped} пользователей без накопленного опыта: "
+                f"заполните его, запустив команду с --backfill-from <сезон прежней кривой>"
+            ))
@@ -0,0 +1,18 @@
+STALE_TOKEN_HEADER = 'X-Token-Stale'
+
+
+class StaleTokenMiddleware:
+    """
+    Добавляет заголовок X-Token-Stale: true, если запрос аутентифицирован токеном
+    с устаревшими claims (клан или уровень изменились после выдачи токена,
+    accounts.authentication). Клиент обновляет токен через POST /api/token/refresh/.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if getattr(request, 'stale_token', False):
+            response[STALE_TOKEN_HEADER] = 'true'
+        return response
@@ -0,0 +1,148 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_customuser_clan_friendrequest_friendship'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FriendEdge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Ребро графа друзей',
+                'verbose_name_plural': 'Граф друзей',
+            },
+        ),
+        migrations.CreateModel(
+            name='FriendSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField(default=0, verbose_name='Оценка')),
+                ('mutual_friends', models.IntegerField(default=0, verbose_name='Общих друзей')),
+                ('shared_clan', models.BooleanField(default=False, verbose_name='Общий клан')),
+                ('shared_landmarks', models.IntegerField(default=0, verbose_name='Общих достопримечательностей')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Рекомендация друга',
+                'verbose_name_plural': 'Рекомендации друзей',
+            },
+        ),
+        migrations.CreateModel(
+            name='FriendSuggestionUpdate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Обновление рекомендаций',
+                'verbose_name_plural': 'Обновления рекомендаций',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='friendrequest',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='friendship',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='auth_version',
+            field=models.PositiveIntegerField(default=0, help_text='Версия авторизации'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='pending_friend_requests_count',
+            field=models.PositiveIntegerField(default=0, help_text='Входящих необработанных запросов дружбы'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_updated_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, help_text='Профиль изменен'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='sent_friend_requests_count',
+            field=models.PositiveIntegerField(default=0, help_text='Отправленных необработанных запросов дружбы'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='total_experience',
+            field=models.BigIntegerField(default=0, help_text='Накопленный опыт за все время'),
+        ),
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(fields=['to_user', 'status', '-created_at'], name='accounts_fr_to_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(fields=['from_user', 'status', '-created_at'], name='accounts_fr_from_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(fields=['to_user', 'updated_at'], name='accounts_fr_to_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(fields=['from_user', 'updated_at'], name='accounts_fr_from_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='friendedge',
+            name='friend',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Друг'),
+        ),
+        migrations.AddField(
+            model_name='friendedge',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='friend_edges', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddField(
+            model_name='friendsuggestion',
+            name='candidate',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Кандидат'),
+        ),
+        migrations.AddField(
+            model_name='friendsuggestion',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='friend_suggestions', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddField(
+            model_name='friendsuggestionupdate',
+            name='friend',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Друг'),
+        ),
+        migrations.AddField(
+            model_name='friendsuggestionupdate',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddIndex(
+            model_name='friendedge',
+            index=models.Index(fields=['user', '-created_at'], name='accounts_friend_edge_user_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='friendedge',
+            constraint=models.UniqueConstraint(fields=('user', 'friend'), name='accounts_friend_edge_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='friendsuggestion',
+            index=models.Index(fields=['user', '-score'], name='accounts_friend_sugg_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='friendsuggestion',
+            constraint=models.UniqueConstraint(fields=('user', 'candidate'), name='accounts_friend_suggestion_unique'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations, models
+
+
+def normalize_friendships(apps, schema_editor):
+    """
+    Приводит дружбы и необработанные запросы к виду, который требуют ограничения:
+    user1_id < user2_id без дубликатов и дружбы с собой, не больше одного
+    необработанного запроса на пару (остается самый ранний, остальные отменяются).
+    """
+    Friendship = apps.get_model('accounts', 'Friendship')
+    FriendRequest = apps.get_model('accounts', 'FriendRequest')
+
+    pairs = set()
+    for friendship_id, user1_id, user2_id in Friendship.objects.order_by('created_at', 'id').values_list(
+        'id', 'user1_id', 'user2_id'
+    ).iterator():
+        pair = (min(user1_id, user2_id), max(user1_id, user2_id))
+        if user1_id == user2_id or pair in pairs:
+            Friendship.objects.filter(id=friendship_id).delete()
+            continue
+        pairs.add(pair)
+        if (user1_id, user2_id) != pair:
+            Friendship.objects.filter(id=friendship_id).update(user1_id=pair[0], user2_id=pair[1])
+
+    # Запрос самому себе нарушает accounts_friend_request_not_self при любом статусе
+    FriendRequest.objects.filter(from_user_id=models.F('to_user_id')).delete()
+
+    cancelled = []
+    seen = set()
+    pending = FriendRequest.objects.filter(status='pending').order_by('created_at', 'id').values_list(
+        'id', 'from_user_id', 'to_user_id'
+    )
+    for request_id, from_user_id, to_user_id in pending.iterator():
+        pair = (min(from_user_id, to_user_id), max(from_user_id, to_user_id))
+        if pair in seen:
+            cancelled.append(request_id)
+        else:
+            seen.add(pair)
+    FriendRequest.objects.filter(id__in=cancelled).update(status='cancelled')
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_friend_graph_counters_versions'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_friendships, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Ограничения отдельной миграцией: в PostgreSQL ALTER TABLE в одной транзакции
+# с изменением строк (0005) завершается ошибкой "pending trigger events"
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_normalize_friendships'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='friendrequest',
+            constraint=models.UniqueConstraint(django.db.models.functions.comparison.Least('from_user', 'to_user'), django.db.models.functions.comparison.Greatest('from_user', 'to_user'), condition=models.Q(('status', 'pending')), name='accounts_friend_request_pending_pair'),
+        ),
+        migrations.AddConstraint(
+            model_name='friendrequest',
+            constraint=models.CheckConstraint(condition=models.Q(('from_user', models.F('to_user')), _negated=True), name='accounts_friend_request_not_self'),
+        ),
+        migrations.AddConstraint(
+            model_name='friendship',
+            constraint=models.UniqueConstraint(fields=('user1', 'user2'), name='accounts_friendship_pair_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='friendship',
+            constraint=models.CheckConstraint(condition=models.Q(('user1__lt', models.F('user2'))), name='accounts_friendship_canonical_order'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def backfill(apps, schema_editor):
+    """
+    Заполняет данные новых полей и таблиц по существующим строкам:
+    ребра графа друзей (FriendEdge) по дружбам, счетчики необработанных
+    запросов и накопленный опыт по уровню и опыту внутри уровня
+    (по активной кривой уровней, accounts.leveling).
+    """
+    from accounts.leveling import get_level_curve
+
+    User = apps.get_model('accounts', 'CustomUser')
+    Friendship = apps.get_model('accounts', 'Friendship')
+    FriendEdge = apps.get_model('accounts', 'FriendEdge')
+    FriendRequest = apps.get_model('accounts', 'FriendRequest')
+
+    edges = []
+    for user1_id, user2_id, created_at in Friendship.objects.values_list('user1_id', 'user2_id', 'created_at').iterator():
+        edges.append(FriendEdge(user_id=user1_id, friend_id=user2_id, created_at=created_at))
+        edges.append(FriendEdge(user_id=user2_id, friend_id=user1_id, created_at=created_at))
+        if len(edges) >= 2000:
+            FriendEdge.objects.bulk_create(edges, ignore_conflicts=True)
+            edges = []
+    FriendEdge.objects.bulk_create(edges, ignore_conflicts=True)
+
+    pending = FriendRequest.objects.filter(status='pending')
+    for field, counter in (('to_user', 'pending_friend_requests_count'), ('from_user', 'sent_friend_requests_count')):
+        for row in pending.values(field).annotate(count=Count('id')).iterator():
+            User.objects.filter(id=row[field]).update(**{counter: row['count']})
+
+    curve = get_level_curve()
+    users = User.objects.filter(total_experience=0).exclude(level__lte=1, experience=0)
+    for user_id, level, experience in users.values_list('id', 'level', 'experience').iterator():
+        User.objects.filter(id=user_id).update(total_experience=curve.threshold(level) + experience)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_friendship_constraints'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
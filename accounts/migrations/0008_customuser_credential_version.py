@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_backfill_friend_graph_counters_experience'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='credential_version',
+            field=models.PositiveIntegerField(default=0, help_text='Версия учетных данных'),
+        ),
+    ]
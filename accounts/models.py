@@ -1,12 +1,18 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from django.db.models import Q
+from django.db.models import F, Q
+from django.db.models.functions import Greatest, Least
 from django.utils import timezone
 
+# Поля, которые видят друзья (accounts.friends.FRIEND_FIELDS); их изменение
+# обновляет CustomUser.profile_updated_at
+PROFILE_FIELDS = ('username', 'first_name', 'last_name', 'level', 'gender')
+
 class CustomUser(AbstractUser):
     coins = models.IntegerField(default=0)  
     experience = models.IntegerField(default=0, help_text="Опыт игрока")
     level = models.IntegerField(default=1, help_text="Уровень игрока")
+    total_experience = models.BigIntegerField(default=0, help_text="Накопленный опыт за все время")
     registration_date = models.DateTimeField(default=timezone.now)
 
     boots = models.IntegerField(default=0)
@@ -30,61 +36,121 @@ class CustomUser(AbstractUser):
         verbose_name="Клан"
     )
     
-    EXPERIENCE_PER_LEVEL = 1000  # Константа: опыта нужно для повышения уровня
+    # Версия claims токена: повышается при смене клана или уровня. Токен со старой
+    # версией принимается с актуальными значениями из БД, клиент получает новый через refresh
+    auth_version = models.PositiveIntegerField(default=0, help_text="Версия авторизации")
+    # Версия учетных данных: повышается только при смене пароля,
+    # access- и refresh-токены со старой версией отклоняются
+    credential_version = models.PositiveIntegerField(default=0, help_text="Версия учетных данных")
+    
+    # Счетчики необработанных запросов дружбы (входящих и отправленных),
+    # обновляются вместе с запросами в accounts.friends
+    pending_friend_requests_count = models.PositiveIntegerField(default=0, help_text="Входящих необработанных запросов дружбы")
+    sent_friend_requests_count = models.PositiveIntegerField(default=0, help_text="Отправленных необработанных запросов дружбы")
+    
+    # Время изменения полей PROFILE_FIELDS: по нему синхронизация (sync.changes)
+    # отдает друзей, у которых с курсора изменился профиль
+    profile_updated_at = models.DateTimeField(default=timezone.now, db_index=True, help_text="Профиль изменен")
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and getattr(self, '_from_token', False):
+            # Пользователь из токена (accounts.authentication.build_lazy_user): без
+            # update_fields save() записал бы устаревшие coins, experience, level и clan
+            raise ValueError("User built from token claims must be saved with update_fields")
+        if update_fields is None:
+            self.profile_updated_at = timezone.now()
+        else:
+            update_fields = set(update_fields)
+            if 'password' in update_fields:
+                update_fields.add('credential_version')
+            if update_fields & set(PROFILE_FIELDS):
+                self.profile_updated_at = timezone.now()
+                update_fields.add('profile_updated_at')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+        from .authentication import invalidate_auth_state
+        invalidate_auth_state(self.pk)
+    
+    def set_password(self, raw_password):
+        super().set_password(raw_password)
+        # Смена пароля отзывает все выданные токены
+        if self.pk is not None:
+            self.credential_version += 1
+    
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # Пользователь, собранный из claims токена, загружает все отложенные
+        # поля одним запросом при первом обращении к любому из них
+        if fields is not None:
+            deferred_fields = self.get_deferred_fields()
+            if deferred_fields and set(fields) <= deferred_fields:
+                fields = deferred_fields
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+    
+    @staticmethod
+    def bump_auth_version(user_id):
+        """Повышает версию claims пользователя: его токены получат актуальные клан и уровень."""
+        CustomUser.objects.filter(pk=user_id).update(auth_version=F('auth_version') + 1)
+        from .authentication import invalidate_auth_state
+        invalidate_auth_state(user_id)
     
-    def add_coins(self, amount):
+    def add_coins(self, amount, source='admin_grant', reference=''):
         """
-        Добавляет монеты пользователю.
+        Добавляет монеты пользователю (атомарно, с записью в журнал баланса).
         
         Args:
             amount (int): Количество монет для добавления
+            source (str): Источник начисления (см. wallet.models.SOURCE_CHOICES)
+            reference (str): Объект-основание, например quest:5
             
         Returns:
             int: Новый баланс монет
         """
-        if amount < 0:
-            raise ValueError("Amount must be positive")
-        self.coins += amount
-        self.save(update_fields=['coins'])
+        from wallet.ledger import credit_coins
+        self.coins = credit_coins(self.pk, amount, source, reference)
         return self.coins
     
-    def add_experience(self, amount):
+    def add_experience(self, amount, source='admin_grant', reference=''):
         """
-        Добавляет опыт пользователю и автоматически повышает уровень при достижении 1000 опыта.
+        Добавляет опыт пользователю (атомарно, с записью в журнал баланса) и автоматически
+        повышает уровень по кривой уровней (accounts.leveling). Уровень определяется
+        бинарным поиском по таблице порогов.
         
         Args:
             amount (int): Количество опыта для добавления
+            source (str): Источник начисления (см. wallet.models.SOURCE_CHOICES)
+            reference (str): Объект-основание, например quest:5
             
         Returns:
             dict: Словарь с информацией о результате:
-                - 'experience': новый опыт
+                - 'experience': новый опыт внутри уровня
                 - 'level': новый уровень
                 - 'leveled_up': True если уровень повысился
+                - 'levels_gained': на сколько уровней повысился
         """
-        if amount < 0:
-            raise ValueError("Amount must be positive")
-        
-        self.experience += amount
-        leveled_up = False
-        levels_gained = 0
-        
-        # Проверяем, нужно ли повысить уровень
-        while self.experience >= self.EXPERIENCE_PER_LEVEL:
-            self.experience -= self.EXPERIENCE_PER_LEVEL
-            self.level += 1
-            leveled_up = True
-            levels_gained += 1
-        
-        # Сохраняем изменения
-        self.save(update_fields=['experience', 'level'])
+        from wallet.ledger import credit_experience
+        result = credit_experience(self.pk, amount, source, reference)
+        self.level = result['level']
+        self.experience = result['experience']
+        self.total_experience = result['total_experience']
         
         return {
             'experience': self.experience,
             'level': self.level,
-            'leveled_up': leveled_up,
-            'levels_gained': levels_gained
+            'leveled_up': result['levels_gained'] > 0,
+            'levels_gained': result['levels_gained']
         }
     
+    def get_experience_per_level(self):
+        """
+        Возвращает количество опыта, необходимое для перехода с текущего уровня на следующий.
+        
+        Returns:
+            int: Опыт на текущий уровень (0 на максимальном уровне)
+        """
+        from .leveling import get_level_curve
+        return get_level_curve().experience_per_level(self.level)
+    
     def get_experience_to_next_level(self):
         """
         Возвращает количество опыта, необходимое для следующего уровня.
@@ -92,7 +158,7 @@ class CustomUser(AbstractUser):
         Returns:
             int: Опыт до следующего уровня
         """
-        return self.EXPERIENCE_PER_LEVEL - self.experience
+        return max(self.get_experience_per_level() - self.experience, 0)
     
     class Meta:
         verbose_name = "Пользователь"
@@ -102,6 +168,8 @@ class CustomUser(AbstractUser):
 class FriendRequest(models.Model):
     """
     Модель для запросов дружбы между пользователями.
+    Для пары пользователей (min_id, max_id) может быть не больше одного
+    необработанного запроса в любую сторону - это гарантирует ограничение в БД.
     """
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -134,8 +202,25 @@ class FriendRequest(models.Model):
     class Meta:
         verbose_name = "Запрос дружбы"
         verbose_name_plural = "Запросы дружбы"
-        unique_together = ['from_user', 'to_user']
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                Least('from_user', 'to_user'), Greatest('from_user', 'to_user'),
+                condition=Q(status='pending'),
+                name='accounts_friend_request_pending_pair',
+            ),
+            models.CheckConstraint(
+                condition=~Q(from_user=F('to_user')),
+                name='accounts_friend_request_not_self',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['to_user', 'status', '-created_at'], name='accounts_fr_to_status_idx'),
+            models.Index(fields=['from_user', 'status', '-created_at'], name='accounts_fr_from_status_idx'),
+            # Изменения с момента последней синхронизации (sync.changes)
+            models.Index(fields=['to_user', 'updated_at'], name='accounts_fr_to_updated_idx'),
+            models.Index(fields=['from_user', 'updated_at'], name='accounts_fr_from_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.from_user.username} -> {self.to_user.username} ({self.status})"
@@ -144,7 +229,8 @@ class FriendRequest(models.Model):
 class Friendship(models.Model):
     """
     Модель для подтверждённых дружеских отношений.
-    Хранит симметричную связь между двумя пользователями.
+    Хранит симметричную связь между двумя пользователями
+    в каноническом порядке: user1_id < user2_id.
     """
     user1 = models.ForeignKey(
         CustomUser,
@@ -163,30 +249,111 @@ class Friendship(models.Model):
     class Meta:
         verbose_name = "Дружба"
         verbose_name_plural = "Дружбы"
-        unique_together = ['user1', 'user2']
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user1', 'user2'], name='accounts_friendship_pair_unique'),
+            models.CheckConstraint(condition=Q(user1__lt=F('user2')), name='accounts_friendship_canonical_order'),
+        ]
     
     def __str__(self):
         return f"{self.user1.username} <-> {self.user2.username}"
     
     @staticmethod
     def are_friends(user1, user2):
-        """Проверяет, являются ли два пользователя друзьями."""
-        return Friendship.objects.filter(
-            (Q(user1=user1) & Q(user2=user2)) |
-            (Q(user1=user2) & Q(user2=user1))
-        ).exists()
+        """Проверяет, являются ли два пользователя друзьями (по закэшированному множеству друзей)."""
+        from .friends import are_friends
+        return are_friends(user1.id, user2.id)
     
     @staticmethod
     def get_friends(user):
-        """Получает всех друзей пользователя."""
-        friendships = Friendship.objects.filter(
-            Q(user1=user) | Q(user2=user)
-        )
-        friends = []
-        for friendship in friendships:
-            if friendship.user1 == user:
-                friends.append(friendship.user2)
-            else:
-                friends.append(friendship.user1)
-        return friends
+        """Получает всех друзей пользователя (новые дружбы первыми)."""
+        from .friends import get_friends
+        return get_friends(user.id)
+
+
+class FriendEdge(models.Model):
+    """
+    Направленное ребро графа друзей. Каждая дружба хранится двумя ребрами
+    (user -> friend и friend -> user), поэтому друзья пользователя выбираются
+    по индексу одним запросом без OR по двум колонкам.
+    """
+    user = models.ForeignKey(
+        CustomUser,
+        related_name='friend_edges',
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь"
+    )
+    friend = models.ForeignKey(
+        CustomUser,
+        related_name='+',
+        on_delete=models.CASCADE,
+        verbose_name="Друг"
+    )
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Дата создания")
+
+    class Meta:
+        verbose_name = "Ребро графа друзей"
+        verbose_name_plural = "Граф друзей"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'friend'], name='accounts_friend_edge_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='accounts_friend_edge_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.friend_id}"
+
+
+class FriendSuggestion(models.Model):
+    """
+    Предрассчитанный кандидат в друзья. Для каждого пользователя хранится
+    не больше FRIEND_SUGGESTIONS_TOP_K лучших кандидатов (accounts.suggestions).
+    """
+    user = models.ForeignKey(
+        CustomUser,
+        related_name='friend_suggestions',
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь"
+    )
+    candidate = models.ForeignKey(
+        CustomUser,
+        related_name='+',
+        on_delete=models.CASCADE,
+        verbose_name="Кандидат"
+    )
+    score = models.IntegerField(default=0, verbose_name="Оценка")
+    mutual_friends = models.IntegerField(default=0, verbose_name="Общих друзей")
+    shared_clan = models.BooleanField(default=False, verbose_name="Общий клан")
+    shared_landmarks = models.IntegerField(default=0, verbose_name="Общих достопримечательностей")
+    updated_at = models.DateTimeField(default=timezone.now, verbose_name="Дата обновления")
+
+    class Meta:
+        verbose_name = "Рекомендация друга"
+        verbose_name_plural = "Рекомендации друзей"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'candidate'], name='accounts_friend_suggestion_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score'], name='accounts_friend_sugg_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.candidate_id} ({self.score})"
+
+
+class FriendSuggestionUpdate(models.Model):
+    """
+    Отложенное обновление рекомендаций после изменения дружбы пары пользователей
+    (массовое принятие запросов). Обрабатывается командой process_friend_suggestion_updates.
+    """
+    user = models.ForeignKey(CustomUser, related_name='+', on_delete=models.CASCADE, verbose_name="Пользователь")
+    friend = models.ForeignKey(CustomUser, related_name='+', on_delete=models.CASCADE, verbose_name="Друг")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+
+    class Meta:
+        verbose_name = "Обновление рекомендаций"
+        verbose_name_plural = "Обновления рекомендаций"
+
+    def __str__(self):
+        return f"{self.user_id} <-> {self.friend_id}"
@@ -0,0 +1,173 @@
+"""
+Кэш публичных данных игроков (профиль и список external_ids).
+
+Данные хранятся в LRU внутри воркера, ограниченном суммарным весом записей
+(вес = 1 + количество external_ids). Каждая запись помечена версией игрока,
+которая хранится в общем кэше: при изменении данных версия повышается,
+и записи во всех воркерах становятся недействительными.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+User = get_user_model()
+
+
+def profile_version_key(player_id):
+    return f'accounts:profile_version:{player_id}'
+
+
+def get_profile_version(player_id):
+    """Текущая версия данных игрока. Если ключа нет в общем кэше, создается новая версия."""
+    key = profile_version_key(player_id)
+    version = cache.get(key)
+    if version is None:
+        # Версия от времени исключает совпадение со старыми записями после вытеснения ключа
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_profile_version(player_id):
+    key = profile_version_key(player_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate_player_profile(player_id):
+    """
+    Делает недействительными закэшированные данные игрока во всех воркерах.
+    Версия повышается повторно после коммита, чтобы параллельный запрос
+    не закэшировал незакоммиченное (старое) состояние под новой версией.
+    """
+    _bump_profile_version(player_id)
+    transaction.on_commit(lambda: _bump_profile_version(player_id))
+
+
+class PlayerProfileCache:
+    """LRU публичных данных игроков с ограничением по суммарному весу."""
+
+    def __init__(self, max_weight):
+        self.max_weight = max_weight
+        self._entries = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, player_id):
+        """
+        Возвращает (profile, external_ids) игрока или None, если игрок не найден.
+        landmarks в profile не заполнен, external_ids - кортеж (новые первыми).
+        """
+        version = get_profile_version(player_id)
+        with self._lock:
+            entry = self._entries.get(player_id)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(player_id)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+
+        data = self._load(player_id)
+        if data is None:
+            return None
+        self._put(player_id, version, *data)
+        return data
+
+    def _load(self, player_id):
+        from landmarks.models import PlayerLandmarkObservation
+        from .profiles import build_player_profile
+
+        player = User.objects.select_related('clan').filter(id=player_id).first()
+        if player is None:
+            return None
+        external_ids = tuple(
+            PlayerLandmarkObservation.objects.filter(player_id=player_id)
+            .order_by('-observed_at')
+            .values_list('landmark__external_id', flat=True)
+        )
+        return build_player_profile(player, [], 0), external_ids
+
+    def _put(self, player_id, version, profile, external_ids):
+        weight = 1 + len(external_ids)
+        if weight > self.max_weight:
+            return
+        with self._lock:
+            old = self._entries.pop(player_id, None)
+            if old is not None:
+                self._weight -= old[3]
+            self._entries[player_id] = (version, profile, external_ids, weight)
+            self._weight += weight
+            while self._weight > self.max_weight:
+                _, evicted = self._entries.popitem(last=False)
+                self._weight -= evicted[3]
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / requests, 4) if requests else 0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "weight": self._weight,
+                "max_weight": self.max_weight,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+
+
+player_profiles = PlayerProfileCache(getattr(settings, 'PLAYER_PROFILE_CACHE_MAX_WEIGHT', 500000))
+
+
+def get_player_profile(player_id):
+    """Публичный профиль игрока в формате GetPlayerInfoView или None."""
+    data = player_profiles.get(player_id)
+    if data is None:
+        return None
+    profile, external_ids = data
+    return {
+        **profile,
+        "landmarks": {
+            "external_ids": external_ids,
+            "total_count": len(external_ids)
+        }
+    }
+
+
+def get_player_landmarks(player_id):
+    """Возвращает (username, external_ids) игрока или None."""
+    data = player_profiles.get(player_id)
+    if data is None:
+        return None
+    profile, external_ids = data
+    return profile["username"], external_ids
+
+
+def iterate_player_landmarks(player_id):
+    """
+    Возвращает (username, итератор external_ids) игрока или None - для потоковых
+    ответов: список читается курсором из БД (новые первыми) и не кладется в кэш.
+    """
+    from landmarks.models import PlayerLandmarkObservation
+    from myproject.streaming import iterate_values
+
+    username = User.objects.filter(id=player_id).values_list('username', flat=True).first()
+    if username is None:
+        return None
+    observations = PlayerLandmarkObservation.objects.filter(player_id=player_id).order_by('-observed_at')
+    return username, iterate_values(observations, 'landmark__external_id', flat=True)
@@ -0,0 +1,81 @@
+"""
+Публичные профили игроков (формат ответа GetPlayerInfoView).
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+User = get_user_model()
+
+MAX_BATCH_PLAYER_IDS = 300  # Максимум игроков в одном batch-запросе
+MAX_BATCH_LANDMARKS_LIMIT = 1000  # Максимум external_ids на игрока в batch-ответе
+
+
+def build_player_profile(player, external_ids, total_count):
+    """Формирует публичный профиль игрока. Клан должен быть загружен через select_related."""
+    clan_info = None
+    if player.clan_id is not None and player.clan is not None:
+        clan_info = {
+            "id": player.clan.id,
+            "name": player.clan.name,
+            "description": player.clan.description or ""
+        }
+
+    return {
+        "id": player.id,
+        "player_id": player.id,
+        "username": player.username,
+        "first_name": player.first_name or "",
+        "last_name": player.last_name or "",
+        "registration_date": player.registration_date.isoformat() if player.registration_date else None,
+        "gender": player.gender,
+        "clan": clan_info,
+        "landmarks": {
+            "external_ids": external_ids,
+            "total_count": total_count
+        }
+    }
+
+
+def load_player_profiles(player_ids, landmarks_limit=0):
+    """
+    Загружает профили нескольких игроков фиксированным числом запросов:
+    один IN-запрос игроков с кланами и один запрос наблюдений, сгруппированных по игроку.
+
+    Args:
+        player_ids (list[int]): ID игроков
+        landmarks_limit (int): Сколько последних external_ids вернуть на игрока (0 - только количество)
+
+    Returns:
+        dict: {player_id: профиль} для найденных игроков
+    """
+    from landmarks.models import PlayerLandmarkObservation
+
+    players = list(User.objects.select_related('clan').filter(id__in=player_ids))
+    if not players:
+        return {}
+
+    found_ids = [player.id for player in players]
+    totals = {player_id: 0 for player_id in found_ids}
+    external_ids = {player_id: [] for player_id in found_ids}
+    observations = PlayerLandmarkObservation.objects.filter(player_id__in=found_ids)
+
+    if landmarks_limit > 0:
+        # Последние landmarks_limit наблюдений каждого игрока и общее количество - одним запросом
+        rows = observations.annotate(
+            row_number=Window(RowNumber(), partition_by=F('player_id'), order_by=F('observed_at').desc()),
+            total=Window(Count('id'), partition_by=F('player_id')),
+        ).filter(row_number__lte=landmarks_limit).order_by('player_id', 'row_number').values_list(
+            'player_id', 'landmark__external_id', 'total'
+        )
+        for player_id, external_id, total in rows:
+            external_ids[player_id].append(external_id)
+            totals[player_id] = total
+    else:
+        rows = observations.order_by().values('player_id').annotate(total=Count('id')).values_list('player_id', 'total')
+        totals.update(rows)
+
+    return {
+        player.id: build_player_profile(player, external_ids[player.id], totals[player.id])
+        for player in players
+    }
@@ -2,7 +2,12 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from .models import CustomUser, FriendRequest, Friendship
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .friends import MAX_BULK_FRIEND_REQUESTS
+from .profiles import MAX_BATCH_PLAYER_IDS, MAX_BATCH_LANDMARKS_LIMIT
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from .tokens import CREDENTIAL_VERSION_CLAIM, PlayerRefreshToken, set_player_claims
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=6)
@@ -36,12 +41,8 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return user
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
-    @classmethod
-    def get_token(cls, user):
-        token = super().get_token(user)
-        # Можно добавить кастомные поля прямо в токен (необязательно)
-        token['username'] = user.username
-        return token
+    # Токен содержит claims игрока (username, clan_id, level, версия авторизации)
+    token_class = PlayerRefreshToken
 
     def validate(self, attrs):
         data = super().validate(attrs)
@@ -65,6 +66,25 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         }
         return data
 
+class PlayerTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Обновление access-токена с актуальными claims игрока (клан, уровень).
+    Refresh-токен, выданный до смены пароля (другая версия учетных данных), отклоняется.
+    """
+    token_class = PlayerRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user = CustomUser.objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh.get(api_settings.USER_ID_CLAIM)}
+        ).first()
+        # Токены без версии (выданные до ее появления) считаются версией 0
+        if user is not None and refresh.get(CREDENTIAL_VERSION_CLAIM, 0) != user.credential_version:
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+        data = super().validate(attrs)
+        data["access"] = str(set_player_claims(refresh.access_token, user))
+        return data
+
 class UserLoginSerializer(serializers.Serializer):
     username = serializers.CharField(required=True)
     password = serializers.CharField(required=True, write_only=True)
@@ -88,6 +108,32 @@ class UserClothesSerializer(serializers.ModelSerializer):
         model = CustomUser
         fields = ["boots", "pants", "tshirt", "cap", "gender"]
 
+    def update(self, instance, validated_data):
+        # request.user собран из claims токена и снимка состояния (accounts.authentication):
+        # сохраняем только поля одежды, иначе save() перезапишет монеты, опыт, уровень
+        # и клан значениями из кэша
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+
+class BatchPlayerInfoSerializer(serializers.Serializer):
+    """Сериализатор для batch-запроса профилей игроков."""
+    player_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=MAX_BATCH_PLAYER_IDS,
+        help_text="Список ID игроков"
+    )
+    landmarks_limit = serializers.IntegerField(
+        required=False,
+        default=0,
+        min_value=0,
+        max_value=MAX_BATCH_LANDMARKS_LIMIT,
+        help_text="Сколько последних external_ids вернуть на игрока (0 - только количество)"
+    )
+
 
 class UserBasicSerializer(serializers.ModelSerializer):
     """Базовый сериализатор для отображения информации о пользователе в списках друзей."""
@@ -111,15 +157,18 @@ class FriendRequestSerializer(serializers.ModelSerializer):
 
 class SendFriendRequestSerializer(serializers.Serializer):
     """Сериализатор для отправки запроса дружбы."""
+    # Существование пользователя проверяет view (вместе с загрузкой для ответа)
     to_user_id = serializers.IntegerField(required=True)
-    
-    def validate_to_user_id(self, value):
-        """Проверяет, что пользователь существует и не является текущим пользователем."""
-        try:
-            user = CustomUser.objects.get(id=value)
-        except CustomUser.DoesNotExist:
-            raise serializers.ValidationError("User not found")
-        return value
+
+
+class BulkFriendRequestsSerializer(serializers.Serializer):
+    """Сериализатор для массового принятия/отклонения запросов дружбы."""
+    request_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=MAX_BULK_FRIEND_REQUESTS,
+        help_text="Список ID запросов дружбы"
+    )
 
 
 class FriendshipSerializer(serializers.ModelSerializer):
@@ -0,0 +1,253 @@
+"""
+Рекомендации друзей (друзья друзей, общий клан, общие достопримечательности).
+
+Для каждого пользователя хранится ограниченный список лучших кандидатов
+(FriendSuggestion, не больше FRIEND_SUGGESTIONS_TOP_K), поэтому
+GET /api/friends/suggestions/ - одно чтение по индексу (user, -score).
+
+Списки обновляются:
+- полностью командой rebuild_friend_suggestions (периодически);
+- точечно при принятии запроса и удалении друга: пересчитываются списки
+  обоих пользователей и оценки этой пары у их друзей (меняется число общих друзей);
+  если друзей у кого-то из пары больше FRIEND_SUGGESTIONS_INLINE_RESCORE_LIMIT,
+  оценки у друзей пересчитываются отложенно (как при массовом принятии);
+- при массовом принятии запросов в запросе пересчитывается только список
+  принявшего, остальное - отложенно (FriendSuggestionUpdate, команда
+  process_friend_suggestion_updates): пары пачки обрабатываются вместе, каждый
+  список пересчитывается один раз.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .friends import get_friend_ids
+from .models import FriendRequest, FriendSuggestion, FriendSuggestionUpdate
+
+User = get_user_model()
+
+DEFAULT_WEIGHTS = {'mutual_friends': 10, 'shared_clan': 5, 'shared_landmarks': 1}
+CANDIDATES_PER_SOURCE = 500  # Сколько кандидатов брать из каждого источника при полном пересчете
+DEFAULT_INLINE_RESCORE_LIMIT = 500
+
+
+def get_top_k():
+    return getattr(settings, 'FRIEND_SUGGESTIONS_TOP_K', 50)
+
+
+def score(mutual_friends, shared_clan, shared_landmarks):
+    weights = getattr(settings, 'FRIEND_SUGGESTION_WEIGHTS', DEFAULT_WEIGHTS)
+    return (
+        weights['mutual_friends'] * mutual_friends
+        + weights['shared_clan'] * int(shared_clan)
+        + weights['shared_landmarks'] * shared_landmarks
+    )
+
+
+def _pending_counterparts(user_id):
+    """ID пользователей, с которыми у пользователя есть необработанный запрос дружбы."""
+    rows = FriendRequest.objects.filter(
+        Q(from_user_id=user_id) | Q(to_user_id=user_id), status='pending'
+    ).values_list('from_user_id', 'to_user_id')
+    return {other for pair in rows for other in pair}
+
+
+def _observations_of(user_id):
+    from landmarks.models import PlayerLandmarkObservation
+    return PlayerLandmarkObservation.objects.filter(player_id=user_id).values('landmark_id')
+
+
+def compute_suggestions(user_id):
+    """
+    Полный пересчет кандидатов пользователя.
+
+    Returns:
+        list[FriendSuggestion]: Лучшие кандидаты (не больше top-K), не сохранены
+    """
+    from landmarks.models import PlayerLandmarkObservation
+    from .models import FriendEdge
+
+    friend_ids = get_friend_ids(user_id)
+    excluded = set(friend_ids) | _pending_counterparts(user_id) | {user_id}
+    features = {}
+
+    def feature(candidate_id):
+        return features.setdefault(candidate_id, {'mutual_friends': 0, 'shared_clan': False, 'shared_landmarks': 0})
+
+    if friend_ids:
+        mutual = FriendEdge.objects.filter(user_id__in=friend_ids).exclude(friend_id__in=excluded).values(
+            'friend_id'
+        ).annotate(total=Count('id')).order_by('-total').values_list('friend_id', 'total')[:CANDIDATES_PER_SOURCE]
+        for candidate_id, total in mutual:
+            feature(candidate_id)['mutual_friends'] = total
+
+    clan_id = User.objects.filter(id=user_id).values_list('clan_id', flat=True).first()
+    if clan_id is not None:
+        members = User.objects.filter(clan_id=clan_id).exclude(id__in=excluded).values_list(
+            'id', flat=True
+        )[:CANDIDATES_PER_SOURCE]
+        for candidate_id in members:
+            feature(candidate_id)['shared_clan'] = True
+
+    overlap = PlayerLandmarkObservation.objects.filter(landmark_id__in=_observations_of(user_id)).exclude(
+        player_id__in=excluded
+    ).values('player_id').annotate(total=Count('id')).order_by('-total').values_list(
+        'player_id', 'total'
+    )[:CANDIDATES_PER_SOURCE]
+    for candidate_id, total in overlap:
+        feature(candidate_id)['shared_landmarks'] = total
+
+    now = timezone.now()
+    suggestions = [
+        FriendSuggestion(user_id=user_id, candidate_id=candidate_id, score=score(**values), updated_at=now, **values)
+        for candidate_id, values in features.items()
+    ]
+    suggestions.sort(key=lambda suggestion: (-suggestion.score, suggestion.candidate_id))
+    return suggestions[:get_top_k()]
+
+
+def refresh_suggestions(user_id):
+    """Пересчитывает и заменяет список кандидатов пользователя."""
+    suggestions = compute_suggestions(user_id)
+    with transaction.atomic():
+        FriendSuggestion.objects.filter(user_id=user_id).delete()
+        FriendSuggestion.objects.bulk_create(suggestions)
+    return suggestions
+
+
+def _rescore_candidate(user_ids, candidate_id):
+    """
+    Пересчитывает оценку кандидата candidate_id в списках пользователей user_ids
+    (фиксированное число запросов) и обрезает списки до top-K.
+    """
+    from landmarks.models import PlayerLandmarkObservation
+
+    user_ids = set(user_ids) - {candidate_id}
+    if not user_ids:
+        return
+
+    candidate_friends = get_friend_ids(candidate_id)
+    clans = dict(User.objects.filter(id__in=user_ids | {candidate_id}).values_list('id', 'clan_id'))
+    candidate_clan = clans.get(candidate_id)
+    overlap = dict(
+        PlayerLandmarkObservation.objects.filter(
+            player_id__in=user_ids, landmark_id__in=_observations_of(candidate_id)
+        ).values('player_id').annotate(total=Count('id')).values_list('player_id', 'total')
+    )
+    pending = set(FriendRequest.objects.filter(
+        Q(from_user_id=candidate_id, to_user_id__in=user_ids) | Q(to_user_id=candidate_id, from_user_id__in=user_ids),
+        status='pending'
+    ).values_list('from_user_id', 'to_user_id'))
+    pending = {user_id for pair in pending for user_id in pair}
+
+    now = timezone.now()
+    upserts = []
+    stale = []
+    for user_id in user_ids:
+        if user_id in candidate_friends or user_id in pending:
+            stale.append(user_id)
+            continue
+        values = {
+            'mutual_friends': len(get_friend_ids(user_id) & candidate_friends),
+            'shared_clan': candidate_clan is not None and clans.get(user_id) == candidate_clan,
+            'shared_landmarks': overlap.get(user_id, 0),
+        }
+        value = score(**values)
+        if value <= 0:
+            stale.append(user_id)
+            continue
+        upserts.append(FriendSuggestion(user_id=user_id, candidate_id=candidate_id, score=value, updated_at=now, **values))
+
+    with transaction.atomic():
+        if stale:
+            FriendSuggestion.objects.filter(user_id__in=stale, candidate_id=candidate_id).delete()
+        if upserts:
+            FriendSuggestion.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=['user', 'candidate'],
+                update_fields=['score', 'mutual_friends', 'shared_clan', 'shared_landmarks', 'updated_at'],
+            )
+            _trim([suggestion.user_id for suggestion in upserts])
+
+
+def _trim(user_ids):
+    """Удаляет кандидатов за пределами top-K."""
+    top_k = get_top_k()
+    rows = FriendSuggestion.objects.filter(user_id__in=user_ids).order_by('user_id', '-score', 'candidate_id').values_list(
+        'id', 'user_id'
+    )
+    extra = []
+    seen = {}
+    for suggestion_id, user_id in rows:
+        seen[user_id] = seen.get(user_id, 0) + 1
+        if seen[user_id] > top_k:
+            extra.append(suggestion_id)
+    if extra:
+        FriendSuggestion.objects.filter(id__in=extra).delete()
+
+
+def on_friendship_changed(user_id, friend_id):
+    """
+    Обновляет рекомендации после принятия запроса или удаления друга:
+    списки обоих пользователей пересчитываются полностью, у их друзей
+    пересчитывается оценка второго пользователя пары. Если друзей больше
+    FRIEND_SUGGESTIONS_INLINE_RESCORE_LIMIT, оценки у друзей ставятся в очередь
+    FriendSuggestionUpdate, чтобы запрос оставался ограниченным по времени.
+    """
+    refresh_suggestions(user_id)
+    refresh_suggestions(friend_id)
+
+    user_friends = get_friend_ids(user_id)
+    friend_friends = get_friend_ids(friend_id)
+    limit = getattr(settings, 'FRIEND_SUGGESTIONS_INLINE_RESCORE_LIMIT', DEFAULT_INLINE_RESCORE_LIMIT)
+    if len(user_friends) > limit or len(friend_friends) > limit:
+        FriendSuggestionUpdate.objects.create(user_id=user_id, friend_id=friend_id)
+        return
+    # Списки самой пары только что пересчитаны полностью
+    _rescore_candidate(user_friends - {friend_id}, friend_id)
+    _rescore_candidate(friend_friends - {user_id}, user_id)
+
+
+def on_friendships_changed(user_id, friend_ids):
+    """
+    То же для нескольких друзей одного пользователя (массовое принятие запросов):
+    в запросе пересчитывается только список user_id и удаляются рекомендации
+    новых друзей друг другу, остальное ставится в очередь FriendSuggestionUpdate.
+    """
+    refresh_suggestions(user_id)
+    FriendSuggestion.objects.filter(user_id__in=friend_ids, candidate_id=user_id).delete()
+    FriendSuggestionUpdate.objects.bulk_create(
+        [FriendSuggestionUpdate(user_id=user_id, friend_id=friend_id) for friend_id in friend_ids]
+    )
+
+
+def process_friendship_updates(batch_size=500):
+    """
+    Обрабатывает пачку отложенных обновлений: каждый затронутый список
+    пересчитывается один раз, оценка каждого кандидата у друзей второго
+    пользователя пары - одним проходом _rescore_candidate.
+
+    Returns:
+        int: Количество обработанных обновлений
+    """
+    updates = list(FriendSuggestionUpdate.objects.order_by('id').values_list('id', 'user_id', 'friend_id')[:batch_size])
+    if not updates:
+        return 0
+    pairs = {(user_id, friend_id) for _update_id, user_id, friend_id in updates}
+    affected = {user_id for pair in pairs for user_id in pair}
+    for user_id in sorted(affected):
+        refresh_suggestions(user_id)
+
+    friend_ids = {user_id: get_friend_ids(user_id) for user_id in affected}
+    rescore = {}
+    for user_id, friend_id in pairs:
+        rescore.setdefault(friend_id, set()).update(friend_ids[user_id])
+        rescore.setdefault(user_id, set()).update(friend_ids[friend_id])
+    for candidate_id, user_ids in rescore.items():
+        # Списки, пересчитанные полностью выше, уже актуальны
+        _rescore_candidate(user_ids - affected, candidate_id)
+
+    FriendSuggestionUpdate.objects.filter(id__in=[update_id for update_id, _user_id, _friend_id in updates]).delete()
+    return len(updates)
@@ -1,3 +1,179 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db.models import F
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts import friends
+from accounts.friends import add_friendship, are_friends, get_friend_ids
+from accounts.leveling import LevelCurve, recompute_levels
+from accounts.suggestions import refresh_suggestions
+from accounts.models import CustomUser, FriendRequest, FriendSuggestion
+from accounts.tokens import PlayerRefreshToken
+
+
+class TokenRevocationTests(TestCase):
+    """Смена пароля отзывает токены, смена уровня - только помечает claims устаревшими."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='player', password='secret-password')
+        self.refresh = PlayerRefreshToken.for_user(self.user)
+        self.client = APIClient()
+
+    def test_refresh_is_rejected_after_password_change(self):
+        self.user.set_password('new-password')
+        self.user.save(update_fields=['password'])
+
+        response = self.client.post('/api/token/refresh/', {'refresh': str(self.refresh)}, format='json')
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'token_revoked')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+        self.assertEqual(self.client.get('/api/friends/').status_code, 401)
+
+    def test_level_up_keeps_token_valid_with_current_level(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+        self.user.add_experience(5000)
+
+        response = self.client.get('/api/player/stats/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Token-Stale'], 'true')
+        self.assertEqual(response.data['player_stats']['level'], CustomUser.objects.get(pk=self.user.pk).level)
+        self.assertGreater(response.data['player_stats']['level'], 1)
+        refreshed = self.client.post('/api/token/refresh/', {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(refreshed.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refreshed.data["access"]}')
+        self.assertFalse(self.client.get('/api/friends/').has_header('X-Token-Stale'))
+
+
+class RecomputeLevelsTests(TestCase):
+    """Пересчет уровней по новой кривой."""
+
+    def test_user_without_total_experience_is_skipped(self):
+        legacy = CustomUser.objects.create(username='legacy', password='!', level=5, experience=300)
+        CustomUser.objects.filter(id=legacy.id).update(total_experience=0)
+        backfilled = CustomUser.objects.create(username='backfilled', password='!')
+        CustomUser.objects.filter(id=backfilled.id).update(total_experience=2500, level=1, experience=0)
+
+        changed = recompute_levels(curve=LevelCurve([0, 1000, 2000, 3000]))
+
+        self.assertEqual(changed, 1)
+        legacy.refresh_from_db()
+        self.assertEqual((legacy.level, legacy.experience, legacy.total_experience), (5, 300, 0))
+        backfilled.refresh_from_db()
+        self.assertEqual((backfilled.level, backfilled.experience), (3, 500))
+
+
+class UpdateClothesTests(TestCase):
+    """Пользователь из claims токена не перезаписывает поля вне запроса."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='player', password='secret-password')
+        self.client = APIClient()
+        token = PlayerRefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_update_keeps_balance_changed_after_authentication_state_was_cached(self):
+        # Снимок состояния попадает в кэш с coins=0; начисление параллельного
+        # запроса, закоммиченное после аутентификации, в снимке еще не видно
+        self.assertEqual(self.client.get('/api/friends/').status_code, 200)
+        CustomUser.objects.filter(pk=self.user.pk).update(coins=F('coins') + 500)
+
+        response = self.client.patch('/api/update-clothes/', {'boots': 3}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.boots, 3)
+        self.assertEqual(self.user.coins, 500)
+
+
+class AcceptFriendRequestTests(TestCase):
+    """Запрос дружбы принимается вместе с созданием дружбы или остается необработанным."""
+
+    def setUp(self):
+        cache.clear()
+        self.sender = CustomUser.objects.create_user(username='sender', password='secret-password')
+        self.receiver = CustomUser.objects.create_user(username='receiver', password='secret-password')
+        self.friend_request = FriendRequest.objects.create(from_user=self.sender, to_user=self.receiver)
+        self.client = APIClient()
+        self.client.force_authenticate(self.receiver)
+        self.url = f'/api/friends/requests/{self.friend_request.id}/accept/'
+
+    def test_failed_friendship_keeps_request_pending(self):
+        with mock.patch('accounts.views.add_friendship', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(self.url)
+
+        self.friend_request.refresh_from_db()
+        self.assertEqual(self.friend_request.status, 'pending')
+        self.assertEqual(self.client.post(self.url).status_code, 200)
+        self.assertTrue(are_friends(self.receiver.id, self.sender.id))
+
+    def test_already_friends_closes_request(self):
+        add_friendship(self.sender.id, self.receiver.id)
+        CustomUser.objects.filter(id=self.receiver.id).update(pending_friend_requests_count=1)
+
+        self.assertEqual(self.client.post(self.url).status_code, 400)
+        self.friend_request.refresh_from_db()
+        self.assertEqual(self.friend_request.status, 'accepted')
+        self.receiver.refresh_from_db()
+        self.assertEqual(self.receiver.pending_friend_requests_count, 0)
+
+
+class FriendIdsCacheTests(TestCase):
+    """Множество друзей, прочитанное до изменения дружбы, не попадает в кэш поверх сброса."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='user', password='secret-password')
+        self.friend = CustomUser.objects.create_user(username='friend', password='secret-password')
+
+    def test_stale_fill_does_not_outlive_invalidation(self):
+        real_add = cache.add
+
+        def add_after_concurrent_change(key, *args, **kwargs):
+            # Дружба создана и закоммичена между чтением ребер и записью в кэш
+            if key.startswith('accounts:friend_ids:'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    add_friendship(self.user.id, self.friend.id)
+            return real_add(key, *args, **kwargs)
+
+        with mock.patch.object(friends.cache, 'add', side_effect=add_after_concurrent_change):
+            self.assertEqual(get_friend_ids(self.user.id), frozenset())
+
+        self.assertEqual(get_friend_ids(self.user.id), frozenset({self.friend.id}))
+
+
+class FriendSuggestionsTests(TestCase):
+    """Рекомендации обновляются сразу после принятия запроса."""
+
+    def setUp(self):
+        cache.clear()
+        self.sender, self.receiver, self.mutual, self.other = [
+            CustomUser.objects.create_user(username=name, password='secret-password')
+            for name in ('sender', 'receiver', 'mutual', 'other')
+        ]
+        add_friendship(self.sender.id, self.mutual.id)
+        add_friendship(self.receiver.id, self.mutual.id)
+        add_friendship(self.sender.id, self.other.id)
+        for user in (self.sender, self.receiver, self.mutual, self.other):
+            refresh_suggestions(user.id)
+        self.friend_request = FriendRequest.objects.create(from_user=self.sender, to_user=self.receiver)
+        self.client = APIClient()
+        self.client.force_authenticate(self.receiver)
+
+    def candidates(self, user):
+        return set(FriendSuggestion.objects.filter(user=user).values_list('candidate_id', flat=True))
+
+    def test_accept_updates_both_lists_and_friends_scores(self):
+        response = self.client.post(f'/api/friends/requests/{self.friend_request.id}/accept/')
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(self.sender.id, self.candidates(self.receiver))
+        self.assertNotIn(self.receiver.id, self.candidates(self.sender))
+        # У друга отправителя появился общий друг с принявшим
+        self.assertIn(self.receiver.id, self.candidates(self.other))
@@ -0,0 +1,30 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# Claims, которые кладутся в токен и позволяют собрать пользователя без запроса в БД.
+# Изменение clan или level повышает auth_version пользователя: токен со старой версией
+# принимается, но claims заменяются значениями из БД (см. accounts.authentication).
+AUTH_VERSION_CLAIM = 'av'
+# Смена пароля повышает credential_version: access- и refresh-токены со старой версией отклоняются
+CREDENTIAL_VERSION_CLAIM = 'cv'
+
+
+def set_player_claims(token, user):
+    """Записывает в токен актуальные claims игрока."""
+    token['username'] = user.username
+    token['clan_id'] = user.clan_id
+    token['level'] = user.level
+    token[AUTH_VERSION_CLAIM] = user.auth_version
+    token[CREDENTIAL_VERSION_CLAIM] = user.credential_version
+    return token
+
+
+class PlayerRefreshToken(RefreshToken):
+    """
+    Refresh-токен с claims игрока.
+    Access-токен, полученный из него, наследует эти claims.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        return set_player_claims(token, user)
@@ -1,9 +1,11 @@
 from django.urls import path
 from .views import (
     RegisterAPIView, LoginAPIView, CustomLoginView, UpdateClothesAPIView, 
-    GetPlayerInfoView, GetPlayerLandmarksView, GetCurrentUserStatsView, GetCurrentUserCoinsView,
+    GetPlayerInfoView, BatchPlayerInfoView, GetPlayerLandmarksView, GetCurrentUserStatsView, GetCurrentUserCoinsView,
+    PlayerProfileCacheStatsView,
     SendFriendRequestView, AcceptFriendRequestView, RejectFriendRequestView,
-    GetFriendsListView, GetPendingFriendRequestsView, GetSentFriendRequestsView, RemoveFriendView
+    BulkAcceptFriendRequestsView, BulkRejectFriendRequestsView, FriendRequestCountsView,
+    GetFriendsListView, FriendSuggestionsView, GetPendingFriendRequestsView, GetSentFriendRequestsView, RemoveFriendView
 )
 
 
@@ -12,15 +14,21 @@ urlpatterns = [
     path("login/", CustomLoginView.as_view(), name="login"),
     path("update-clothes/", UpdateClothesAPIView.as_view(), name="update-clothes"),
     path("player/<int:player_id>/", GetPlayerInfoView.as_view(), name="get-player-info"),
+    path("players/batch/", BatchPlayerInfoView.as_view(), name="batch-player-info"),
     path("player/<int:player_id>/landmarks/", GetPlayerLandmarksView.as_view(), name="get-player-landmarks"),
     path("player/stats/", GetCurrentUserStatsView.as_view(), name="get-current-user-stats"),
+    path("player/profile-cache/stats/", PlayerProfileCacheStatsView.as_view(), name="player-profile-cache-stats"),
     path("player/coins/", GetCurrentUserCoinsView.as_view(), name="get-current-user-coins"),
     
     # Friend system endpoints
     path("friends/", GetFriendsListView.as_view(), name="get-friends-list"),
+    path("friends/suggestions/", FriendSuggestionsView.as_view(), name="friend-suggestions"),
     path("friends/requests/send/", SendFriendRequestView.as_view(), name="send-friend-request"),
     path("friends/requests/pending/", GetPendingFriendRequestsView.as_view(), name="get-pending-friend-requests"),
     path("friends/requests/sent/", GetSentFriendRequestsView.as_view(), name="get-sent-friend-requests"),
+    path("friends/requests/counts/", FriendRequestCountsView.as_view(), name="friend-request-counts"),
+    path("friends/requests/bulk-accept/", BulkAcceptFriendRequestsView.as_view(), name="bulk-accept-friend-requests"),
+    path("friends/requests/bulk-reject/", BulkRejectFriendRequestsView.as_view(), name="bulk-reject-friend-requests"),
     path("friends/requests/<int:request_id>/accept/", AcceptFriendRequestView.as_view(), name="accept-friend-request"),
     path("friends/requests/<int:request_id>/reject/", RejectFriendRequestView.as_view(), name="reject-friend-request"),
     path("friends/<int:friend_id>/remove/", RemoveFriendView.as_view(), name="remove-friend"),
@@ -2,19 +2,32 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.db.models import Q
+from django.utils import timezone
 
 User = get_user_model()
 CustomUser = User  # Для совместимости
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, UserClothesSerializer, 
     CustomTokenObtainPairSerializer, FriendRequestSerializer, SendFriendRequestSerializer,
-    FriendshipSerializer, UserBasicSerializer
+    FriendshipSerializer, UserBasicSerializer, BatchPlayerInfoSerializer, BulkFriendRequestsSerializer
 )
-from .models import FriendRequest, Friendship
+from .models import FriendRequest, FriendSuggestion, Friendship
+from .friends import (
+    FRIEND_FIELDS, add_friendship, add_friendships, are_friends, canonical_pair, get_friends, iterate_friends,
+    get_pending_request_between, remove_friendship, respond_to_friend_request, respond_to_friend_requests,
+    send_friend_request
+)
+from .suggestions import on_friendship_changed, on_friendships_changed
+from myproject.streaming import get_stream_format, iterate_serialized, stream_list_response
+from .profiles import load_player_profiles
+from .profile_cache import (
+    get_player_profile, get_player_landmarks, invalidate_player_profile, iterate_player_landmarks, player_profiles
+)
+from .tokens import PlayerRefreshToken
 
 class CustomLoginView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
@@ -28,7 +41,7 @@ class RegisterAPIView(APIView):
             user = serializer.save()
 
             # Генерация JWT токенов
-            refresh = RefreshToken.for_user(user)
+            refresh = PlayerRefreshToken.for_user(user)
 
             return Response({
                 "success": True,
@@ -79,6 +92,7 @@ class UpdateClothesAPIView(APIView):
         serializer = UserClothesSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            invalidate_player_profile(user.id)
             return Response({
                 "success": True,
                 "message": "Clothes updated successfully",
@@ -106,82 +120,59 @@ class GetPlayerInfoView(APIView):
                 "error": "player_id must be a valid integer"
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Получаем игрока с кланом
-        try:
-            player = User.objects.select_related('clan').get(id=player_id)
-        except User.DoesNotExist:
+        # Профиль берется из кэша, инвалидируемого при изменении данных игрока
+        profile = get_player_profile(player_id)
+        if profile is None:
             return Response({
                 "success": False,
                 "error": f"Player with ID {player_id} not found"
             }, status=status.HTTP_404_NOT_FOUND)
 
-        # Получаем достопримечательности игрока
-        try:
-            from landmarks.models import PlayerLandmarkObservation
-            observations = PlayerLandmarkObservation.objects.filter(player=player)
-            external_ids = [obs.external_id for obs in observations]
-        except Exception:
-            # Если landmarks app не доступен, возвращаем пустой список
-            external_ids = []
-
-        # Форматируем дату регистрации
-        registration_date = player.registration_date.isoformat() if player.registration_date else None
-
-        # Формируем информацию о клане - всегда включаем поле, даже если клана нет
-        clan_info = None
-        try:
-            # Проверяем наличие клана у игрока
-            if hasattr(player, 'clan_id') and player.clan_id is not None:
-                # Пробуем получить клан через select_related (уже загружен)
-                if hasattr(player, 'clan') and player.clan is not None:
-                    clan_info = {
-                        "id": player.clan.id,
-                        "name": player.clan.name,
-                        "description": player.clan.description or ""
-                    }
-                else:
-                    # Если клан не загружен через select_related, загружаем его отдельным запросом
-                    from clans.models import Clan
-                    try:
-                        clan = Clan.objects.get(id=player.clan_id)
-                        clan_info = {
-                            "id": clan.id,
-                            "name": clan.name,
-                            "description": clan.description or ""
-                        }
-                    except Clan.DoesNotExist:
-                        clan_info = None
-        except Exception as e:
-            # Если возникла ошибка при получении информации о клане, оставляем None
-            # В production можно залогировать ошибку: import logging; logging.error(f"Error getting clan: {e}")
-            clan_info = None
-
         # Формируем ответ - всегда включаем поле clan
-        response_data = {
+        return Response({
             "success": True,
-            "player": {
-                "id": player.id,
-                "player_id": player.id,
-                "username": player.username,
-                "first_name": player.first_name or "",
-                "last_name": player.last_name or "",
-                "registration_date": registration_date,
-                "gender": player.gender if hasattr(player, 'gender') else None,
-                "clan": clan_info,
-                "landmarks": {
-                    "external_ids": external_ids,
-                    "total_count": len(external_ids)
-                }
-            }
-        }
-        
-        return Response(response_data, status=status.HTTP_200_OK)
+            "player": profile
+        }, status=status.HTTP_200_OK)
+
+
+class BatchPlayerInfoView(APIView):
+    """
+    API endpoint для получения профилей нескольких игроков одним запросом.
+    POST /api/players/batch/
+    Body: {"player_ids": [1, 2, 3], "landmarks_limit": 20}
+
+    Профили имеют тот же формат, что и в GET /api/player/<id>/.
+    landmarks_limit - сколько последних external_ids вернуть на игрока
+    (по умолчанию 0 - только total_count).
+    Число запросов к БД не зависит от количества игроков.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchPlayerInfoSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                "success": False,
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Убираем дубликаты, сохраняя порядок
+        player_ids = list(dict.fromkeys(serializer.validated_data['player_ids']))
+        profiles = load_player_profiles(player_ids, serializer.validated_data['landmarks_limit'])
+
+        return Response({
+            "success": True,
+            "players": [profiles[player_id] for player_id in player_ids if player_id in profiles],
+            "not_found": [player_id for player_id in player_ids if player_id not in profiles],
+            "total_count": len(profiles)
+        }, status=status.HTTP_200_OK)
 
 
 class GetPlayerLandmarksView(APIView):
     """
     API endpoint для получения списка всех достопримечательностей по ID пользователя.
     Возвращает только список external_ids (ID из Wikipedia API).
+    ?stream=json|ndjson - потоковый ответ из БД без сборки списка в памяти (myproject.streaming).
     """
     permission_classes = [IsAuthenticated]
 
@@ -194,36 +185,46 @@ class GetPlayerLandmarksView(APIView):
                 "error": "player_id must be a valid integer"
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Получаем игрока
-        try:
-            player = User.objects.get(id=player_id)
-        except User.DoesNotExist:
+        stream = get_stream_format(request)
+
+        # Список берется из кэша, инвалидируемого при сохранении наблюдений;
+        # потоковый ответ читает его курсором из БД
+        landmarks = iterate_player_landmarks(player_id) if stream else get_player_landmarks(player_id)
+        if landmarks is None:
             return Response({
                 "success": False,
                 "error": f"Player with ID {player_id} not found"
             }, status=status.HTTP_404_NOT_FOUND)
 
-        # Получаем достопримечательности игрока
-        try:
-            from landmarks.models import PlayerLandmarkObservation
-            observations = PlayerLandmarkObservation.objects.filter(player=player).order_by('-observed_at')
-            external_ids = [obs.external_id for obs in observations]
-        except Exception as e:
-            # Если landmarks app не доступен, возвращаем ошибку
-            return Response({
-                "success": False,
-                "error": "Landmarks service is not available"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
+        username, external_ids = landmarks
+        if stream:
+            return stream_list_response(
+                stream, {"success": True, "player_id": player_id, "player_username": username}, 'external_ids', external_ids
+            )
         return Response({
             "success": True,
-            "player_id": player.id,
-            "player_username": player.username,
+            "player_id": player_id,
+            "player_username": username,
             "external_ids": external_ids,
             "total_count": len(external_ids)
         }, status=status.HTTP_200_OK)
 
 
+class PlayerProfileCacheStatsView(APIView):
+    """
+    API endpoint для статистики кэша профилей игроков (только для администраторов).
+    GET /api/player/profile-cache/stats/
+    Счетчики относятся к воркеру, обработавшему запрос.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            "success": True,
+            "profile_cache": player_profiles.stats()
+        }, status=status.HTTP_200_OK)
+
+
 class GetCurrentUserStatsView(APIView):
     """
     API endpoint для получения статистики текущего авторизованного пользователя.
@@ -233,6 +234,7 @@ class GetCurrentUserStatsView(APIView):
 
     def get(self, request):
         user = request.user
+        experience_per_level = user.get_experience_per_level()
         
         return Response({
             "success": True,
@@ -244,11 +246,11 @@ class GetCurrentUserStatsView(APIView):
                 "experience": user.experience,
                 "level": user.level,
                 "experience_to_next_level": user.get_experience_to_next_level(),
-                "experience_per_level": user.EXPERIENCE_PER_LEVEL,
+                "experience_per_level": experience_per_level,
                 "progress_to_next_level_percent": round(
-                    (user.experience / user.EXPERIENCE_PER_LEVEL) * 100, 
+                    (user.experience / experience_per_level) * 100, 
                     2
-                ) if user.EXPERIENCE_PER_LEVEL > 0 else 0
+                ) if experience_per_level > 0 else 0
             }
         }, status=status.HTTP_200_OK)
 
@@ -288,56 +290,47 @@ class SendFriendRequestView(APIView):
                 "errors": serializer.errors
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        from_user = request.user
+        from_user_id = request.user.id
         to_user_id = serializer.validated_data['to_user_id']
         
-        try:
-            to_user = User.objects.get(id=to_user_id)
-        except User.DoesNotExist:
+        # Проверяем, что пользователь не отправляет запрос самому себе
+        if from_user_id == to_user_id:
             return Response({
                 "success": False,
-                "error": "User not found"
-            }, status=status.HTTP_404_NOT_FOUND)
+                "error": "Cannot send friend request to yourself"
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Проверяем, что пользователь не отправляет запрос самому себе
-        if from_user == to_user:
+        # Оба пользователя одним запросом (нужны и для ответа)
+        users = User.objects.only(*FRIEND_FIELDS).in_bulk([from_user_id, to_user_id])
+        if to_user_id not in users:
             return Response({
                 "success": False,
-                "error": "Cannot send friend request to yourself"
+                "errors": {"to_user_id": ["User not found"]}
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Проверяем, не являются ли они уже друзьями
-        if Friendship.are_friends(from_user, to_user):
+        if are_friends(from_user_id, to_user_id):
             return Response({
                 "success": False,
                 "error": "You are already friends with this user"
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Проверяем, есть ли уже активный запрос
-        existing_request = FriendRequest.objects.filter(
-            (Q(from_user=from_user) & Q(to_user=to_user)) |
-            (Q(from_user=to_user) & Q(to_user=from_user)),
-            status='pending'
-        ).first()
-        
-        if existing_request:
-            if existing_request.from_user == from_user:
+        # Создаём запрос; второй необработанный запрос для пары отклоняет ограничение в БД
+        friend_request = send_friend_request(from_user_id, to_user_id)
+        if friend_request is None:
+            existing_request = get_pending_request_between(from_user_id, to_user_id)
+            if existing_request is None or existing_request.from_user_id == from_user_id:
                 return Response({
                     "success": False,
                     "error": "Friend request already sent"
                 }, status=status.HTTP_400_BAD_REQUEST)
-            else:
-                return Response({
-                    "success": False,
-                    "error": "This user has already sent you a friend request. Please accept it instead."
-                }, status=status.HTTP_400_BAD_REQUEST)
+            return Response({
+                "success": False,
+                "error": "This user has already sent you a friend request. Please accept it instead."
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Создаём новый запрос
-        friend_request = FriendRequest.objects.create(
-            from_user=from_user,
-            to_user=to_user,
-            status='pending'
-        )
+        friend_request.from_user = users[from_user_id]
+        friend_request.to_user = users[to_user_id]
         
         return Response({
             "success": True,
@@ -346,6 +339,19 @@ class SendFriendRequestView(APIView):
         }, status=status.HTTP_201_CREATED)
 
 
+def friend_request_error_response(request_id, action):
+    """Ответ на попытку обработать запрос, который не найден, уже обработан или адресован другому."""
+    if FriendRequest.objects.filter(id=request_id, status='pending').exists():
+        return Response({
+            "success": False,
+            "error": f"You are not authorized to {action} this request"
+        }, status=status.HTTP_403_FORBIDDEN)
+    return Response({
+        "success": False,
+        "error": "Friend request not found or already processed"
+    }, status=status.HTTP_404_NOT_FOUND)
+
+
 class AcceptFriendRequestView(APIView):
     """
     API endpoint для принятия запроса дружбы.
@@ -354,38 +360,34 @@ class AcceptFriendRequestView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, request_id):
-        try:
-            friend_request = FriendRequest.objects.get(id=request_id, status='pending')
-        except FriendRequest.DoesNotExist:
-            return Response({
-                "success": False,
-                "error": "Friend request not found or already processed"
-            }, status=status.HTTP_404_NOT_FOUND)
+        user_id = request.user.id
         
-        # Проверяем, что текущий пользователь - получатель запроса
-        if friend_request.to_user != request.user:
-            return Response({
-                "success": False,
-                "error": "You are not authorized to accept this request"
-            }, status=status.HTTP_403_FORBIDDEN)
+        from_user_id = FriendRequest.objects.filter(
+            id=request_id, to_user_id=user_id, status='pending'
+        ).values_list('from_user_id', flat=True).first()
+        if from_user_id is None:
+            return friend_request_error_response(request_id, 'accept')
         
-        # Проверяем, не являются ли они уже друзьями
-        if Friendship.are_friends(friend_request.from_user, friend_request.to_user):
-            friend_request.status = 'accepted'
-            friend_request.save()
+        # Уже друзья: запрос закрывается как принятый, чтобы не висел в счетчике и списке входящих
+        if are_friends(user_id, from_user_id):
+            respond_to_friend_request(request_id, user_id, 'accepted')
             return Response({
                 "success": False,
                 "error": "You are already friends"
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Создаём дружбу (порядок user1 < user2 для избежания дубликатов)
-        user1, user2 = sorted([friend_request.from_user, friend_request.to_user], key=lambda u: u.id)
-        friendship = Friendship.objects.create(user1=user1, user2=user2)
-        
-        # Обновляем статус запроса
-        friend_request.status = 'accepted'
-        friend_request.save()
-        
+        # Принятие и дружба - одна транзакция: при ошибке запрос остается необработанным
+        # и его можно принять повторно (как в BulkAcceptFriendRequestsView)
+        with transaction.atomic():
+            # Условный UPDATE: при повторном или параллельном нажатии запрос принимается один раз
+            if respond_to_friend_request(request_id, user_id, 'accepted') is None:
+                return friend_request_error_response(request_id, 'accept')
+            # Создаём дружбу и ребра графа друзей
+            add_friendship(user_id, from_user_id)
+        on_friendship_changed(user_id, from_user_id)
+        
+        user1_id, user2_id = canonical_pair(user_id, from_user_id)
+        friendship = Friendship.objects.select_related('user1', 'user2').get(user1_id=user1_id, user2_id=user2_id)
         return Response({
             "success": True,
             "message": "Friend request accepted",
@@ -401,28 +403,95 @@ class RejectFriendRequestView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, request_id):
-        try:
-            friend_request = FriendRequest.objects.get(id=request_id, status='pending')
-        except FriendRequest.DoesNotExist:
+        if respond_to_friend_request(request_id, request.user.id, 'rejected') is None:
+            return friend_request_error_response(request_id, 'reject')
+        
+        return Response({
+            "success": True,
+            "message": "Friend request rejected"
+        }, status=status.HTTP_200_OK)
+
+
+class BulkAcceptFriendRequestsView(APIView):
+    """
+    API endpoint для массового принятия запросов дружбы (одна транзакция).
+    POST /api/friends/requests/bulk-accept/
+    Body: {"request_ids": [1, 2, 3]}
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkFriendRequestsSerializer(data=request.data)
+        if not serializer.is_valid():
             return Response({
                 "success": False,
-                "error": "Friend request not found or already processed"
-            }, status=status.HTTP_404_NOT_FOUND)
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        user_id = request.user.id
+        request_ids = list(dict.fromkeys(serializer.validated_data['request_ids']))
+        
+        with transaction.atomic():
+            processed = respond_to_friend_requests(request_ids, user_id, 'accepted')
+            friend_ids = [processed[request_id] for request_id in request_ids if request_id in processed]
+            if friend_ids:
+                add_friendships(user_id, friend_ids)
         
-        # Проверяем, что текущий пользователь - получатель запроса
-        if friend_request.to_user != request.user:
+        if friend_ids:
+            on_friendships_changed(user_id, friend_ids)
+        friends = User.objects.only(*FRIEND_FIELDS).in_bulk(friend_ids)
+        
+        return Response({
+            "success": True,
+            "accepted": [request_id for request_id in request_ids if request_id in processed],
+            "not_processed": [request_id for request_id in request_ids if request_id not in processed],
+            "friends": UserBasicSerializer([friends[friend_id] for friend_id in friend_ids if friend_id in friends], many=True).data
+        }, status=status.HTTP_200_OK)
+
+
+class BulkRejectFriendRequestsView(APIView):
+    """
+    API endpoint для массового отклонения запросов дружбы (одна транзакция).
+    POST /api/friends/requests/bulk-reject/
+    Body: {"request_ids": [1, 2, 3]}
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkFriendRequestsSerializer(data=request.data)
+        if not serializer.is_valid():
             return Response({
                 "success": False,
-                "error": "You are not authorized to reject this request"
-            }, status=status.HTTP_403_FORBIDDEN)
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Обновляем статус запроса
-        friend_request.status = 'rejected'
-        friend_request.save()
+        request_ids = list(dict.fromkeys(serializer.validated_data['request_ids']))
+        processed = respond_to_friend_requests(request_ids, request.user.id, 'rejected')
         
         return Response({
             "success": True,
-            "message": "Friend request rejected"
+            "rejected": [request_id for request_id in request_ids if request_id in processed],
+            "not_processed": [request_id for request_id in request_ids if request_id not in processed]
+        }, status=status.HTTP_200_OK)
+
+
+class FriendRequestCountsView(APIView):
+    """
+    API endpoint для бейджа запросов дружбы: количество входящих и отправленных
+    необработанных запросов (счетчики хранятся у пользователя, один запрос к БД).
+    GET /api/friends/requests/counts/
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        pending_count, sent_count = User.objects.filter(id=request.user.id).values_list(
+            'pending_friend_requests_count', 'sent_friend_requests_count'
+        ).get()
+        
+        return Response({
+            "success": True,
+            "pending_count": pending_count,
+            "sent_count": sent_count
         }, status=status.HTTP_200_OK)
 
 
@@ -430,25 +499,18 @@ class GetFriendsListView(APIView):
     """
     API endpoint для получения списка всех друзей текущего пользователя.
     GET /api/friends/
+    ?stream=json|ndjson - потоковый ответ без сборки списка в памяти (myproject.streaming).
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        friends = Friendship.get_friends(user)
-        
-        # Формируем список дружеских отношений с информацией о друге
-        friendships = Friendship.objects.filter(
-            Q(user1=user) | Q(user2=user)
-        )
-        
-        serializer = FriendshipSerializer(friendships, many=True, context={'request': request})
-        
-        # Извлекаем только информацию о друзьях из сериализатора
-        friends_data = []
-        for item in serializer.data:
-            if item.get('friend'):
-                friends_data.append(item['friend'])
+        stream = get_stream_format(request)
+        if stream:
+            return stream_list_response(stream, {"success": True}, 'friends', iterate_friends(request.user.id))
+
+        # Два запроса независимо от количества друзей: ребра графа и пользователи
+        friends = get_friends(request.user.id)
+        friends_data = UserBasicSerializer(friends, many=True).data
         
         return Response({
             "success": True,
@@ -457,19 +519,73 @@ class GetFriendsListView(APIView):
         }, status=status.HTTP_200_OK)
 
 
+class FriendSuggestionsView(APIView):
+    """
+    API endpoint для получения рекомендаций друзей (друзья друзей, общий клан,
+    общие достопримечательности). Списки предрассчитаны, запрос - одно чтение по индексу.
+    GET /api/friends/suggestions/?limit=20
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({
+                "success": False,
+                "error": "limit must be an integer"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Пользователи с необработанным запросом дружбы исключаются в том же запросе
+        pending = FriendRequest.objects.filter(status='pending')
+        suggestions = FriendSuggestion.objects.filter(user_id=request.user.id).exclude(
+            candidate_id__in=pending.filter(from_user_id=request.user.id).values('to_user_id')
+        ).exclude(
+            candidate_id__in=pending.filter(to_user_id=request.user.id).values('from_user_id')
+        ).select_related('candidate').only(
+            'score', 'mutual_friends', 'shared_clan', 'shared_landmarks',
+            *(f'candidate__{field}' for field in UserBasicSerializer.Meta.fields)
+        ).order_by('-score', 'candidate_id')[:limit]
+
+        suggestions_data = [
+            {
+                **UserBasicSerializer(suggestion.candidate).data,
+                "score": suggestion.score,
+                "mutual_friends": suggestion.mutual_friends,
+                "shared_clan": suggestion.shared_clan,
+                "shared_landmarks": suggestion.shared_landmarks,
+            }
+            for suggestion in suggestions
+        ]
+
+        return Response({
+            "success": True,
+            "suggestions": suggestions_data,
+            "total_count": len(suggestions_data)
+        }, status=status.HTTP_200_OK)
+
+
 class GetPendingFriendRequestsView(APIView):
     """
     API endpoint для получения входящих запросов дружбы (которые отправили текущему пользователю).
     GET /api/friends/requests/pending/
+    ?stream=json|ndjson - потоковый ответ без сборки списка в памяти (myproject.streaming).
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         user = request.user
+        stream = get_stream_format(request)
         pending_requests = FriendRequest.objects.filter(
             to_user=user,
             status='pending'
-        ).order_by('-created_at')
+        ).select_related('from_user', 'to_user').order_by('-created_at')
+        
+        if stream:
+            return stream_list_response(
+                stream, {"success": True}, 'pending_requests',
+                iterate_serialized(pending_requests, FriendRequestSerializer),
+            )
         
         serializer = FriendRequestSerializer(pending_requests, many=True)
         
@@ -484,15 +600,23 @@ class GetSentFriendRequestsView(APIView):
     """
     API endpoint для получения отправленных запросов дружбы (которые отправил текущий пользователь).
     GET /api/friends/requests/sent/
+    ?stream=json|ndjson - потоковый ответ без сборки списка в памяти (myproject.streaming).
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         user = request.user
+        stream = get_stream_format(request)
         sent_requests = FriendRequest.objects.filter(
             from_user=user,
             status='pending'
-        ).order_by('-created_at')
+        ).select_related('from_user', 'to_user').order_by('-created_at')
+        
+        if stream:
+            return stream_list_response(
+                stream, {"success": True}, 'sent_requests',
+                iterate_serialized(sent_requests, FriendRequestSerializer),
+            )
         
         serializer = FriendRequestSerializer(sent_requests, many=True)
         
@@ -522,27 +646,21 @@ class RemoveFriendView(APIView):
         user = request.user
         
         # Проверяем, являются ли они друзьями
-        if not Friendship.are_friends(user, friend):
+        if not are_friends(user.id, friend.id):
             return Response({
                 "success": False,
                 "error": "You are not friends with this user"
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Удаляем дружбу
-        friendship = Friendship.objects.filter(
-            (Q(user1=user) & Q(user2=friend)) |
-            (Q(user1=friend) & Q(user2=user))
-        ).first()
-        
-        if friendship:
-            friendship.delete()
-            
+        # Удаляем дружбу и ребра графа друзей
+        if remove_friendship(user.id, friend.id):
             # Также обновляем статус всех связанных запросов дружбы
             FriendRequest.objects.filter(
                 ((Q(from_user=user) & Q(to_user=friend)) |
                  (Q(from_user=friend) & Q(to_user=user))),
                 status='accepted'
-            ).update(status='cancelled')
+            ).update(status='cancelled', updated_at=timezone.now())
+            on_friendship_changed(user.id, friend.id)
         
         return Response({
             "success": True,
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Clan
+from .models import Clan, ClanTerritory
 
 
 @admin.register(Clan)
@@ -14,3 +14,11 @@ class ClanAdmin(admin.ModelAdmin):
         return obj.get_member_count()
     get_member_count.short_description = 'Участников'
 
+
+
+@admin.register(ClanTerritory)
+class ClanTerritoryAdmin(admin.ModelAdmin):
+    list_display = ('clan', 'held_landmarks', 'total_captures', 'landmarks_ever_held', 'updated_at')
+    search_fields = ('clan__name',)
+    readonly_fields = ('held_landmarks', 'total_captures', 'landmarks_ever_held', 'updated_at')
+    ordering = ('-held_landmarks',)
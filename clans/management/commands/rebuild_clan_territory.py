@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from clans.territory import rebuild_territory
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает счетчики территории кланов (ClanTerritory) по текущим владельцам "
+        "и истории захватов, пачками кланов"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Кланов в одной транзакции")
+
+    def handle(self, *args, **options):
+        total = rebuild_territory(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано кланов: {total}"))
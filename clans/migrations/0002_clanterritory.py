@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+BATCH_SIZE = 500
+
+
+def populate_territory(apps, schema_editor):
+    """Счетчики территории по текущим владельцам и истории захватов, пачками кланов."""
+    Clan = apps.get_model('clans', 'Clan')
+    ClanTerritory = apps.get_model('clans', 'ClanTerritory')
+    LandmarkCapture = apps.get_model('landmarks', 'LandmarkCapture')
+    LandmarkOwnership = apps.get_model('landmarks', 'LandmarkOwnership')
+    last_id = 0
+    while True:
+        clan_ids = list(Clan.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:BATCH_SIZE])
+        if not clan_ids:
+            break
+        last_id = clan_ids[-1]
+        held = dict(
+            LandmarkOwnership.objects.filter(clan_id__in=clan_ids).order_by()
+            .values('clan_id').annotate(count=Count('landmark_id')).values_list('clan_id', 'count')
+        )
+        captures = {
+            clan_id: (count, distinct)
+            for clan_id, count, distinct in LandmarkCapture.objects.filter(clan_id__in=clan_ids).order_by()
+            .values('clan_id').annotate(count=Count('id'), distinct=Count('landmark_id', distinct=True))
+            .values_list('clan_id', 'count', 'distinct')
+        }
+        ClanTerritory.objects.bulk_create([
+            ClanTerritory(
+                clan_id=clan_id,
+                held_landmarks=held.get(clan_id, 0),
+                total_captures=captures.get(clan_id, (0, 0))[0],
+                landmarks_ever_held=captures.get(clan_id, (0, 0))[1],
+            )
+            for clan_id in clan_ids
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clans', '0001_initial'),
+        ('landmarks', '0010_capture_clan_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClanTerritory',
+            fields=[
+                ('clan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='territory', serialize=False, to='clans.clan', verbose_name='Клан')),
+                ('held_landmarks', models.PositiveIntegerField(default=0, verbose_name='Достопримечательностей сейчас')),
+                ('total_captures', models.PositiveIntegerField(default=0, verbose_name='Всего захватов')),
+                ('landmarks_ever_held', models.PositiveIntegerField(default=0, verbose_name='Достопримечательностей за все время')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Территория клана',
+                'verbose_name_plural': 'Территории кланов',
+                'indexes': [models.Index(fields=['-held_landmarks', '-total_captures', 'clan'], name='clans_territory_held_idx'), models.Index(fields=['-total_captures', '-held_landmarks', 'clan'], name='clans_territory_captures_idx'), models.Index(fields=['-landmarks_ever_held', '-held_landmarks', 'clan'], name='clans_territory_ever_idx')],
+            },
+        ),
+        migrations.RunPython(populate_territory, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -34,15 +36,14 @@ class Clan(models.Model):
         return self.members.count()
     
     def get_captured_landmarks_count(self):
-        """Возвращает количество захваченных достопримечательностей кланом."""
+        """
+        Возвращает количество достопримечательностей, которыми клан владеет сейчас
+        (счетчик ClanTerritory; для списков кланов - select_related('territory')).
+        """
         try:
-            from landmarks.models import LandmarkCapture
-            # Получаем уникальные external_id захваченных достопримечательностей кланом
-            unique_captures = LandmarkCapture.objects.filter(
-                clan=self
-            ).values('external_id').distinct().count()
-            return unique_captures
-        except Exception:
+            return self.territory.held_landmarks
+        except ClanTerritory.DoesNotExist:
+            # Клан еще ничего не захватывал
             return 0
     
     @staticmethod
@@ -65,3 +66,43 @@ class Clan(models.Model):
         
         return name
 
+
+
+class ClanTerritory(models.Model):
+    """
+    Счетчики территории клана. Обновляются после каждого захвата
+    (clans.territory.record_capture) и удаления строки владельца,
+    пересобираются по истории командой rebuild_clan_territory.
+    """
+    clan = models.OneToOneField(
+        Clan,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='territory',
+        verbose_name="Клан"
+    )
+    held_landmarks = models.PositiveIntegerField(default=0, verbose_name="Достопримечательностей сейчас")
+    total_captures = models.PositiveIntegerField(default=0, verbose_name="Всего захватов")
+    landmarks_ever_held = models.PositiveIntegerField(default=0, verbose_name="Достопримечательностей за все время")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
+
+    class Meta:
+        verbose_name = "Территория клана"
+        verbose_name_plural = "Территории кланов"
+        indexes = [
+            # Порядок рейтинга (clans.territory.LEADERBOARD_ORDERINGS) читается из индекса без сортировки
+            models.Index(fields=['-held_landmarks', '-total_captures', 'clan'], name='clans_territory_held_idx'),
+            models.Index(fields=['-total_captures', '-held_landmarks', 'clan'], name='clans_territory_captures_idx'),
+            models.Index(fields=['-landmarks_ever_held', '-held_landmarks', 'clan'], name='clans_territory_ever_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.clan_id}: {self.held_landmarks}"
+
+
+@receiver(post_delete, sender='landmarks.LandmarkOwnership')
+def release_deleted_ownership(sender, instance, **kwargs):
+    """Строка владельца удалена (в том числе каскадом при удалении игрока) - клан теряет достопримечательность."""
+    if instance.clan_id is not None:
+        from .territory import release_landmark
+        release_landmark(instance.clan_id)
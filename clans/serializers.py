@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Clan
+from .territory import DEFAULT_LEADERBOARD_SIZE, LEADERBOARD_ORDERINGS, MAX_LEADERBOARD_SIZE
 
 
 class ClanSerializer(serializers.ModelSerializer):
@@ -54,3 +55,11 @@ class JoinClanSerializer(serializers.Serializer):
             raise serializers.ValidationError("Клан не найден")
         return value
 
+
+
+class TerritoryTopSerializer(serializers.Serializer):
+    """Параметры рейтинга кланов по территории."""
+    order = serializers.ChoiceField(choices=list(LEADERBOARD_ORDERINGS), required=False, default='held')
+    limit = serializers.IntegerField(
+        required=False, default=DEFAULT_LEADERBOARD_SIZE, min_value=1, max_value=MAX_LEADERBOARD_SIZE
+    )
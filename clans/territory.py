@@ -0,0 +1,148 @@
+"""
+Территория кланов (ClanTerritory): счетчики обновляются после коммита
+захвата отдельными короткими UPDATE, поэтому захваты одного клана не
+ждут друг друга на строке его счетчиков. Рейтинг читается по индексу в
+нужном порядке без подсчета по истории захватов.
+
+Если процесс завершится между коммитом захвата и обновлением счетчиков,
+счетчики расходятся с историей до запуска rebuild_clan_territory.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Clan, ClanTerritory
+
+TERRITORY_FIELDS = ('held_landmarks', 'total_captures', 'landmarks_ever_held')
+# Порядок рейтинга совпадает с индексами ClanTerritory
+LEADERBOARD_ORDERINGS = {
+    'held': ('-held_landmarks', '-total_captures', 'clan_id'),
+    'captures': ('-total_captures', '-held_landmarks', 'clan_id'),
+    'ever': ('-landmarks_ever_held', '-held_landmarks', 'clan_id'),
+}
+DEFAULT_LEADERBOARD_SIZE = 10
+MAX_LEADERBOARD_SIZE = 100
+
+
+def _increment(clan_id, **changes):
+    """UPDATE счетчиков клана; строка создается при первом захвате клана."""
+    values = {field: F(field) + delta for field, delta in changes.items()}
+    if not ClanTerritory.objects.filter(clan_id=clan_id).update(**values):
+        ClanTerritory.objects.bulk_create([ClanTerritory(clan_id=clan_id)], ignore_conflicts=True)
+        ClanTerritory.objects.filter(clan_id=clan_id).update(**values)
+
+
+def _release(clan_id):
+    """Клан больше не владеет одной достопримечательностью."""
+    ClanTerritory.objects.filter(clan_id=clan_id, held_landmarks__gt=0).update(held_landmarks=F('held_landmarks') - 1)
+
+
+def release_landmark(clan_id):
+    """Уменьшает held_landmarks клана после коммита (строка владельца удалена)."""
+    transaction.on_commit(partial(_release, clan_id))
+
+
+def _apply_capture(clan_id, changes, previous_clan_id):
+    if changes:
+        _increment(clan_id, **changes)
+    if previous_clan_id is not None:
+        _release(previous_clan_id)
+
+
+def record_capture(landmark_id, clan_id, previous_clan_id, capture_id):
+    """
+    Обновляет счетчики после смены владельца. Вызывается в транзакции
+    захвата после записи в историю (capture_id - новая запись): в ней
+    только читается история, счетчики меняются после коммита.
+
+    Args:
+        clan_id: Клан нового владельца (None - игрок без клана)
+        previous_clan_id: Клан прежнего владельца (None - не было владельца или клана)
+    """
+    from landmarks.models import LandmarkCapture
+
+    changes = {}
+    if clan_id is not None:
+        changes['total_captures'] = 1
+        if clan_id != previous_clan_id:
+            changes['held_landmarks'] = 1
+            # Индекс (clan, landmark) истории захватов
+            held_before = LandmarkCapture.objects.filter(
+                clan_id=clan_id, landmark_id=landmark_id
+            ).exclude(id=capture_id).exists()
+            if not held_before:
+                changes['landmarks_ever_held'] = 1
+    if previous_clan_id == clan_id:
+        previous_clan_id = None
+    transaction.on_commit(partial(_apply_capture, clan_id, changes, previous_clan_id))
+
+
+def top_territories(order='held', limit=DEFAULT_LEADERBOARD_SIZE):
+    """
+    Рейтинг кланов по территории: первые limit строк индекса
+    (кланы без захватов в рейтинг не попадают).
+
+    Returns:
+        list[dict]
+    """
+    ordering = LEADERBOARD_ORDERINGS[order]
+    rows = ClanTerritory.objects.filter(**{f'{ordering[0][1:]}__gt': 0}).order_by(*ordering).values_list(
+        'clan_id', 'clan__name', *TERRITORY_FIELDS
+    )[:limit]
+    return [
+        {
+            "rank": rank,
+            "clan": {"id": clan_id, "name": name},
+            "held_landmarks": held,
+            "total_captures": captures,
+            "landmarks_ever_held": ever_held,
+        }
+        for rank, (clan_id, name, held, captures, ever_held) in enumerate(rows, start=1)
+    ]
+
+
+def rebuild_territory(batch_size=500):
+    """
+    Пересчитывает счетчики всех кланов по LandmarkOwnership и истории
+    захватов, пачками по batch_size кланов (одна транзакция на пачку).
+
+    Returns:
+        int: Количество кланов
+    """
+    from landmarks.models import LandmarkCapture, LandmarkOwnership
+
+    total = 0
+    last_id = 0
+    while True:
+        clan_ids = list(Clan.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not clan_ids:
+            break
+        last_id = clan_ids[-1]
+        with transaction.atomic():
+            held = dict(
+                LandmarkOwnership.objects.filter(clan_id__in=clan_ids).order_by()
+                .values('clan_id').annotate(count=Count('landmark_id')).values_list('clan_id', 'count')
+            )
+            captures = {
+                clan_id: (count, distinct)
+                for clan_id, count, distinct in LandmarkCapture.objects.filter(clan_id__in=clan_ids).order_by()
+                .values('clan_id').annotate(count=Count('id'), distinct=Count('landmark_id', distinct=True))
+                .values_list('clan_id', 'count', 'distinct')
+            }
+            ClanTerritory.objects.bulk_create(
+                [
+                    ClanTerritory(
+                        clan_id=clan_id,
+                        held_landmarks=held.get(clan_id, 0),
+                        total_captures=captures.get(clan_id, (0, 0))[0],
+                        landmarks_ever_held=captures.get(clan_id, (0, 0))[1],
+                    )
+                    for clan_id in clan_ids
+                ],
+                update_conflicts=True,
+                unique_fields=['clan'],
+                update_fields=[*TERRITORY_FIELDS, 'updated_at'],
+            )
+        total += len(clan_ids)
+    return total
@@ -1,4 +1,50 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+
+from landmarks.models import Landmark
+from landmarks.ownership import capture_landmark
+
+from .models import Clan, ClanTerritory
+
+User = get_user_model()
+
+
+class ClanTerritoryTests(TestCase):
+    """Счетчики территории обновляются после коммита захвата и при удалении владельца."""
+
+    def setUp(self):
+        self.red = Clan.objects.create(name='red')
+        self.blue = Clan.objects.create(name='blue')
+        self.red_player = User.objects.create(username='red_player', password='!', clan=self.red)
+        self.blue_player = User.objects.create(username='blue_player', password='!', clan=self.blue)
+        self.landmark = Landmark.objects.create(external_id='territory')
+
+    def counters(self, clan):
+        territory = ClanTerritory.objects.filter(clan=clan).first()
+        if territory is None:
+            return (0, 0, 0)
+        return (territory.held_landmarks, territory.total_captures, territory.landmarks_ever_held)
+
+    def capture(self, user, now):
+        with self.captureOnCommitCallbacks(execute=True):
+            return capture_landmark(self.landmark.id, user, now=now)
+
+    def test_counters_follow_captures(self):
+        now = timezone.now()
+        self.capture(self.red_player, now)
+        self.assertEqual(self.counters(self.red), (1, 1, 1))
+
+        self.capture(self.blue_player, now + timedelta(days=1))
+        self.assertEqual(self.counters(self.red), (0, 1, 1))
+        self.assertEqual(self.counters(self.blue), (1, 1, 1))
+
+    def test_deleting_owner_releases_landmark(self):
+        self.capture(self.red_player, timezone.now())
 
-# Create your tests here.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.red_player.delete()
 
+        self.assertEqual(self.counters(self.red), (0, 1, 1))
@@ -5,8 +5,10 @@ from rest_framework.permissions import IsAuthenticated
 from django.db.models import Count
 from django.db import transaction
 from django.contrib.auth import get_user_model
+from accounts.profile_cache import invalidate_player_profile
 from .models import Clan
-from .serializers import ClanSerializer, CreateClanSerializer, JoinClanSerializer
+from .serializers import ClanSerializer, CreateClanSerializer, JoinClanSerializer, TerritoryTopSerializer
+from .territory import top_territories
 
 User = get_user_model()
 
@@ -49,6 +51,9 @@ class CreateClanView(APIView):
                 # Обновляем пользователя, присоединяя его к клану
                 # Используем update для обхода возможных проблем с кэшированием
                 User.objects.filter(id=user.id).update(clan=clan)
+                # Клан хранится в токене - старые токены получат актуальный клан из БД
+                User.bump_auth_version(user.id)
+                invalidate_player_profile(user.id)
                 # Обновляем объект user из базы данных
                 user.refresh_from_db()
                 
@@ -111,6 +116,9 @@ class JoinClanView(APIView):
         try:
             with transaction.atomic():
                 User.objects.filter(id=user.id).update(clan=clan)
+                # Клан хранится в токене - старые токены получат актуальный клан из БД
+                User.bump_auth_version(user.id)
+                invalidate_player_profile(user.id)
                 user.refresh_from_db()
         except Exception as e:
             return Response({
@@ -149,6 +157,9 @@ class LeaveClanView(APIView):
         try:
             with transaction.atomic():
                 User.objects.filter(id=user.id).update(clan=None)
+                # Клан хранится в токене - старые токены получат актуальный клан из БД
+                User.bump_auth_version(user.id)
+                invalidate_player_profile(user.id)
                 user.refresh_from_db()
         except Exception as e:
             return Response({
@@ -186,7 +197,7 @@ class SearchClansView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Поиск кланов по названию (без учета регистра)
-        clans = Clan.objects.filter(name__icontains=query).order_by('name')[:20]  # Ограничиваем 20 результатами
+        clans = Clan.objects.filter(name__icontains=query).select_related('created_by', 'territory').order_by('name')[:20]  # Ограничиваем 20 результатами
         
         serializer = ClanSerializer(clans, many=True)
         
@@ -212,7 +223,7 @@ class TopClansView(APIView):
         # Используем annotate для подсчета участников и сортировки
         top_clans = Clan.objects.annotate(
             member_count=Count('members')
-        ).filter(member_count__gt=0).order_by('-member_count', '-created_at')[:10]
+        ).filter(member_count__gt=0).select_related('created_by', 'territory').order_by('-member_count', '-created_at')[:10]
         
         serializer = ClanSerializer(top_clans, many=True)
         
@@ -222,3 +233,32 @@ class TopClansView(APIView):
             "total_count": len(serializer.data)
         }, status=status.HTTP_200_OK)
 
+
+
+class TopClanTerritoryView(APIView):
+    """
+    API endpoint для рейтинга кланов по территории.
+    GET /api/clans/territory/top/?order=held|captures|ever&limit=10
+
+    Счетчики ClanTerritory обновляются при каждом захвате, рейтинг
+    читается по индексу в нужном порядке.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        serializer = TerritoryTopSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response({
+                "success": False,
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        order = serializer.validated_data['order']
+        top_clans = top_territories(order, serializer.validated_data['limit'])
+
+        return Response({
+            "success": True,
+            "order": order,
+            "top_clans": top_clans,
+            "total_count": len(top_clans)
+        }, status=status.HTTP_200_OK)
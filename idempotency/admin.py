@@ -0,0 +1,19 @@
+from django.contrib import admin
+from .models import IdempotencyRecord
+
+
+@admin.register(IdempotencyRecord)
+class IdempotencyRecordAdmin(admin.ModelAdmin):
+    """Сохраненные ответы только для просмотра; удаление освобождает ключ."""
+    list_display = ('id', 'user', 'key', 'status_code', 'locked_at', 'expires_at')
+    list_filter = ('status_code',)
+    search_fields = ('user__username', 'key')
+    raw_id_fields = ('user',)
+    exclude = ('body',)
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
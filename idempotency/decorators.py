@@ -0,0 +1,106 @@
+import contextlib
+import functools
+import hashlib
+import logging
+
+from django.db import transaction
+from django.http import HttpResponse, RawPostDataException, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import store
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint(request):
+    """SHA-256 метода, пути и тела запроса: повтор ключа с другим запросом - ошибка клиента."""
+    try:
+        body = request.body
+    except RawPostDataException:
+        # Тело уже прочитано парсером DRF
+        body = repr(sorted(request.data.items()) if hasattr(request.data, 'items') else request.data).encode()
+    digest = hashlib.sha256(f'{request.method} {request.path}\n'.encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def idempotent(handler=None, *, atomic=True):
+    """
+    Декоратор метода APIView: повтор запроса с тем же заголовком
+    Idempotency-Key получает первый ответ, а не выполняется заново.
+    Без заголовка запрос обрабатывается как раньше.
+
+    Ставится над @transaction.atomic метода. С atomic=True ответ
+    сохраняется в одной транзакции с изменениями запроса. atomic=False -
+    для методов, которые сами управляют транзакциями; ответ сохраняется
+    после их коммита (повторное выполнение таких методов должно быть
+    безопасным, если воркер упадет между коммитом и сохранением ответа).
+
+    Ответы 5xx и исключения не сохраняются: ключ освобождается, повтор
+    выполнится заново.
+    """
+    if handler is None:
+        return functools.partial(idempotent, atomic=atomic)
+
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        raw_key = request.headers.get(HEADER)
+        if raw_key is None:
+            return handler(self, request, *args, **kwargs)
+        if not raw_key or len(raw_key) > MAX_KEY_LENGTH:
+            return Response({
+                "success": False,
+                "error": f"{HEADER} must be 1-{MAX_KEY_LENGTH} characters"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        user_id = request.user.id
+        key = hashlib.sha256(raw_key.encode()).hexdigest()
+        claim = store.acquire(user_id, key, _fingerprint(request))
+        if claim.mismatch:
+            return Response({
+                "success": False,
+                "error": f"{HEADER} was already used with a different request"
+            }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        if claim.replay is not None:
+            status_code, body = claim.replay
+            response = HttpResponse(body, status=status_code, content_type='application/json')
+            response['Idempotent-Replayed'] = 'true'
+            return response
+        if claim.in_progress:
+            return _in_progress_response()
+
+        completed = False
+        try:
+            with transaction.atomic() if atomic else contextlib.nullcontext():
+                response = handler(self, request, *args, **kwargs)
+                if response.status_code < 500 and not isinstance(response, StreamingHttpResponse):
+                    response = self.finalize_response(request, response, *args, **kwargs)
+                    response.render()
+                    completed = store.complete(user_id, key, claim.token, response.status_code, response.content)
+                    if not completed:
+                        # Запрос выполнялся дольше LOCK_TIMEOUT, и ключ перехватил повтор
+                        logger.warning(f"Idempotency lock for user {user_id} was taken over before completion")
+                        if atomic:
+                            transaction.set_rollback(True)
+                            response = _in_progress_response()
+                elif atomic:
+                    transaction.set_rollback(True)
+        finally:
+            if not completed:
+                store.release(user_id, key, claim.token)
+        return response
+
+    return wrapper
+
+
+def _in_progress_response():
+    response = Response({
+        "success": False,
+        "error": "A request with this Idempotency-Key is still in progress"
+    }, status=status.HTTP_409_CONFLICT)
+    response['Retry-After'] = '1'
+    return response
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, connection
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from idempotency.decorators import _fingerprint
+from idempotency.models import IdempotencyRecord
+from idempotency.store import KEY_TTL, LOCK_TIMEOUT
+from shop.models import PurchaseHistory, ShopItem
+from shop.views import PurchaseItemView
+from wallet.ledger import credit_coins
+
+User = get_user_model()
+
+PRICE = 10
+
+
+class Command(BaseCommand):
+    help = (
+        "Параллельные повторы PurchaseItemView с заголовком Idempotency-Key из нескольких потоков: "
+        "проверяет, что покупка с одним ключом выполняется ровно один раз, повторы получают тот же "
+        "ответ или 409, а разные ключи не мешают друг другу. Ошибка БД в любом потоке - нарушение. "
+        "Работает с настроенной БД, созданные данные удаляются в конце; те же проверки на тестовой "
+        "БД - idempotency.tests.IdempotencyConcurrencyTests"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--rounds', type=int, default=5, help="Раундов в сценарии same (новый ключ на раунд)")
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        self.prefix = f'check_idempotency_{time.time_ns()}'
+        self.factory = APIRequestFactory()
+        self.view = PurchaseItemView.as_view()
+        self.user = User.objects.create(username=self.prefix, password='!')
+        credit_coins(self.user.id, PRICE * threads * (options['rounds'] + 3), 'admin_grant', self.prefix)
+        self.items = [
+            ShopItem.objects.create(name=f'{self.prefix}_{index}', price=PRICE, promo_code=f'{self.prefix}_{index}')
+            for index in range(2)
+        ]
+        failures = []
+        try:
+            for round_number in range(options['rounds']):
+                failures += self.scenario_same(threads, f'same#{round_number + 1}')
+            failures += self.scenario_different(threads)
+            failures += self.scenario_mismatch()
+            failures += self.scenario_stale_lock()
+        finally:
+            ShopItem.objects.filter(id__in=[item.id for item in self.items]).delete()
+            User.objects.filter(id=self.user.id).delete()
+
+        for failure in failures:
+            self.stdout.write(self.style.WARNING(failure))
+        if failures:
+            raise CommandError(f"Нарушений: {len(failures)}")
+        self.stdout.write(self.style.SUCCESS("Idempotency-Key: нарушений нет"))
+
+    def purchase(self, key, item):
+        request = self.factory.post(
+            '/api/shop/purchase/', {'item_id': item.id}, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+        force_authenticate(request, user=self.user)
+        response = self.view(request)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def purchases(self):
+        return PurchaseHistory.objects.filter(user_id=self.user.id).count()
+
+    def run_threads(self, keys):
+        """
+        Запускает по потоку на ключ, все потоки покупают первый товар одновременно.
+
+        Returns:
+            (list[(status_code, replayed, body)], ошибок БД, секунд)
+        """
+        barrier = threading.Barrier(len(keys))
+        results = []
+        counters = {'errors': 0}
+        lock = threading.Lock()
+
+        def worker(key):
+            try:
+                barrier.wait()
+                try:
+                    response = self.purchase(key, self.items[0])
+                except DatabaseError:
+                    with lock:
+                        counters['errors'] += 1
+                    return
+                with lock:
+                    results.append((response.status_code, response.has_header('Idempotent-Replayed'), response.content))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(key,)) for key in keys]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        close_old_connections()
+        return results, counters['errors'], elapsed
+
+    def report(self, scenario, results, errors, elapsed):
+        statuses = {}
+        for status_code, replayed, _body in results:
+            label = f'{status_code}{" replay" if replayed else ""}'
+            statuses[label] = statuses.get(label, 0) + 1
+        summary = ', '.join(f'{label}: {count}' for label, count in sorted(statuses.items()))
+        self.stdout.write(f"{scenario:10} ответы: {summary}; ошибок БД: {errors}; {elapsed * 1000:8.1f} мс")
+
+    def scenario_same(self, threads, scenario):
+        """Все потоки одновременно отправляют одну покупку с одним ключом."""
+        key = f'{self.prefix}_{scenario}'
+        before = self.purchases()
+        results, errors, elapsed = self.run_threads([key] * threads)
+        self.report(scenario, results, errors, elapsed)
+        failures = []
+        if errors:
+            failures.append(f"{scenario}: ошибок БД {errors}")
+        executed = self.purchases() - before
+        if executed != 1:
+            failures.append(f"{scenario}: выполнено покупок {executed}, ожидалась 1")
+        bodies = {body for status_code, _replayed, body in results if status_code == 200}
+        if len(bodies) != 1:
+            failures.append(f"{scenario}: разных успешных ответов {len(bodies)}, ожидался 1")
+        fresh = [result for result in results if result[0] == 200 and not result[1]]
+        if len(fresh) != 1:
+            failures.append(f"{scenario}: ответов без повтора {len(fresh)}, ожидался 1")
+        unexpected = [status_code for status_code, _replayed, _body in results if status_code not in (200, 409)]
+        if unexpected:
+            failures.append(f"{scenario}: неожиданные коды ответа {unexpected}")
+        # Повтор после завершения - сохраненный ответ без выполнения
+        response = self.purchase(key, self.items[0])
+        if not response.has_header('Idempotent-Replayed') or response.content not in bodies:
+            failures.append(f"{scenario}: повтор после завершения не получил сохраненный ответ")
+        if self.purchases() - before != 1:
+            failures.append(f"{scenario}: повтор после завершения выполнил покупку")
+        return failures
+
+    def scenario_different(self, threads):
+        """Каждый поток отправляет покупку со своим ключом - все выполняются."""
+        before = self.purchases()
+        results, errors, elapsed = self.run_threads([f'{self.prefix}_different_{index}' for index in range(threads)])
+        self.report('different', results, errors, elapsed)
+        executed = self.purchases() - before
+        succeeded = sum(1 for status_code, _replayed, _body in results if status_code == 200)
+        failures = []
+        if errors:
+            failures.append(f"different: ошибок БД {errors}")
+        if executed != succeeded or succeeded != threads:
+            failures.append(f"different: выполнено покупок {executed}, успешных ответов {succeeded}, потоков {threads}")
+        return failures
+
+    def scenario_mismatch(self):
+        """Ключ, уже использованный для другого товара, - 422 без покупки."""
+        key = f'{self.prefix}_mismatch'
+        self.purchase(key, self.items[0])
+        before = self.purchases()
+        response = self.purchase(key, self.items[1])
+        self.stdout.write(f"{'mismatch':10} ответ: {response.status_code}")
+        if response.status_code != 422 or self.purchases() != before:
+            return [f"mismatch: ответ {response.status_code}, покупок {self.purchases() - before}"]
+        return []
+
+    def scenario_stale_lock(self):
+        """Блокировка упавшего воркера (старше LOCK_TIMEOUT) перехватывается повтором."""
+        key = f'{self.prefix}_stale'
+        request = self.factory.post(
+            '/api/shop/purchase/', {'item_id': self.items[0].id}, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+        now = timezone.now()
+        IdempotencyRecord.objects.create(
+            user_id=self.user.id, key=hashlib.sha256(key.encode()).hexdigest(), fingerprint=_fingerprint(request),
+            token=1, locked_at=now - LOCK_TIMEOUT - timedelta(seconds=1), expires_at=now + KEY_TTL,
+        )
+        before = self.purchases()
+        response = self.purchase(key, self.items[0])
+        self.stdout.write(f"{'stale':10} ответ: {response.status_code}")
+        if response.status_code != 200 or self.purchases() - before != 1:
+            return [f"stale: ответ {response.status_code}, покупок {self.purchases() - before}"]
+        body = json.loads(response.content)
+        if not body.get('success'):
+            return [f"stale: неуспешный ответ {body}"]
+        return []
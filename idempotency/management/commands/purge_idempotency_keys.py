@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from idempotency.store import MAX_RECORDS, purge
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет истекшие ключи идемпотентности и самые старые сверх IDEMPOTENCY_MAX_RECORDS. "
+        "Запускать периодически (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--max-records', type=int, default=MAX_RECORDS)
+
+    def handle(self, *args, **options):
+        deleted = purge(options['batch_size'], options['max_records'])
+        self.stdout.write(f"Удалено записей: {deleted}")
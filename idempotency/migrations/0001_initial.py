@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='SHA-256 заголовка Idempotency-Key', max_length=64, verbose_name='Ключ')),
+                ('fingerprint', models.CharField(help_text='SHA-256 метода, пути и тела запроса', max_length=64, verbose_name='Отпечаток запроса')),
+                ('token', models.BigIntegerField(verbose_name='Владелец блокировки')),
+                ('locked_at', models.DateTimeField(verbose_name='Начало выполнения')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Код ответа')),
+                ('body', models.BinaryField(default=b'', verbose_name='Тело ответа (zlib)')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Хранить до')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ключ идемпотентности',
+                'verbose_name_plural': 'Ключи идемпотентности',
+                'constraints': [models.UniqueConstraint(fields=('user', 'key'), name='idempotency_record_unique')],
+            },
+        ),
+    ]
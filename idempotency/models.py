@@ -0,0 +1,33 @@
+from django.db import models
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Первый ответ на запрос с заголовком Idempotency-Key (одна строка на пару
+    пользователь + ключ). Пока запрос выполняется, строка служит блокировкой:
+    status_code = NULL. Ответ хранится сжатым (zlib), строки удаляются после
+    expires_at командой purge_idempotency_keys.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name="Пользователь")
+    key = models.CharField(max_length=64, verbose_name="Ключ", help_text="SHA-256 заголовка Idempotency-Key")
+    fingerprint = models.CharField(
+        max_length=64, verbose_name="Отпечаток запроса", help_text="SHA-256 метода, пути и тела запроса"
+    )
+    token = models.BigIntegerField(verbose_name="Владелец блокировки")
+    locked_at = models.DateTimeField(verbose_name="Начало выполнения")
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="Код ответа")
+    body = models.BinaryField(default=b'', verbose_name="Тело ответа (zlib)")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Хранить до")
+
+    class Meta:
+        verbose_name = "Ключ идемпотентности"
+        verbose_name_plural = "Ключи идемпотентности"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_record_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.key[:12]} ({self.status_code or 'in progress'})"
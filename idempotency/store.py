@@ -0,0 +1,143 @@
+"""
+Хранилище ответов для запросов с заголовком Idempotency-Key.
+
+Первый запрос с ключом вставляет строку IdempotencyRecord (блокировка:
+status_code = NULL), выполняется и записывает ответ в ту же строку в
+транзакции вместе со своими изменениями. Повторы с тем же ключом получают
+сохраненный ответ; повтор, пришедший во время выполнения, ждет его
+завершения и не выполняется параллельно. Ограничение уникальности
+(user, key) делает захват ключа атомарным во всех воркерах.
+"""
+import random
+import time
+import zlib
+from datetime import timedelta
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import IdempotencyRecord
+
+KEY_TTL = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 3600))
+# Блокировка старше этого считается брошенной (воркер упал во время запроса)
+LOCK_TIMEOUT = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60))
+WAIT_SECONDS = getattr(settings, 'IDEMPOTENCY_WAIT_SECONDS', 3)
+POLL_SECONDS = 0.05
+MAX_RESPONSE_BYTES = getattr(settings, 'IDEMPOTENCY_MAX_RESPONSE_BYTES', 64 * 1024)
+MAX_RECORDS = getattr(settings, 'IDEMPOTENCY_MAX_RECORDS', 1000000)
+
+
+class Claim(NamedTuple):
+    """Результат acquire: заполнено ровно одно поле."""
+    token: Optional[int] = None  # Ключ захвачен - запрос выполняет этот вызов
+    replay: Optional[tuple] = None  # (status_code, body) сохраненного ответа
+    in_progress: bool = False  # Ключ занят выполняющимся запросом дольше WAIT_SECONDS
+    mismatch: bool = False  # Ключ уже использован с другим запросом
+
+
+def _new_token():
+    return random.getrandbits(63)
+
+
+def acquire(user_id, key, fingerprint, wait=WAIT_SECONDS):
+    """
+    Захватывает ключ или возвращает сохраненный ответ. Если ключ занят
+    выполняющимся запросом, ждет его завершения до wait секунд.
+
+    Returns:
+        Claim
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        now = timezone.now()
+        token = _new_token()
+        try:
+            with transaction.atomic():
+                IdempotencyRecord.objects.create(
+                    user_id=user_id, key=key, fingerprint=fingerprint,
+                    token=token, locked_at=now, expires_at=now + KEY_TTL,
+                )
+            return Claim(token=token)
+        except IntegrityError:
+            pass
+
+        record = IdempotencyRecord.objects.filter(user_id=user_id, key=key).values_list(
+            'id', 'fingerprint', 'token', 'locked_at', 'status_code', 'body', 'expires_at'
+        ).first()
+        if record is None:
+            # Строку удалили между вставкой и чтением (истекла или освобождена)
+            continue
+        record_id, stored_fingerprint, stored_token, locked_at, status_code, body, expires_at = record
+        if expires_at <= now:
+            IdempotencyRecord.objects.filter(id=record_id, expires_at__lte=now).delete()
+            continue
+        if stored_fingerprint != fingerprint:
+            return Claim(mismatch=True)
+        if status_code is not None:
+            return Claim(replay=(status_code, zlib.decompress(bytes(body))))
+        if locked_at <= now - LOCK_TIMEOUT:
+            # Перехват брошенной блокировки - условный UPDATE, успешен только у одного
+            if IdempotencyRecord.objects.filter(id=record_id, token=stored_token, status_code__isnull=True).update(
+                token=token, locked_at=now
+            ):
+                return Claim(token=token)
+            continue
+        if time.monotonic() >= deadline:
+            return Claim(in_progress=True)
+        time.sleep(POLL_SECONDS)
+
+
+def complete(user_id, key, token, status_code, body):
+    """
+    Сохраняет ответ. Вызывается в транзакции запроса: ответ фиксируется
+    вместе с изменениями запроса. Ответ больше MAX_RESPONSE_BYTES не
+    хранится - ключ освобождается.
+
+    Returns:
+        bool: False - блокировку перехватили (запрос выполнялся дольше LOCK_TIMEOUT)
+    """
+    compressed = zlib.compress(body)
+    if len(compressed) > MAX_RESPONSE_BYTES:
+        return release(user_id, key, token)
+    return bool(IdempotencyRecord.objects.filter(user_id=user_id, key=key, token=token).update(
+        status_code=status_code, body=compressed
+    ))
+
+
+def release(user_id, key, token):
+    """Освобождает ключ без сохранения ответа (ошибка сервера): повтор выполнится заново."""
+    return bool(IdempotencyRecord.objects.filter(
+        user_id=user_id, key=key, token=token, status_code__isnull=True
+    ).delete()[0])
+
+
+def purge(batch_size=5000, max_records=None):
+    """
+    Удаляет истекшие записи пачками, затем самые старые завершенные
+    сверх max_records (None - без лимита).
+
+    Returns:
+        int: Количество удаленных записей
+    """
+    deleted = 0
+    now = timezone.now()
+    while True:
+        ids = list(IdempotencyRecord.objects.filter(expires_at__lte=now).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        deleted += IdempotencyRecord.objects.filter(id__in=ids).delete()[0]
+    if max_records is not None:
+        while True:
+            excess = IdempotencyRecord.objects.count() - max_records
+            if excess <= 0:
+                break
+            ids = list(
+                IdempotencyRecord.objects.filter(status_code__isnull=False).order_by('expires_at')
+                .values_list('id', flat=True)[:min(excess, batch_size)]
+            )
+            if not ids:
+                break
+            deleted += IdempotencyRecord.objects.filter(id__in=ids).delete()[0]
+    return deleted
@@ -0,0 +1,129 @@
+import hashlib
+import threading
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection
+from django.test import TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from shop.models import PurchaseHistory, ShopItem
+from shop.views import PurchaseItemView
+from wallet.ledger import credit_coins
+
+from .decorators import _fingerprint
+from .models import IdempotencyRecord
+from .store import KEY_TTL, LOCK_TIMEOUT
+
+User = get_user_model()
+
+THREADS = 8
+PRICE = 10
+
+
+class IdempotencyConcurrencyTests(TransactionTestCase):
+    """Параллельные повторы PurchaseItemView с заголовком Idempotency-Key (каждый поток - свое соединение с БД)."""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = PurchaseItemView.as_view()
+        self.user = User.objects.create(username='idempotency', password='!')
+        credit_coins(self.user.id, PRICE * THREADS * 4, 'admin_grant', 'idempotency tests')
+        self.items = [
+            ShopItem.objects.create(name=f'item_{index}', price=PRICE, promo_code=f'PROMO_{index}')
+            for index in range(2)
+        ]
+
+    def purchase(self, key, item):
+        request = self.factory.post(
+            '/api/shop/purchase/', {'item_id': item.id}, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+        force_authenticate(request, user=self.user)
+        response = self.view(request)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def purchases(self):
+        return PurchaseHistory.objects.filter(user_id=self.user.id).count()
+
+    def run_threads(self, keys):
+        """
+        Поток на ключ, все потоки покупают первый товар одновременно.
+
+        Returns:
+            (list[(status_code, replayed, body)], list ошибок БД)
+        """
+        barrier = threading.Barrier(len(keys))
+        results = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker(key):
+            try:
+                barrier.wait()
+                try:
+                    response = self.purchase(key, self.items[0])
+                except DatabaseError as e:
+                    with lock:
+                        errors.append(repr(e))
+                    return
+                with lock:
+                    results.append((response.status_code, response.has_header('Idempotent-Replayed'), response.content))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(key,)) for key in keys]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return results, errors
+
+    def test_same_key_executes_once(self):
+        results, errors = self.run_threads(['same'] * THREADS)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.purchases(), 1)
+        self.assertEqual(len(results), THREADS)
+        self.assertTrue(all(status_code in (200, 409) for status_code, _replayed, _body in results))
+        fresh = [body for status_code, replayed, body in results if status_code == 200 and not replayed]
+        self.assertEqual(len(fresh), 1)
+        self.assertEqual({body for status_code, _replayed, body in results if status_code == 200}, set(fresh))
+
+        # Повтор после завершения - сохраненный ответ без выполнения
+        response = self.purchase('same', self.items[0])
+        self.assertTrue(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(response.content, fresh[0])
+        self.assertEqual(self.purchases(), 1)
+
+    def test_different_keys_execute_independently(self):
+        results, errors = self.run_threads([f'different_{index}' for index in range(THREADS)])
+
+        self.assertEqual(errors, [])
+        self.assertEqual([status_code for status_code, _replayed, _body in results], [200] * THREADS)
+        self.assertEqual(self.purchases(), THREADS)
+
+    def test_key_reused_for_other_item_is_rejected(self):
+        self.purchase('mismatch', self.items[0])
+
+        response = self.purchase('mismatch', self.items[1])
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.purchases(), 1)
+
+    def test_stale_lock_is_taken_over(self):
+        request = self.factory.post(
+            '/api/shop/purchase/', {'item_id': self.items[0].id}, format='json', HTTP_IDEMPOTENCY_KEY='stale'
+        )
+        now = timezone.now()
+        IdempotencyRecord.objects.create(
+            user_id=self.user.id, key=hashlib.sha256(b'stale').hexdigest(), fingerprint=_fingerprint(request),
+            token=1, locked_at=now - LOCK_TIMEOUT - timedelta(seconds=1), expires_at=now + KEY_TTL,
+        )
+
+        response = self.purchase('stale', self.items[0])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.purchases(), 1)
@@ -1,20 +1,41 @@
 from django.contrib import admin
-from .models import PlayerLandmarkObservation, LandmarkCapture
+from .models import Landmark, PlayerLandmarkObservation, LandmarkCapture, LandmarkOwnership
+
+
+@admin.register(Landmark)
+class LandmarkAdmin(admin.ModelAdmin):
+    list_display = ("id", "external_id", "latitude", "longitude")
+    search_fields = ("external_id",)
+    list_per_page = 50
 
 
 @admin.register(PlayerLandmarkObservation)
 class PlayerLandmarkObservationAdmin(admin.ModelAdmin):
-    list_display = ("player", "external_id", "observed_at")
+    list_display = ("player", "landmark", "observed_at")
     list_filter = ("observed_at",)
-    search_fields = ("player__username", "external_id")
+    search_fields = ("player__username", "landmark__external_id")
+    list_select_related = ("player", "landmark")
+    raw_id_fields = ("player", "landmark")
     readonly_fields = ("observed_at",)
     list_per_page = 50
 
 
 @admin.register(LandmarkCapture)
 class LandmarkCaptureAdmin(admin.ModelAdmin):
-    list_display = ("id", "external_id", "captured_by", "clan", "captured_at")
+    list_display = ("id", "landmark", "captured_by", "clan", "captured_at")
     list_filter = ("captured_at", "clan")
-    search_fields = ("external_id", "captured_by__username", "clan__name")
+    search_fields = ("landmark__external_id", "captured_by__username", "clan__name")
+    list_select_related = ("landmark", "captured_by", "clan")
+    raw_id_fields = ("landmark", "captured_by")
     readonly_fields = ("captured_at",)
     list_per_page = 50
+
+
+@admin.register(LandmarkOwnership)
+class LandmarkOwnershipAdmin(admin.ModelAdmin):
+    list_display = ("landmark", "owner", "clan", "captured_at")
+    list_filter = ("clan",)
+    search_fields = ("landmark__external_id", "owner__username", "clan__name")
+    list_select_related = ("landmark", "owner", "clan")
+    raw_id_fields = ("landmark", "owner")
+    list_per_page = 50
@@ -0,0 +1,331 @@
+"""
+Пространственный индекс достопримечательностей (без PostGIS, работает на SQLite).
+
+Поверхность разбита на сетку ячеек GEO_CELL_SIZE x GEO_CELL_SIZE градусов,
+номер ячейки хранится в Landmark.geo_cell (индекс). Запрос по области -
+несколько диапазонов номеров ячеек (по одному на ряд сетки), точная проверка
+координат - в памяти.
+
+Содержимое ячеек (ID и координаты достопримечательностей) кэшируется в LRU
+внутри воркера. Ячейки сгруппированы в регионы GEO_REGION_CELLS x GEO_REGION_CELLS,
+версия региона хранится в общем кэше и повышается при изменении координат,
+поэтому устаревшие ячейки не используются ни в одном воркере. Владельцы и кланы
+не кэшируются - читаются одним IN-запросом для найденных достопримечательностей.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .interning import IN_QUERY_CHUNK_SIZE, intern_landmarks
+from .models import Landmark
+from .ownership import get_ownership_rows, ownership_status
+
+GEO_CELL_SIZE = 0.01  # Градусов (~1.1 км по широте). При изменении пересчитать geo_cell: import_landmark_coordinates --recompute-cells
+GEO_COLUMNS = round(360 / GEO_CELL_SIZE)
+GEO_ROWS = round(180 / GEO_CELL_SIZE)
+GEO_REGION_CELLS = 100  # Ячеек в стороне региона (версия кэша - на регион)
+
+MAX_BBOX_CELLS = 2500  # Максимум ячеек в одном запросе по области (~55 x 55 км на экваторе)
+MAX_RADIUS_METERS = 5000
+MAX_GEO_RESULTS = 1000
+MAX_COORDINATES_PER_REQUEST = 500
+RANGES_PER_QUERY = 400  # Диапазонов ячеек в одном SQL-запросе (ограничение глубины выражений SQLite)
+
+EARTH_RADIUS_METERS = 6371000
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+
+
+def _row_of(latitude):
+    return min(max(int(math.floor((latitude + 90) / GEO_CELL_SIZE)), 0), GEO_ROWS - 1)
+
+
+def _column_of(longitude):
+    return min(max(int(math.floor((longitude + 180) / GEO_CELL_SIZE)), 0), GEO_COLUMNS - 1)
+
+
+def cell_of(latitude, longitude):
+    """Номер ячейки сетки для координат."""
+    return _row_of(latitude) * GEO_COLUMNS + _column_of(longitude)
+
+
+def region_of(cell):
+    row, column = divmod(cell, GEO_COLUMNS)
+    return row // GEO_REGION_CELLS, column // GEO_REGION_CELLS
+
+
+def bbox_ranges(min_lat, min_lon, max_lat, max_lon):
+    """
+    Диапазоны номеров ячеек, покрывающие область.
+    min_lon > max_lon - область пересекает 180-й меридиан.
+
+    Returns:
+        list[(first_cell, last_cell)]
+
+    Raises:
+        ValueError: Область больше MAX_BBOX_CELLS ячеек
+    """
+    first_column, last_column = _column_of(min_lon), _column_of(max_lon)
+    if min_lon <= max_lon:
+        column_ranges = [(first_column, last_column)]
+    else:
+        column_ranges = [(first_column, GEO_COLUMNS - 1), (0, last_column)]
+    rows = range(_row_of(min_lat), _row_of(max_lat) + 1)
+    cells = len(rows) * sum(last - first + 1 for first, last in column_ranges)
+    if cells > MAX_BBOX_CELLS:
+        raise ValueError(f"Area is too large: {cells} cells, maximum {MAX_BBOX_CELLS}")
+    return [
+        (row * GEO_COLUMNS + first, row * GEO_COLUMNS + last)
+        for row in rows
+        for first, last in column_ranges
+    ]
+
+
+def region_version_key(region):
+    return f'landmarks:geo_region_version:{region[0]}:{region[1]}'
+
+
+def _get_region_versions(regions):
+    keys = {region: region_version_key(region) for region in regions}
+    versions = cache.get_many(list(keys.values()))
+    result = {}
+    for region, key in keys.items():
+        version = versions.get(key)
+        if version is None:
+            # Версия от времени исключает совпадение со старыми записями после вытеснения ключа
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        result[region] = version
+    return result
+
+
+def _bump_region_versions(regions):
+    for region in regions:
+        key = region_version_key(region)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def invalidate_cells(cells):
+    """
+    Делает недействительными закэшированные ячейки во всех воркерах
+    (сразу и после коммита, как invalidate_player_profile).
+    """
+    regions = {region_of(cell) for cell in cells if cell is not None}
+    if regions:
+        _bump_region_versions(regions)
+        transaction.on_commit(lambda: _bump_region_versions(regions))
+
+
+class GeoTileCache:
+    """LRU содержимого ячеек сетки с ограничением по суммарному весу (1 + точек в ячейке)."""
+
+    def __init__(self, max_weight):
+        self.max_weight = max_weight
+        self._entries = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_points(self, ranges):
+        """
+        Точки (landmark_id, external_id, latitude, longitude) во всех ячейках диапазонов:
+        из LRU, недостающие ячейки - одним запросом на RANGES_PER_QUERY диапазонов.
+        """
+        cells = [cell for first, last in ranges for cell in range(first, last + 1)]
+        versions = _get_region_versions({region_of(cell) for cell in cells})
+        points = []
+        missing = []
+        with self._lock:
+            for cell in cells:
+                entry = self._entries.get(cell)
+                if entry is not None and entry[0] == versions[region_of(cell)]:
+                    self._entries.move_to_end(cell)
+                    points.extend(entry[1])
+                else:
+                    missing.append(cell)
+            self.hits += len(cells) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            loaded = self._load(missing)
+            for cell in missing:
+                points.extend(loaded[cell])
+            self._put({cell: (versions[region_of(cell)], loaded[cell]) for cell in missing})
+        return points
+
+    def _load(self, cells):
+        loaded = {cell: [] for cell in cells}
+        cell_ranges = _merge_ranges(cells)
+        for start in range(0, len(cell_ranges), RANGES_PER_QUERY):
+            condition = Q()
+            for first, last in cell_ranges[start:start + RANGES_PER_QUERY]:
+                condition |= Q(geo_cell=first) if first == last else Q(geo_cell__range=(first, last))
+            rows = Landmark.objects.filter(condition).values_list(
+                'geo_cell', 'id', 'external_id', 'latitude', 'longitude'
+            )
+            for cell, *point in rows:
+                if cell in loaded:
+                    loaded[cell].append(tuple(point))
+        return {cell: tuple(points) for cell, points in loaded.items()}
+
+    def _put(self, entries):
+        with self._lock:
+            for cell, (version, points) in entries.items():
+                old = self._entries.pop(cell, None)
+                if old is not None:
+                    self._weight -= 1 + len(old[1])
+                self._entries[cell] = (version, points)
+                self._weight += 1 + len(points)
+            while self._weight > self.max_weight and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._weight -= 1 + len(evicted[1])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "weight": self._weight,
+                "max_weight": self.max_weight,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+
+
+geo_tiles = GeoTileCache(getattr(settings, 'LANDMARK_GEO_TILE_CACHE_MAX_WEIGHT', 500000))
+
+
+def _merge_ranges(cells):
+    """Отсортированные номера ячеек -> непрерывные диапазоны."""
+    ranges = []
+    for cell in sorted(cells):
+        if ranges and ranges[-1][1] == cell - 1:
+            ranges[-1][1] = cell
+        else:
+            ranges.append([cell, cell])
+    return [tuple(cell_range) for cell_range in ranges]
+
+
+def distance_meters(lat1, lon1, lat2, lon2):
+    """Расстояние по поверхности Земли (гаверсинус)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    half_dphi = math.radians(lat2 - lat1) / 2
+    half_dlambda = math.radians(lon2 - lon1) / 2
+    a = math.sin(half_dphi) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(half_dlambda) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _with_ownership(points, now):
+    rows = get_ownership_rows(point[0] for point in points)
+    result = []
+    for landmark_id, external_id, latitude, longitude, *extra in points:
+        item = {"external_id": external_id, "lat": latitude, "lon": longitude}
+        if extra:
+            item["distance"] = round(extra[0], 1)
+        item["status"] = ownership_status(rows.get(landmark_id), now)
+        result.append(item)
+    return result
+
+
+def _in_longitude_span(longitude, min_lon, max_lon):
+    if min_lon <= max_lon:
+        return min_lon <= longitude <= max_lon
+    return longitude >= min_lon or longitude <= max_lon
+
+
+def landmarks_in_bbox(min_lat, min_lon, max_lat, max_lon, limit=MAX_GEO_RESULTS, now=None):
+    """
+    Достопримечательности с координатами в области и их статусы захвата.
+
+    Returns:
+        (list[dict], bool): Достопримечательности (по ID) и признак, что результат обрезан до limit
+    """
+    points = [
+        point for point in geo_tiles.get_points(bbox_ranges(min_lat, min_lon, max_lat, max_lon))
+        if min_lat <= point[2] <= max_lat and _in_longitude_span(point[3], min_lon, max_lon)
+    ]
+    points.sort()
+    return _with_ownership(points[:limit], now or timezone.now()), len(points) > limit
+
+
+def landmarks_near(latitude, longitude, radius, limit=MAX_GEO_RESULTS, now=None):
+    """
+    Достопримечательности в радиусе radius метров (ближние первыми) и их статусы захвата.
+
+    Returns:
+        (list[dict], bool): Достопримечательности и признак, что результат обрезан до limit
+    """
+    lat_delta = radius / METERS_PER_DEGREE
+    cos_lat = math.cos(math.radians(latitude))
+    lon_delta = 180 if cos_lat < 1e-6 else min(radius / (METERS_PER_DEGREE * cos_lat), 180)
+    min_lon, max_lon = longitude - lon_delta, longitude + lon_delta
+    if lon_delta >= 180:
+        min_lon, max_lon = -180, 180
+    # Выход за 180-й меридиан - область с min_lon > max_lon
+    min_lon = min_lon + 360 if min_lon < -180 else min_lon
+    max_lon = max_lon - 360 if max_lon > 180 else max_lon
+    ranges = bbox_ranges(max(latitude - lat_delta, -90), min_lon, min(latitude + lat_delta, 90), max_lon)
+
+    points = []
+    for landmark_id, external_id, point_lat, point_lon in geo_tiles.get_points(ranges):
+        distance = distance_meters(latitude, longitude, point_lat, point_lon)
+        if distance <= radius:
+            points.append((landmark_id, external_id, point_lat, point_lon, distance))
+    points.sort(key=lambda point: (point[4], point[0]))
+    return _with_ownership(points[:limit], now or timezone.now()), len(points) > limit
+
+
+def set_coordinates(coordinates, overwrite=False):
+    """
+    Сохраняет координаты достопримечательностей (создает недостающие Landmark).
+    Без overwrite координаты задаются только тем, у кого их еще нет - сообщения
+    клиентов не перезаписывают известные координаты.
+
+    Args:
+        coordinates (dict): {external_id: (latitude, longitude)}
+
+    Returns:
+        int: Количество достопримечательностей с измененными координатами
+    """
+    if not coordinates:
+        return 0
+    with transaction.atomic():
+        landmark_ids = intern_landmarks(list(coordinates))
+        keys = list(landmark_ids.values())
+        current = {}
+        for start in range(0, len(keys), IN_QUERY_CHUNK_SIZE):
+            current.update(
+                (landmark_id, (latitude, longitude, cell)) for landmark_id, latitude, longitude, cell in
+                Landmark.objects.filter(id__in=keys[start:start + IN_QUERY_CHUNK_SIZE]).values_list(
+                    'id', 'latitude', 'longitude', 'geo_cell'
+                )
+            )
+
+        changed = []
+        cells = set()
+        for external_id, (latitude, longitude) in coordinates.items():
+            landmark_id = landmark_ids[external_id]
+            old_latitude, old_longitude, old_cell = current[landmark_id]
+            if old_latitude is not None and (not overwrite or (old_latitude, old_longitude) == (latitude, longitude)):
+                continue
+            cell = cell_of(latitude, longitude)
+            changed.append(Landmark(id=landmark_id, latitude=latitude, longitude=longitude, geo_cell=cell))
+            cells.update((cell, old_cell))
+
+        Landmark.objects.bulk_update(changed, ['latitude', 'longitude', 'geo_cell'], batch_size=IN_QUERY_CHUNK_SIZE)
+        invalidate_cells(cells)
+    return len(changed)
@@ -0,0 +1,70 @@
+"""
+Массовое сохранение наблюдений игрока (SavePlayerLandmarksView).
+
+ID нормализуются и очищаются от дубликатов в памяти и преобразуются
+в ключи Landmark (landmarks.interning, без запросов для известных ID),
+уже сохраненные наблюдения выбираются одним IN-запросом, новые вставляются
+одним bulk_create(ignore_conflicts=True) - все в одной транзакции.
+"""
+import logging
+
+from django.db import transaction
+
+from .interning import IN_QUERY_CHUNK_SIZE, intern_landmarks
+from .models import Landmark, PlayerLandmarkObservation
+
+logger = logging.getLogger(__name__)
+
+MAX_EXTERNAL_ID_LENGTH = Landmark._meta.get_field('external_id').max_length
+
+
+def normalize_external_ids(external_ids):
+    """
+    Приводит ID к строкам без пробелов по краям, убирает пустые, слишком длинные
+    и повторяющиеся (порядок первого появления сохраняется).
+    """
+    normalized = {}
+    for external_id in external_ids:
+        external_id = str(external_id).strip()
+        if not external_id:
+            continue
+        if len(external_id) > MAX_EXTERNAL_ID_LENGTH:
+            logger.error(f"external_id is too long, skipped: {external_id[:50]}...")
+            continue
+        normalized.setdefault(external_id, None)
+    return list(normalized)
+
+
+def save_observations(player_id, external_ids):
+    """
+    Сохраняет наблюдения игрока.
+
+    Returns:
+        list[str]: Новые (ранее не сохраненные) external_ids в порядке запроса
+    """
+    external_ids = normalize_external_ids(external_ids)
+    if not external_ids:
+        return []
+
+    with transaction.atomic():
+        landmark_ids = intern_landmarks(external_ids)
+        keys = [landmark_ids[external_id] for external_id in external_ids]
+        existing = set()
+        for start in range(0, len(keys), IN_QUERY_CHUNK_SIZE):
+            existing.update(
+                PlayerLandmarkObservation.objects.filter(
+                    player_id=player_id, landmark_id__in=keys[start:start + IN_QUERY_CHUNK_SIZE]
+                ).values_list('landmark_id', flat=True)
+            )
+        new_external_ids = [external_id for external_id in external_ids if landmark_ids[external_id] not in existing]
+        # Параллельная вставка тех же ID другим запросом пропускается ограничением уникальности
+        PlayerLandmarkObservation.objects.bulk_create(
+            [
+                PlayerLandmarkObservation(player_id=player_id, landmark_id=landmark_ids[external_id])
+                for external_id in new_external_ids
+            ],
+            ignore_conflicts=True,
+            batch_size=IN_QUERY_CHUNK_SIZE,
+        )
+
+    return new_external_ids
@@ -0,0 +1,121 @@
+"""
+Преобразование ID достопримечательностей из Wikipedia API в ключи Landmark.
+
+Соответствие external_id -> id не меняется (записи Landmark не удаляются),
+поэтому хранится в LRU внутри воркера без инвалидации. Прочитанные и созданные
+ключи попадают в LRU только после коммита транзакции - при откате в кэше
+не остается несуществующих ключей.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Landmark
+
+IN_QUERY_CHUNK_SIZE = 500  # Параметров в одном IN-запросе (лимит переменных SQLite)
+
+
+class LandmarkInternCache:
+    """LRU соответствий external_id -> id ключа Landmark."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, external_ids):
+        found = {}
+        with self._lock:
+            for external_id in external_ids:
+                landmark_id = self._ids.get(external_id)
+                if landmark_id is not None:
+                    self._ids.move_to_end(external_id)
+                    found[external_id] = landmark_id
+            self.hits += len(found)
+            self.misses += len(external_ids) - len(found)
+        return found
+
+    def put_many(self, mapping):
+        with self._lock:
+            for external_id, landmark_id in mapping.items():
+                self._ids[external_id] = landmark_id
+                self._ids.move_to_end(external_id)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._ids), "max_size": self.max_size}
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+
+landmark_ids = LandmarkInternCache(getattr(settings, 'LANDMARK_INTERN_CACHE_SIZE', 200000))
+
+
+def _fetch(external_ids):
+    mapping = {}
+    external_ids = list(external_ids)
+    for start in range(0, len(external_ids), IN_QUERY_CHUNK_SIZE):
+        mapping.update(
+            Landmark.objects.filter(external_id__in=external_ids[start:start + IN_QUERY_CHUNK_SIZE])
+            .values_list('external_id', 'id')
+        )
+    return mapping
+
+
+def resolve_landmarks(external_ids):
+    """
+    Ключи уже известных достопримечательностей (без создания новых).
+
+    Returns:
+        dict: {external_id: id} только для найденных
+    """
+    mapping = landmark_ids.get_many(external_ids)
+    missing = [external_id for external_id in external_ids if external_id not in mapping]
+    if missing:
+        fetched = _fetch(missing)
+        # Внутри транзакции могут быть видны ключи, созданные ею же, - кэшируются после коммита
+        transaction.on_commit(lambda: landmark_ids.put_many(fetched))
+        mapping.update(fetched)
+    return mapping
+
+
+def resolve_landmark(external_id):
+    """Ключ достопримечательности или None, если она еще не встречалась."""
+    return resolve_landmarks([external_id]).get(external_id)
+
+
+def intern_landmarks(external_ids):
+    """
+    Ключи достопримечательностей, недостающие создаются.
+    Для ID из LRU запросов к БД нет, для остальных - один IN-запрос
+    (и INSERT с повторным IN-запросом для новых).
+
+    Returns:
+        dict: {external_id: id} для всех external_ids
+    """
+    mapping = resolve_landmarks(external_ids)
+    missing = [external_id for external_id in dict.fromkeys(external_ids) if external_id not in mapping]
+    if missing:
+        # Параллельное создание тех же ID пропускается ограничением уникальности
+        Landmark.objects.bulk_create(
+            [Landmark(external_id=external_id) for external_id in missing],
+            ignore_conflicts=True,
+            batch_size=IN_QUERY_CHUNK_SIZE,
+        )
+        created = _fetch(missing)
+        transaction.on_commit(lambda: landmark_ids.put_many(created))
+        mapping.update(created)
+    return mapping
+
+
+def intern_landmark(external_id):
+    """Ключ достопримечательности (создается, если его еще нет)."""
+    return intern_landmarks([external_id])[external_id]
@@ -0,0 +1,192 @@
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F
+
+from landmarks.models import CAPTURE_COOLDOWN, Landmark, LandmarkCapture, LandmarkOwnership
+from landmarks.ownership import capture_landmark
+
+User = get_user_model()
+
+
+def capture_check_then_write(landmark_id, user):
+    """Прежний способ: проверка перезарядки и запись отдельными шагами (для сравнения)."""
+    ownership = LandmarkOwnership.objects.filter(landmark_id=landmark_id).first()
+    if ownership is not None and not ownership.can_capture_now():
+        return False
+    with transaction.atomic():
+        capture = LandmarkCapture.objects.create(landmark_id=landmark_id, captured_by_id=user.id)
+        LandmarkOwnership.objects.bulk_create(
+            [LandmarkOwnership(landmark_id=landmark_id, owner_id=user.id, captured_at=capture.captured_at)],
+            update_conflicts=True,
+            unique_fields=['landmark'],
+            update_fields=['owner', 'clan', 'captured_at'],
+        )
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        "Параллельные захваты достопримечательностей из нескольких потоков: проверяет, что из "
+        "одновременных захватов одной достопримечательности успешен ровно один, и измеряет пропускную "
+        "способность. Ошибка БД в любом потоке - нарушение. Работает с настроенной БД (нагрузка "
+        "на рабочую конфигурацию), созданные данные удаляются в конце; те же проверки на тестовой "
+        "БД - landmarks.tests.CaptureConcurrencyTests"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--landmarks', type=int, default=200, help="Достопримечательностей в сценариях different/mixed")
+        parser.add_argument('--rounds', type=int, default=5, help="Раундов в сценарии same (после каждого перезарядка сбрасывается)")
+        parser.add_argument('--legacy', action='store_true', help="Также прогнать прежний способ (проверка, затем запись)")
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        prefix = f'bench_capture_{time.time_ns()}'
+        User.objects.bulk_create([User(username=f'{prefix}_{index}', password='!') for index in range(threads)])
+        users = list(User.objects.filter(username__startswith=prefix).order_by('id'))
+        self.landmark_ids = []
+        self.prefix = prefix
+        failures = []
+        try:
+            engines = [('cas', capture_landmark)]
+            if options['legacy']:
+                engines.append(('legacy', capture_check_then_write))
+            for name, engine in engines:
+                failures += self.scenario_same(name, engine, users, options['rounds'])
+                failures += self.scenario_different(name, engine, users, options['landmarks'])
+                failures += self.scenario_mixed(name, engine, users, options['landmarks'])
+        finally:
+            LandmarkOwnership.objects.filter(landmark_id__in=self.landmark_ids).delete()
+            LandmarkCapture.objects.filter(landmark_id__in=self.landmark_ids).delete()
+            Landmark.objects.filter(id__in=self.landmark_ids).delete()
+            User.objects.filter(username__startswith=prefix).delete()
+
+        cas_failures = [failure for failure in failures if failure.startswith('cas')]
+        for failure in failures:
+            self.stdout.write(self.style.WARNING(failure))
+        if cas_failures:
+            raise CommandError(f"Нарушений у capture_landmark: {len(cas_failures)}")
+        self.stdout.write(self.style.SUCCESS("capture_landmark: нарушений нет"))
+
+    def create_landmarks(self, count):
+        names = [f'{self.prefix}_{len(self.landmark_ids) + index}' for index in range(count)]
+        Landmark.objects.bulk_create([Landmark(external_id=name) for name in names])
+        ids = list(Landmark.objects.filter(external_id__in=names).order_by('id').values_list('id', flat=True))
+        self.landmark_ids += ids
+        return ids
+
+    def run_threads(self, engine, users, plans):
+        """
+        Запускает по потоку на пользователя, plans[i] - список landmark_id потока i.
+
+        Returns:
+            (list[(landmark_id, user_id)] успешных захватов, попыток, ошибок БД, секунд)
+        """
+        barrier = threading.Barrier(len(users))
+        wins = []
+        counters = {'attempts': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def worker(user, plan):
+            try:
+                barrier.wait()
+                for landmark_id in plan:
+                    try:
+                        result = engine(landmark_id, user)
+                    except DatabaseError:
+                        with lock:
+                            counters['errors'] += 1
+                        continue
+                    won = result if isinstance(result, bool) else result.captured
+                    with lock:
+                        counters['attempts'] += 1
+                        if won:
+                            wins.append((landmark_id, user.id))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(user, plan)) for user, plan in zip(users, plans)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        close_old_connections()
+        return wins, counters['attempts'], counters['errors'], elapsed
+
+    def report(self, name, scenario, wins, attempts, errors, elapsed):
+        self.stdout.write(
+            f"{name:6} {scenario:10} попыток: {attempts:6}, захватов: {len(wins):6}, ошибок БД: {errors:4}, "
+            f"{elapsed * 1000:9.1f} мс, {attempts / elapsed if elapsed else 0:8.0f} попыток/с"
+        )
+
+    def check_owners(self, name, scenario, wins, errors, landmark_ids):
+        """
+        Один успешный захват на достопримечательность, владелец и история с ним согласованы,
+        ошибок БД нет (упавший захват - такой же отказ клиенту, как и двойной).
+        """
+        failures = []
+        if errors:
+            failures.append(f"{name} {scenario}: ошибок БД {errors}")
+        winners = {}
+        for landmark_id, user_id in wins:
+            winners.setdefault(landmark_id, []).append(user_id)
+        owners = dict(LandmarkOwnership.objects.filter(landmark_id__in=landmark_ids).values_list('landmark_id', 'owner_id'))
+        history = {}
+        for landmark_id, user_id in LandmarkCapture.objects.filter(landmark_id__in=landmark_ids).values_list(
+            'landmark_id', 'captured_by_id'
+        ):
+            history.setdefault(landmark_id, []).append(user_id)
+        for landmark_id in landmark_ids:
+            landmark_winners = winners.get(landmark_id, [])
+            if len(landmark_winners) != 1:
+                failures.append(f"{name} {scenario}: landmark {landmark_id} - успешных захватов {len(landmark_winners)}")
+            elif owners.get(landmark_id) != landmark_winners[0]:
+                failures.append(f"{name} {scenario}: landmark {landmark_id} - владелец не совпадает с победителем")
+            if sorted(history.get(landmark_id, [])) != sorted(landmark_winners):
+                failures.append(f"{name} {scenario}: landmark {landmark_id} - история не совпадает с захватами")
+        return failures
+
+    def scenario_same(self, name, engine, users, rounds):
+        """Все потоки одновременно захватывают одну достопримечательность, rounds раз."""
+        landmark_id, = self.create_landmarks(1)
+        failures = []
+        for round_number in range(rounds):
+            if round_number:
+                # Перезарядка прошла - следующий раунд идет через условный UPDATE, а не INSERT
+                LandmarkOwnership.objects.filter(landmark_id=landmark_id).update(
+                    captured_at=F('captured_at') - CAPTURE_COOLDOWN - timedelta(seconds=1)
+                )
+                LandmarkCapture.objects.filter(landmark_id=landmark_id).delete()
+            wins, attempts, errors, elapsed = self.run_threads(engine, users, [[landmark_id]] * len(users))
+            failures += self.check_owners(name, f'same#{round_number + 1}', wins, errors, [landmark_id])
+            self.report(name, f'same#{round_number + 1}', wins, attempts, errors, elapsed)
+        return failures
+
+    def scenario_different(self, name, engine, users, landmarks):
+        """Каждый поток захватывает свои достопримечательности - конкуренции за строки нет."""
+        per_thread = max(landmarks // len(users), 1)
+        landmark_ids = self.create_landmarks(per_thread * len(users))
+        plans = [landmark_ids[index::len(users)] for index in range(len(users))]
+        wins, attempts, errors, elapsed = self.run_threads(engine, users, plans)
+        self.report(name, 'different', wins, attempts, errors, elapsed)
+        return self.check_owners(name, 'different', wins, errors, landmark_ids)
+
+    def scenario_mixed(self, name, engine, users, landmarks):
+        """Все потоки захватывают один набор достопримечательностей в случайном порядке."""
+        landmark_ids = self.create_landmarks(landmarks)
+        plans = []
+        for index in range(len(users)):
+            plan = list(landmark_ids)
+            random.Random(index).shuffle(plan)
+            plans.append(plan)
+        wins, attempts, errors, elapsed = self.run_threads(engine, users, plans)
+        self.report(name, 'mixed', wins, attempts, errors, elapsed)
+        return self.check_owners(name, 'mixed', wins, errors, landmark_ids)
@@ -0,0 +1,127 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from landmarks.geo import (
+    MAX_GEO_RESULTS, METERS_PER_DEGREE, cell_of, geo_tiles, invalidate_cells, landmarks_in_bbox, landmarks_near
+)
+from landmarks.models import Landmark, LandmarkOwnership
+from landmarks.ownership import get_ownership_rows, ownership_status
+
+User = get_user_model()
+
+
+def landmarks_in_bbox_scan(min_lat, min_lon, max_lat, max_lon, now):
+    """Без пространственного индекса: фильтр по координатам (для сравнения)."""
+    points = list(
+        Landmark.objects.filter(
+            latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon)
+        ).order_by('id').values_list('id', 'external_id', 'latitude', 'longitude')[:MAX_GEO_RESULTS]
+    )
+    rows = get_ownership_rows(point[0] for point in points)
+    return [
+        {"external_id": external_id, "lat": latitude, "lon": longitude, "status": ownership_status(rows.get(landmark_id), now)}
+        for landmark_id, external_id, latitude, longitude in points
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер запросов по области и радиусу на плотном городе (по умолчанию 100 000 достопримечательностей): "
+        "фильтр по координатам без индекса, сетка с холодным и с прогретым кэшем ячеек. Данные откатываются"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--landmarks', type=int, default=100000)
+        parser.add_argument('--center', type=float, nargs=2, default=[55.751, 37.618], help="Центр города (широта долгота)")
+        parser.add_argument('--spread', type=float, default=0.15, help="Полуширина города в градусах")
+        parser.add_argument('--captured', type=float, default=0.3, help="Доля захваченных")
+        parser.add_argument('--queries', type=int, default=50, help="Запросов на каждый сценарий")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        center_lat, center_lon = options['center']
+        spread = options['spread']
+        cells = set()
+        try:
+            with transaction.atomic():
+                self.stdout.write(f"Создание {options['landmarks']} достопримечательностей...")
+                prefix = f'bench_geo_{time.time_ns()}'
+                landmarks = []
+                for index in range(options['landmarks']):
+                    # Плотность выше к центру города
+                    latitude = center_lat + rng.gauss(0, spread / 2.5)
+                    longitude = center_lon + rng.gauss(0, spread / 2.5)
+                    cell = cell_of(latitude, longitude)
+                    cells.add(cell)
+                    landmarks.append(Landmark(
+                        external_id=f'{prefix}_{index}', latitude=latitude, longitude=longitude, geo_cell=cell
+                    ))
+                Landmark.objects.bulk_create(landmarks, batch_size=500)
+                landmark_ids = list(
+                    Landmark.objects.filter(external_id__startswith=prefix).values_list('id', flat=True)
+                )
+                User.objects.bulk_create([User(username=f'{prefix}_{index}', password='!') for index in range(50)])
+                owners = list(User.objects.filter(username__startswith=prefix).values_list('id', flat=True))
+                now = timezone.now()
+                LandmarkOwnership.objects.bulk_create(
+                    [
+                        LandmarkOwnership(landmark_id=landmark_id, owner_id=rng.choice(owners), captured_at=now)
+                        for landmark_id in rng.sample(landmark_ids, int(len(landmark_ids) * options['captured']))
+                    ],
+                    batch_size=500,
+                )
+                invalidate_cells(cells)
+                geo_tiles.clear()
+
+                for size_meters in (500, 2000, 5000):
+                    boxes = []
+                    for _ in range(options['queries']):
+                        lat = center_lat + rng.uniform(-spread, spread) / 2
+                        lon = center_lon + rng.uniform(-spread, spread) / 2
+                        half_lat = size_meters / 2 / METERS_PER_DEGREE
+                        half_lon = half_lat * 1.8  # Экран шире, чем выше
+                        boxes.append((lat - half_lat, lon - half_lon, lat + half_lat, lon + half_lon))
+                    self.measure(f'bbox {size_meters:5} м  scan', boxes, lambda box: landmarks_in_bbox_scan(*box, now))
+                    geo_tiles.clear()
+                    self.measure(f'bbox {size_meters:5} м  grid cold', boxes, lambda box: landmarks_in_bbox(*box, now=now)[0])
+                    self.measure(f'bbox {size_meters:5} м  grid warm', boxes, lambda box: landmarks_in_bbox(*box, now=now)[0])
+
+                points = [
+                    (center_lat + rng.uniform(-spread, spread) / 2, center_lon + rng.uniform(-spread, spread) / 2)
+                    for _ in range(options['queries'])
+                ]
+                for radius in (300, 1000):
+                    self.measure(
+                        f'radius {radius:4} м   grid warm', points,
+                        lambda point: landmarks_near(point[0], point[1], radius, now=now)[0]
+                    )
+                self.stdout.write(f"Кэш ячеек: {geo_tiles.stats()}")
+                transaction.set_rollback(True)
+        finally:
+            # В кэше остались ячейки с откаченными данными
+            geo_tiles.clear()
+            invalidate_cells(cells)
+
+    def measure(self, name, arguments, query):
+        timings = []
+        queries = []
+        results = []
+        for argument in arguments:
+            reset_queries()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                found = query(argument)
+                timings.append(time.perf_counter() - started)
+            queries.append(len(captured))
+            results.append(len(found))
+        self.stdout.write(
+            f"{name:28} результатов: {statistics.mean(results):7.1f}, запросов к БД: {statistics.mean(queries):4.1f}, "
+            f"среднее: {statistics.mean(timings) * 1000:7.2f} мс, p95: {sorted(timings)[int(len(timings) * 0.95) - 1] * 1000:7.2f} мс"
+        )
@@ -0,0 +1,53 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+
+from landmarks.ingest import save_observations
+from landmarks.models import Landmark, PlayerLandmarkObservation
+
+User = get_user_model()
+
+
+def save_observations_one_by_one(player_id, external_ids):
+    """Прежний способ: get_or_create на каждый ID (для сравнения)."""
+    saved = []
+    for external_id in external_ids:
+        landmark, _ = Landmark.objects.get_or_create(external_id=external_id)
+        _, created = PlayerLandmarkObservation.objects.get_or_create(player_id=player_id, landmark=landmark)
+        if created:
+            saved.append(external_id)
+    return saved
+
+
+class Command(BaseCommand):
+    help = "Сравнивает сохранение наблюдений по одному и массовое: запросы к БД и время"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help="Размеры запроса (ID)")
+
+    def handle(self, *args, **options):
+        # Все изменения откатываются в конце - база не засоряется
+        with transaction.atomic():
+            prefix = f'bench_ingest_{time.time_ns()}'
+            for size in options['sizes']:
+                external_ids = [f'Q{index}' for index in range(size)]
+                for name, save in (('get_or_create', save_observations_one_by_one), ('bulk', save_observations)):
+                    player = User.objects.create_user(username=f'{prefix}_{name}_{size}')
+                    # Первая синхронизация (все ID новые) и повторная (все ID уже сохранены)
+                    for phase in ('new', 'repeat'):
+                        # Журнал запросов ограничен - иначе на больших размерах счетчик обнуляется
+                        reset_queries()
+                        with CaptureQueriesContext(connection) as queries:
+                            started = time.perf_counter()
+                            saved = save(player.id, external_ids)
+                            elapsed = time.perf_counter() - started
+                        assert len(saved) == (size if phase == 'new' else 0)
+                        self.stdout.write(
+                            f"{size:5} ID {name:14} {phase:6} "
+                            f"запросов к БД: {len(queries):5}, время: {elapsed * 1000:8.2f} мс"
+                        )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,96 @@
+import asyncio
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from landmarks.realtime import Subscription, TimerWheel, broker
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер брокера push-уведомлений в одном процессе: раздача событий захвата подписчикам "
+        "(достопримечательности и ячейки) и колесо таймеров перезарядки против loop.call_later. "
+        "БД не используется"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=5000, help="Соединений")
+        parser.add_argument('--landmarks', type=int, default=20000, help="Достопримечательностей в городе")
+        parser.add_argument('--per-subscriber', type=int, default=50, help="Подписок на достопримечательности у соединения")
+        parser.add_argument('--events', type=int, default=20000, help="Событий захвата")
+        parser.add_argument('--timers', type=int, default=200000, help="Таймеров перезарядки")
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options))
+
+    async def run(self, options):
+        rng = random.Random(42)
+        broker.attach(start_backend=False)
+        subscriptions = []
+        for _ in range(options['subscribers']):
+            subscription = Subscription()
+            landmarks = {f'Q{rng.randrange(options["landmarks"])}' for _ in range(options['per_subscriber'])}
+            broker.subscribe(subscription, landmarks, {rng.randrange(400)})
+            subscriptions.append(subscription)
+        self.stdout.write(f"Подписки: {broker.stats()}")
+
+        now = timezone.now().isoformat()
+        events = [
+            {
+                "type": "ownership_changed",
+                "external_id": f'Q{rng.randrange(options["landmarks"])}',
+                "cell": rng.randrange(400),
+                "status": {"owner": {"id": 1, "username": "bench"}, "clan": None,
+                           "captured_at": now, "can_capture_now": False},
+            }
+            for _ in range(options['events'])
+        ]
+        delivered = 0
+        timings = []
+        for start in range(0, len(events), 1000):
+            batch = events[start:start + 1000]
+            started = time.perf_counter()
+            for event in batch:
+                broker.dispatch(event)
+            # Доставка выполняется циклом событий, как при публикации из потока запроса
+            await asyncio.sleep(0)
+            timings.append((time.perf_counter() - started) / len(batch))
+            for subscription in subscriptions:
+                delivered += subscription.queue.qsize()
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+        self.stdout.write(
+            f"Раздача: событий {len(events)}, доставлено {delivered}, "
+            f"среднее на событие {statistics.mean(timings) * 1e6:.1f} мкс, таймеров {broker.stats()['timers']}"
+        )
+        for subscription in subscriptions:
+            broker.remove(subscription)
+
+        loop = asyncio.get_running_loop()
+        delays = [rng.uniform(0, 3600) for _ in range(options['timers'])]
+        wheel = TimerWheel()
+        started = time.perf_counter()
+        for delay in delays:
+            wheel.schedule(delay, _noop)
+        wheel_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(3600):
+            wheel.advance()
+        wheel_run_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        handles = [loop.call_later(delay, _noop) for delay in delays]
+        call_later_seconds = time.perf_counter() - started
+        for handle in handles:
+            handle.cancel()
+        self.stdout.write(
+            f"Таймеры ({len(delays)}): колесо - добавление {wheel_seconds * 1000:.1f} мс, "
+            f"3600 тиков {wheel_run_seconds * 1000:.1f} мс; loop.call_later - добавление {call_later_seconds * 1000:.1f} мс"
+        )
+
+
+def _noop():
+    pass
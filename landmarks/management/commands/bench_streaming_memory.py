@@ -0,0 +1,77 @@
+import gc
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.profile_cache import player_profiles
+from landmarks.models import Landmark, PlayerLandmarkObservation
+from landmarks.views import GetPlayerLandmarksView
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер пиковой памяти GetPlayerLandmarksView: обычный ответ против потокового "
+        "(?stream=json и ?stream=ndjson) для игроков с разной длиной списка. Данные откатываются"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000, 100000])
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        view = GetPlayerLandmarksView.as_view()
+        with transaction.atomic():
+            prefix = f'bench_stream_{time.time_ns()}'
+            Landmark.objects.bulk_create(
+                [Landmark(external_id=f'{prefix}_{index}') for index in range(max(options['sizes']))], batch_size=1000
+            )
+            landmark_ids = list(
+                Landmark.objects.filter(external_id__startswith=prefix).order_by('id').values_list('id', flat=True)
+            )
+            for size in options['sizes']:
+                player = User.objects.create(username=f'{prefix}_{size}', password='!')
+                PlayerLandmarkObservation.objects.bulk_create(
+                    [PlayerLandmarkObservation(player_id=player.id, landmark_id=landmark_id) for landmark_id in landmark_ids[:size]],
+                    batch_size=1000,
+                )
+                for mode in ('', 'json', 'ndjson'):
+                    query = f'?stream={mode}' if mode else ''
+                    request = factory.get(f'/api/landmarks/player/{player.id}/{query}')
+                    force_authenticate(request, user=player)
+                    # Обычный ответ измеряется с холодным кэшем профилей: список читается из БД, как и в потоковом
+                    player_profiles.clear()
+                    peak, seconds, length = self.measure(lambda: view(request, player_id=player.id))
+                    self.stdout.write(
+                        f"{size:7} ids  {mode or 'regular':8} пик памяти: {peak / 1024 / 1024:7.2f} МБ, "
+                        f"{seconds * 1000:8.1f} мс, ответ {length / 1024:8.1f} КБ"
+                    )
+                player_profiles.clear()
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def measure(call):
+        """Пик выделенной Python памяти за время формирования и отправки ответа."""
+        gc.collect()
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = call()
+        length = 0
+        if response.streaming:
+            # Как WSGI-сервер: части отправляются и освобождаются по одной
+            for chunk in response.streaming_content:
+                length += len(chunk)
+        else:
+            response.render()
+            length = len(response.content)
+        seconds = time.perf_counter() - started
+        # response.close() не вызывается: сигнал request_finished закрыл бы соединение внутри транзакции
+        del response
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak, seconds, length
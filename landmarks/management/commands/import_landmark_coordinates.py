@@ -0,0 +1,80 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from landmarks.geo import cell_of, geo_tiles, invalidate_cells, set_coordinates
+from landmarks.models import Landmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Импортирует координаты достопримечательностей из CSV (external_id,latitude,longitude) "
+        "пачками; известные координаты перезаписываются"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', nargs='?', help="CSV-файл; первая строка может быть заголовком")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--keep-existing', action='store_true', help="Не менять уже известные координаты")
+        parser.add_argument(
+            '--recompute-cells', action='store_true',
+            help="Пересчитать geo_cell всех достопримечательностей с координатами (после изменения GEO_CELL_SIZE)"
+        )
+
+    def handle(self, *args, **options):
+        if options['recompute_cells']:
+            updated = self.recompute_cells(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Пересчитано ячеек: {updated}"))
+        if not options['file']:
+            if not options['recompute_cells']:
+                raise CommandError("Укажите CSV-файл или --recompute-cells")
+            return
+
+        imported = 0
+        skipped = 0
+        batch = {}
+        with open(options['file'], newline='', encoding='utf-8') as source:
+            for line_number, row in enumerate(csv.reader(source), start=1):
+                try:
+                    external_id, latitude, longitude = row[0].strip(), float(row[1]), float(row[2])
+                except (IndexError, ValueError):
+                    if line_number > 1:
+                        self.stderr.write(f"Строка {line_number} пропущена: {row}")
+                    skipped += 1
+                    continue
+                if not external_id or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                    self.stderr.write(f"Строка {line_number} пропущена: {row}")
+                    skipped += 1
+                    continue
+                batch[external_id] = (latitude, longitude)
+                if len(batch) >= options['batch_size']:
+                    imported += set_coordinates(batch, overwrite=not options['keep_existing'])
+                    batch = {}
+        imported += set_coordinates(batch, overwrite=not options['keep_existing'])
+        self.stdout.write(self.style.SUCCESS(f"Изменены координаты: {imported}, пропущено строк: {skipped}"))
+
+    def recompute_cells(self, batch_size):
+        updated = 0
+        last_id = 0
+        while True:
+            rows = list(
+                Landmark.objects.filter(id__gt=last_id, latitude__isnull=False, longitude__isnull=False)
+                .order_by('id').values_list('id', 'latitude', 'longitude', 'geo_cell')[:batch_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            changed = []
+            cells = set()
+            for landmark_id, latitude, longitude, old_cell in rows:
+                cell = cell_of(latitude, longitude)
+                if cell != old_cell:
+                    changed.append(Landmark(id=landmark_id, geo_cell=cell))
+                    cells.update((cell, old_cell))
+            with transaction.atomic():
+                Landmark.objects.bulk_update(changed, ['geo_cell'], batch_size=500)
+                invalidate_cells(cells)
+            updated += len(changed)
+        geo_tiles.clear()
+        return updated
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from landmarks.ownership import rebuild_ownership
+
+
+class Command(BaseCommand):
+    help = "Пересобирает текущих владельцев достопримечательностей (LandmarkOwnership) по истории захватов"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = rebuild_ownership(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Достопримечательностей с владельцем: {total}"))
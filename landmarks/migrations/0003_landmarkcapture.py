@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clans', '0001_initial'),
+        ('landmarks', '0002_auto_20251203_2217'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LandmarkCapture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.CharField(db_index=True, help_text='ID достопримечательности из Wikipedia API', max_length=200)),
+                ('captured_at', models.DateTimeField(auto_now_add=True, verbose_name='Время захвата')),
+                ('captured_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='landmark_captures', to=settings.AUTH_USER_MODEL, verbose_name='Игрок, который захватил')),
+                ('clan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='landmark_captures', to='clans.clan', verbose_name='Клан')),
+            ],
+            options={
+                'verbose_name': 'Захват достопримечательности',
+                'verbose_name_plural': 'Захваты достопримечательностей',
+                'ordering': ['-captured_at'],
+                'indexes': [models.Index(fields=['external_id', '-captured_at'], name='landmarks_l_externa_ac5aed_idx'), models.Index(fields=['clan'], name='landmarks_l_clan_id_ecfd78_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landmarks', '0003_landmarkcapture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Landmark',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('external_id', models.CharField(help_text='ID достопримечательности из Wikipedia API', max_length=200, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Достопримечательность',
+                'verbose_name_plural': 'Достопримечательности',
+            },
+        ),
+        migrations.AddField(
+            model_name='playerlandmarkobservation',
+            name='landmark',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='observations', to='landmarks.landmark'),
+        ),
+        migrations.AddField(
+            model_name='landmarkcapture',
+            name='landmark',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='captures', to='landmarks.landmark'),
+        ),
+        # Строковые ID необязательны до удаления в 0006 - так миграции обратимы
+        migrations.AlterField(
+            model_name='playerlandmarkobservation',
+            name='external_id',
+            field=models.CharField(help_text='ID достопримечательности из Wikipedia API', max_length=200, null=True),
+        ),
+        migrations.AlterField(
+            model_name='landmarkcapture',
+            name='external_id',
+            field=models.CharField(db_index=True, help_text='ID достопримечательности из Wikipedia API', max_length=200, null=True),
+        ),
+    ]
@@ -0,0 +1,93 @@
+"""
+Заполняет словарь Landmark по строковым external_id наблюдений и захватов
+и проставляет ссылки на него.
+
+Строки обрабатываются пачками по id, каждая пачка коммитится отдельно
+(миграция не атомарная), поэтому на больших таблицах блокировки короткие,
+а прерванную миграцию можно запустить повторно - обрабатываются только
+строки без ссылки.
+"""
+from django.db import migrations
+
+CHUNK_SIZE = 2000
+IN_QUERY_CHUNK_SIZE = 500  # Параметров в одном IN-запросе (лимит переменных SQLite)
+
+
+def _intern(Landmark, external_ids):
+    external_ids = list(external_ids)
+    Landmark.objects.bulk_create(
+        [Landmark(external_id=external_id) for external_id in external_ids],
+        ignore_conflicts=True,
+        batch_size=IN_QUERY_CHUNK_SIZE,
+    )
+    mapping = {}
+    for start in range(0, len(external_ids), IN_QUERY_CHUNK_SIZE):
+        mapping.update(
+            Landmark.objects.filter(external_id__in=external_ids[start:start + IN_QUERY_CHUNK_SIZE])
+            .values_list('external_id', 'id')
+        )
+    return mapping
+
+
+def _convert(Landmark, Model):
+    # Строки без ID достопримечательности сослать не на что
+    Model.objects.filter(landmark__isnull=True, external_id__isnull=True).delete()
+    Model.objects.filter(landmark__isnull=True, external_id='').delete()
+
+    last_id = 0
+    while True:
+        rows = list(
+            Model.objects.filter(id__gt=last_id, landmark__isnull=True).order_by('id')
+            .values_list('id', 'external_id')[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        mapping = _intern(Landmark, {external_id for _, external_id in rows})
+        Model.objects.bulk_update(
+            [Model(id=row_id, landmark_id=mapping[external_id]) for row_id, external_id in rows],
+            ['landmark'],
+            batch_size=IN_QUERY_CHUNK_SIZE,
+        )
+
+
+def forwards(apps, schema_editor):
+    Landmark = apps.get_model('landmarks', 'Landmark')
+    _convert(Landmark, apps.get_model('landmarks', 'PlayerLandmarkObservation'))
+    _convert(Landmark, apps.get_model('landmarks', 'LandmarkCapture'))
+
+
+def backwards(apps, schema_editor):
+    Landmark = apps.get_model('landmarks', 'Landmark')
+    for model_name in ('PlayerLandmarkObservation', 'LandmarkCapture'):
+        Model = apps.get_model('landmarks', model_name)
+        last_id = 0
+        while True:
+            rows = list(
+                Model.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'landmark_id')[:IN_QUERY_CHUNK_SIZE]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            names = dict(
+                Landmark.objects.filter(id__in={landmark_id for _, landmark_id in rows}).values_list('id', 'external_id')
+            )
+            Model.objects.bulk_update(
+                [Model(id=row_id, external_id=names[landmark_id]) for row_id, landmark_id in rows],
+                ['external_id'],
+                batch_size=IN_QUERY_CHUNK_SIZE,
+            )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('landmarks', '0004_landmark'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,56 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landmarks', '0005_populate_landmarks'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='playerlandmarkobservation',
+            unique_together=set(),
+        ),
+        migrations.RemoveIndex(
+            model_name='playerlandmarkobservation',
+            name='landmarks_p_player__0c22d6_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='landmarkcapture',
+            name='landmarks_l_externa_ac5aed_idx',
+        ),
+        migrations.RemoveField(
+            model_name='playerlandmarkobservation',
+            name='external_id',
+        ),
+        migrations.RemoveField(
+            model_name='landmarkcapture',
+            name='external_id',
+        ),
+        migrations.AlterField(
+            model_name='playerlandmarkobservation',
+            name='landmark',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='observations', to='landmarks.landmark'),
+        ),
+        migrations.AlterField(
+            model_name='landmarkcapture',
+            name='landmark',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='captures', to='landmarks.landmark'),
+        ),
+        migrations.AddConstraint(
+            model_name='playerlandmarkobservation',
+            constraint=models.UniqueConstraint(fields=('player', 'landmark'), name='landmarks_observation_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='playerlandmarkobservation',
+            index=models.Index(fields=['player', '-observed_at'], name='landmarks_obs_player_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='landmarkcapture',
+            index=models.Index(fields=['landmark', '-captured_at'], name='landmarks_capture_time_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+BATCH_SIZE = 1000
+
+
+def populate_ownership(apps, schema_editor):
+    """Владелец каждой достопримечательности - автор ее последнего захвата."""
+    LandmarkCapture = apps.get_model('landmarks', 'LandmarkCapture')
+    LandmarkOwnership = apps.get_model('landmarks', 'LandmarkOwnership')
+    last_id = 0
+    while True:
+        landmark_ids = list(
+            LandmarkCapture.objects.filter(landmark_id__gt=last_id).order_by('landmark_id')
+            .values_list('landmark_id', flat=True).distinct()[:BATCH_SIZE]
+        )
+        if not landmark_ids:
+            break
+        last_id = landmark_ids[-1]
+        latest = LandmarkCapture.objects.filter(landmark_id__in=landmark_ids).annotate(
+            row_number=Window(
+                RowNumber(), partition_by=F('landmark_id'), order_by=[F('captured_at').desc(), F('id').desc()]
+            ),
+        ).filter(row_number=1).values_list('landmark_id', 'captured_by_id', 'clan_id', 'captured_at')
+        LandmarkOwnership.objects.bulk_create([
+            LandmarkOwnership(landmark_id=landmark_id, owner_id=owner_id, clan_id=clan_id, captured_at=captured_at)
+            for landmark_id, owner_id, clan_id, captured_at in latest
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clans', '0001_initial'),
+        ('landmarks', '0006_remove_external_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LandmarkOwnership',
+            fields=[
+                ('landmark', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ownership', serialize=False, to='landmarks.landmark')),
+                ('captured_at', models.DateTimeField(verbose_name='Время захвата')),
+                ('clan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='owned_landmarks', to='clans.clan', verbose_name='Клан владельца')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='owned_landmarks', to=settings.AUTH_USER_MODEL, verbose_name='Текущий владелец')),
+            ],
+            options={
+                'verbose_name': 'Владелец достопримечательности',
+                'verbose_name_plural': 'Владельцы достопримечательностей',
+            },
+        ),
+        migrations.RunPython(populate_ownership, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:08
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landmarks', '0007_landmarkownership'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='landmarkcapture',
+            name='captured_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время захвата'),
+        ),
+    ]
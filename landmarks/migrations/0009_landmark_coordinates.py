@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landmarks', '0008_capture_time_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='landmark',
+            name='geo_cell',
+            field=models.BigIntegerField(blank=True, db_index=True, help_text='Ячейка сетки GEO_CELL_SIZE градусов (landmarks.geo.cell_of)', null=True),
+        ),
+        migrations.AddField(
+            model_name='landmark',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Широта'),
+        ),
+        migrations.AddField(
+            model_name='landmark',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Долгота'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clans', '0001_initial'),
+        ('landmarks', '0009_landmark_coordinates'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='landmarkcapture',
+            name='landmarks_l_clan_id_ecfd78_idx',
+        ),
+        migrations.AddIndex(
+            model_name='landmarkcapture',
+            index=models.Index(fields=['clan', 'landmark'], name='landmarks_capture_clan_idx'),
+        ),
+    ]
@@ -5,26 +5,60 @@ from datetime import timedelta
 
 User = get_user_model()
 
+CAPTURE_COOLDOWN = timedelta(hours=1)  # Через сколько после захвата достопримечательность можно захватить снова
+
+
+class Landmark(models.Model):
+    """
+    Словарь достопримечательностей: ID из Wikipedia API -> компактный целочисленный ключ.
+    Наблюдения и захваты ссылаются на этот ключ, строка хранится один раз.
+    ID в API остаются строками, преобразование - через landmarks.interning.
+    """
+    id = models.AutoField(primary_key=True)
+    external_id = models.CharField(max_length=200, unique=True, help_text="ID достопримечательности из Wikipedia API")
+    # Координаты необязательны: сообщаются клиентами или импортируются (landmarks.geo)
+    latitude = models.FloatField(null=True, blank=True, verbose_name="Широта")
+    longitude = models.FloatField(null=True, blank=True, verbose_name="Долгота")
+    geo_cell = models.BigIntegerField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="Ячейка сетки GEO_CELL_SIZE градусов (landmarks.geo.cell_of)"
+    )
+
+    class Meta:
+        verbose_name = "Достопримечательность"
+        verbose_name_plural = "Достопримечательности"
+
+    def __str__(self):
+        return self.external_id
+
 
 class PlayerLandmarkObservation(models.Model):
     """
     Модель для хранения факта наблюдения игрока в достопримечательности.
-    Хранит только external_id (ID из Wikipedia API), название и описание
+    Хранит только ссылку на Landmark (ID из Wikipedia API), название и описание
     получаются из Unity приложения через Wikipedia API.
     """
     player = models.ForeignKey(User, on_delete=models.CASCADE, related_name='landmark_observations')
-    external_id = models.CharField(max_length=200, help_text="ID достопримечательности из Wikipedia API")
+    landmark = models.ForeignKey(Landmark, on_delete=models.PROTECT, related_name='observations')
     observed_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        unique_together = ('player', 'external_id')
         ordering = ['-observed_at']
+        constraints = [
+            models.UniqueConstraint(fields=['player', 'landmark'], name='landmarks_observation_unique'),
+        ]
         indexes = [
-            models.Index(fields=['player', 'external_id']),
+            models.Index(fields=['player', '-observed_at'], name='landmarks_obs_player_time_idx'),
         ]
     
     def __str__(self):
         return f"{self.player.username} at landmark {self.external_id}"
+    
+    @property
+    def external_id(self):
+        return self.landmark.external_id
 
 
 class LandmarkCapture(models.Model):
@@ -32,10 +66,12 @@ class LandmarkCapture(models.Model):
     Модель для хранения захвата достопримечательности игроком.
     Хранит информацию о том, кто захватил достопримечательность, когда и какой клан.
     """
-    external_id = models.CharField(
-        max_length=200, 
-        help_text="ID достопримечательности из Wikipedia API",
-        db_index=True
+    # Индекс по landmark - составной (landmark, -captured_at) ниже
+    landmark = models.ForeignKey(
+        Landmark,
+        on_delete=models.PROTECT,
+        related_name='captures',
+        db_index=False
     )
     captured_by = models.ForeignKey(
         User, 
@@ -51,50 +87,84 @@ class LandmarkCapture(models.Model):
         related_name='landmark_captures',
         verbose_name="Клан"
     )
-    captured_at = models.DateTimeField(auto_now_add=True, verbose_name="Время захвата")
+    # Задается явно, чтобы совпадать со временем в LandmarkOwnership
+    captured_at = models.DateTimeField(default=timezone.now, verbose_name="Время захвата")
     
     class Meta:
         verbose_name = "Захват достопримечательности"
         verbose_name_plural = "Захваты достопримечательностей"
         ordering = ['-captured_at']
         indexes = [
-            models.Index(fields=['external_id', '-captured_at']),
-            models.Index(fields=['clan']),
+            models.Index(fields=['landmark', '-captured_at'], name='landmarks_capture_time_idx'),
+            # Захватывал ли клан достопримечательность раньше (clans.territory.record_capture)
+            models.Index(fields=['clan', 'landmark'], name='landmarks_capture_clan_idx'),
         ]
     
     def __str__(self):
         clan_name = self.clan.name if self.clan else "без клана"
         return f"{self.captured_by.username} ({clan_name}) захватил {self.external_id}"
     
+    @property
+    def external_id(self):
+        return self.landmark.external_id
+    
     @staticmethod
     def get_latest_capture(external_id):
-        """Получает последний захват достопримечательности."""
+        """
+        Получает последний захват достопримечательности по истории.
+        Текущий владелец и проверка перезарядки - через LandmarkOwnership.
+        """
+        from .interning import resolve_landmark
+        landmark_id = resolve_landmark(external_id)
+        if landmark_id is None:
+            return None
         try:
-            return LandmarkCapture.objects.filter(external_id=external_id).latest('captured_at')
+            return LandmarkCapture.objects.filter(landmark_id=landmark_id).latest('captured_at')
         except LandmarkCapture.DoesNotExist:
             return None
-    
-    @staticmethod
-    def can_capture(external_id):
-        """
-        Проверяет, можно ли захватить достопримечательность.
-        Возвращает (можно_ли_захватить, последний_захват или None).
-        """
-        latest_capture = LandmarkCapture.get_latest_capture(external_id)
-        
-        # Если достопримечательность еще никто не захватывал
-        if latest_capture is None:
-            return True, None
-        
-        # Проверяем, прошло ли больше часа с последнего захвата
-        time_since_capture = timezone.now() - latest_capture.captured_at
-        can_capture = time_since_capture >= timedelta(hours=1)
-        
-        return can_capture, latest_capture
-    
+
+
+class LandmarkOwnership(models.Model):
+    """
+    Текущий владелец достопримечательности: одна строка на Landmark.
+    Обновляется в одной транзакции с каждой новой записью LandmarkCapture
+    (landmarks.ownership), поэтому владелец и перезарядка читаются одним
+    запросом по первичному ключу. История захватов остается в LandmarkCapture.
+    """
+    landmark = models.OneToOneField(
+        Landmark,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ownership'
+    )
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='owned_landmarks',
+        verbose_name="Текущий владелец"
+    )
+    clan = models.ForeignKey(
+        'clans.Clan',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='owned_landmarks',
+        verbose_name="Клан владельца"
+    )
+    captured_at = models.DateTimeField(verbose_name="Время захвата")
+
+    class Meta:
+        verbose_name = "Владелец достопримечательности"
+        verbose_name_plural = "Владельцы достопримечательностей"
+
+    def __str__(self):
+        return f"{self.landmark_id}: {self.owner_id}"
+
+    def can_capture_now(self):
+        """Прошла ли перезарядка после последнего захвата."""
+        return timezone.now() - self.captured_at >= CAPTURE_COOLDOWN
+
     def time_until_next_capture_allowed(self):
         """Возвращает время, через которое можно будет захватить снова (timedelta)."""
-        time_since_capture = timezone.now() - self.captured_at
-        time_required = timedelta(hours=1)
-        remaining = time_required - time_since_capture
+        remaining = CAPTURE_COOLDOWN - (timezone.now() - self.captured_at)
         return remaining if remaining.total_seconds() > 0 else timedelta(0)
@@ -0,0 +1,186 @@
+"""
+Текущие владельцы достопримечательностей (LandmarkOwnership).
+
+Захват - условная смена владельца в строке LandmarkOwnership (compare-and-swap)
+и запись в историю LandmarkCapture в одной транзакции. Чтение владельца
+и проверка перезарядки - один запрос по первичному ключу (с владельцем
+и кланом через JOIN), история не читается.
+"""
+from typing import NamedTuple, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from clans.territory import record_capture
+
+from .interning import IN_QUERY_CHUNK_SIZE, resolve_landmark, resolve_landmarks
+from .models import CAPTURE_COOLDOWN, LandmarkCapture, LandmarkOwnership
+
+OWNERSHIP_FIELDS = ('owner', 'clan', 'captured_at')
+MAX_CAPTURE_STATUS_IDS = 500  # Максимум ID в одном запросе статусов (экран карты)
+CAPTURE_ATTEMPTS = 3
+
+
+def get_ownership(external_id):
+    """
+    Текущий владелец достопримечательности (с owner и clan) или None,
+    если ее еще никто не захватывал.
+    """
+    landmark_id = resolve_landmark(external_id)
+    if landmark_id is None:
+        return None
+    return _ownership_with_owner(landmark_id)
+
+
+def _ownership_with_owner(landmark_id):
+    return LandmarkOwnership.objects.select_related('owner', 'clan').filter(landmark_id=landmark_id).first()
+
+
+def get_capture_statuses(external_ids, now=None):
+    """
+    Статусы захвата нескольких достопримечательностей: ключи - из LRU или
+    одним IN-запросом, владельцы - одним IN-запросом (по IN_QUERY_CHUNK_SIZE ID).
+
+    Returns:
+        dict: {external_id: dict или None}, None - достопримечательность еще не захватывалась
+    """
+    now = now or timezone.now()
+    landmark_ids = resolve_landmarks(external_ids)
+    rows = get_ownership_rows(landmark_ids.values())
+    return {
+        external_id: ownership_status(rows.get(landmark_ids.get(external_id)), now)
+        for external_id in external_ids
+    }
+
+
+def get_ownership_rows(landmark_ids):
+    """
+    Владельцы достопримечательностей одним IN-запросом (по IN_QUERY_CHUNK_SIZE ID).
+
+    Returns:
+        dict: {landmark_id: (owner_id, owner_username, clan_id, clan_name, captured_at)}
+    """
+    keys = list(landmark_ids)
+    rows = {}
+    for start in range(0, len(keys), IN_QUERY_CHUNK_SIZE):
+        rows.update(
+            (row[0], row[1:]) for row in LandmarkOwnership.objects.filter(
+                landmark_id__in=keys[start:start + IN_QUERY_CHUNK_SIZE]
+            ).values_list('landmark_id', 'owner_id', 'owner__username', 'clan_id', 'clan__name', 'captured_at')
+        )
+    return rows
+
+
+def ownership_status(row, now):
+    """Статус захвата в формате API по строке get_ownership_rows (None - не захватывалась)."""
+    if row is None:
+        return None
+    owner_id, owner_username, clan_id, clan_name, captured_at = row
+    return {
+        "owner": {"id": owner_id, "username": owner_username},
+        "clan": {"id": clan_id, "name": clan_name} if clan_id is not None else None,
+        "captured_at": captured_at.isoformat(),
+        "can_capture_now": now - captured_at >= CAPTURE_COOLDOWN,
+    }
+
+
+class CaptureResult(NamedTuple):
+    captured: bool  # True - захват выполнен этим вызовом
+    capture: Optional[LandmarkCapture]  # Новая запись истории (только при успехе)
+    ownership: LandmarkOwnership  # Строка владельца после попытки (при неудаче - с owner и clan)
+
+
+def capture_landmark(landmark_id, user, now=None):
+    """
+    Захват достопримечательности как compare-and-swap по строке LandmarkOwnership.
+    Смена владельца - условный UPDATE (WHERE captured_at <= now - CAPTURE_COOLDOWN),
+    первый захват - INSERT, который при гонке отклоняет первичный ключ. Из параллельных
+    попыток выигрывает ровно одна, блокируется только строка этой достопримечательности.
+    Попытки во время перезарядки отсекаются чтением строки без блокировки на запись.
+    Счетчики территории кланов (ClanTerritory) обновляются после коммита.
+
+    Returns:
+        CaptureResult
+    """
+    clan_id = user.clan_id
+    fixed_now = now
+    for _ in range(CAPTURE_ATTEMPTS):
+        now = fixed_now or timezone.now()
+        # Решение о победителе принимает только условная запись ниже
+        ownership = _ownership_with_owner(landmark_id)
+        if ownership is not None and now - ownership.captured_at < CAPTURE_COOLDOWN:
+            return CaptureResult(False, None, ownership)
+
+        swapped = False
+        try:
+            with transaction.atomic():
+                if ownership is None:
+                    LandmarkOwnership.objects.create(
+                        landmark_id=landmark_id, owner_id=user.id, clan_id=clan_id, captured_at=now
+                    )
+                    swapped = True
+                else:
+                    swapped = bool(LandmarkOwnership.objects.filter(
+                        landmark_id=landmark_id, captured_at__lte=now - CAPTURE_COOLDOWN
+                    ).update(owner_id=user.id, clan_id=clan_id, captured_at=now))
+                if swapped:
+                    capture = LandmarkCapture.objects.create(
+                        landmark_id=landmark_id, captured_by_id=user.id, clan_id=clan_id, captured_at=now
+                    )
+                    # Прежний клан - из прочитанной строки: при смене владельца после чтения UPDATE выше не прошел бы
+                    record_capture(landmark_id, clan_id, ownership.clan_id if ownership else None, capture.id)
+        except IntegrityError:
+            # Первый захват этой достопримечательности выполнен параллельно
+            swapped = False
+
+        if swapped:
+            ownership = LandmarkOwnership(landmark_id=landmark_id, owner=user, clan_id=clan_id, captured_at=now)
+            return CaptureResult(True, capture, ownership)
+
+        ownership = _ownership_with_owner(landmark_id)
+        if ownership is not None:
+            return CaptureResult(False, None, ownership)
+        # Строку владельца удалили между записью и чтением (удален владелец) - повторная попытка
+    raise RuntimeError(f"Landmark {landmark_id} ownership changed during capture")
+
+
+def rebuild_ownership(batch_size=1000):
+    """
+    Пересобирает таблицу владельцев по истории захватов (после внедрения
+    или при расхождении): последний захват каждой достопримечательности,
+    пачками по landmark_id.
+
+    Returns:
+        int: Количество достопримечательностей с владельцем
+    """
+    total = 0
+    last_id = 0
+    with transaction.atomic():
+        # Достопримечательности, история захватов которых удалена, остаются без владельца
+        LandmarkOwnership.objects.exclude(landmark_id__in=LandmarkCapture.objects.values('landmark_id')).delete()
+        while True:
+            landmark_ids = list(
+                LandmarkCapture.objects.filter(landmark_id__gt=last_id).order_by('landmark_id')
+                .values_list('landmark_id', flat=True).distinct()[:batch_size]
+            )
+            if not landmark_ids:
+                break
+            last_id = landmark_ids[-1]
+            latest = LandmarkCapture.objects.filter(landmark_id__in=landmark_ids).annotate(
+                row_number=Window(
+                    RowNumber(), partition_by=F('landmark_id'), order_by=[F('captured_at').desc(), F('id').desc()]
+                ),
+            ).filter(row_number=1).values_list('landmark_id', 'captured_by_id', 'clan_id', 'captured_at')
+            LandmarkOwnership.objects.bulk_create(
+                [
+                    LandmarkOwnership(landmark_id=landmark_id, owner_id=owner_id, clan_id=clan_id, captured_at=captured_at)
+                    for landmark_id, owner_id, clan_id, captured_at in latest
+                ],
+                update_conflicts=True,
+                unique_fields=['landmark'],
+                update_fields=list(OWNERSHIP_FIELDS),
+            )
+            total += len(landmark_ids)
+    return total
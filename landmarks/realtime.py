@@ -0,0 +1,622 @@
+"""
+Push-уведомления о захватах достопримечательностей (WebSocket и SSE поверх ASGI).
+
+Клиент подписывается на набор достопримечательностей или на область карты
+(ячейки сетки landmarks.geo) и получает события вместо опроса
+GetLandmarkCaptureView:
+- ownership_changed - достопримечательность захвачена (публикует CaptureLandmarkView);
+- cooldown_expired - закончилась перезарядка, достопримечательность снова можно захватить.
+
+События раздает брокер воркера (broker). Публикация идет через бэкенд
+(LANDMARK_REALTIME_BACKEND в settings): RedisBackend доставляет события
+подписчикам всех воркеров, включая захваты в WSGI-воркерах; InProcessBackend -
+только подписчикам своего процесса и допустим, только если один ASGI-процесс
+выполняет и захваты, и подписки. Бэкенд создается при запуске процесса
+(check_backend из myproject.asgi и myproject.wsgi). Без настройки (None) или
+при ошибке настройки WSGI-процесс публикует в NullBackend с записью в лог -
+захваты работают, события не отправляются; ASGI-процесс с подписчиками не
+запускается.
+
+Браузерам недоступны заголовки WebSocket и EventSource, поэтому вместо JWT
+в URL (попадает в логи прокси) клиент передает одноразовый билет
+?ticket=, полученный через POST /api/landmarks/realtime/ticket/.
+Окончание перезарядки отслеживает колесо таймеров в цикле событий воркера,
+таймер ставится только для достопримечательностей, на которые кто-то подписан.
+"""
+import asyncio
+import json
+import logging
+import math
+import secrets
+import threading
+import time
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .geo import MAX_BBOX_CELLS, bbox_ranges
+from .models import CAPTURE_COOLDOWN
+from .ownership import MAX_CAPTURE_STATUS_IDS, get_capture_statuses
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_PATH = '/ws/landmarks/'
+EVENTS_PATH = '/api/landmarks/events/'
+
+MAX_SUBSCRIBED_LANDMARKS = MAX_CAPTURE_STATUS_IDS  # На одно соединение
+MAX_SUBSCRIBED_CELLS = MAX_BBOX_CELLS  # На одно соединение
+SUBSCRIPTION_QUEUE_SIZE = 256  # Неотправленных событий на соединение, при переполнении - resync
+HEARTBEAT_SECONDS = 15  # Пинг SSE-соединения (прокси закрывают молчащие соединения)
+TIMER_TICK_SECONDS = 1.0
+TIMER_WHEEL_SLOTS = 512
+REDIS_CHANNEL = 'landmarks:realtime'
+TICKET_TTL = 30  # Сек: билет обменивается на соединение сразу после выдачи
+
+
+class TimerWheel:
+    """
+    Хешированное колесо таймеров: добавление - O(1), за тик проверяется
+    один слот. Таймер дальше оборота колеса хранит число оставшихся оборотов.
+    Используется только из цикла событий (без блокировок).
+    """
+
+    def __init__(self, tick=TIMER_TICK_SECONDS, slots=TIMER_WHEEL_SLOTS):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.position = 0
+        self.pending = 0
+
+    def schedule(self, delay, callback, *args):
+        """Вызвать callback(*args) не раньше чем через delay секунд (с точностью до тика)."""
+        ticks = max(1, math.ceil(delay / self.tick))
+        slot = (self.position + ticks) % len(self.slots)
+        self.slots[slot].append([(ticks - 1) // len(self.slots), callback, args])
+        self.pending += 1
+
+    def advance(self):
+        """Один тик: выполняет таймеры текущего слота, у остальных уменьшает число оборотов."""
+        self.position = (self.position + 1) % len(self.slots)
+        due = []
+        waiting = []
+        for entry in self.slots[self.position]:
+            if entry[0] == 0:
+                due.append(entry)
+            else:
+                entry[0] -= 1
+                waiting.append(entry)
+        self.slots[self.position] = waiting
+        self.pending -= len(due)
+        for _, callback, args in due:
+            try:
+                callback(*args)
+            except Exception:
+                logger.exception("Timer callback failed")
+
+    async def run(self):
+        # Тики считаются от монотонного времени: задержка цикла событий не копится
+        next_tick = time.monotonic() + self.tick
+        while True:
+            await asyncio.sleep(max(next_tick - time.monotonic(), 0))
+            while time.monotonic() >= next_tick:
+                self.advance()
+                next_tick += self.tick
+
+
+class Subscription:
+    """Подписки одного соединения и очередь событий для отправки клиенту."""
+
+    def __init__(self):
+        self.queue = asyncio.Queue(SUBSCRIPTION_QUEUE_SIZE)
+        self.landmarks = set()
+        self.cells = set()
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Клиент не успевает читать: события сбрасываются, клиент перечитывает статусы
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+
+class NullBackend:
+    """Push-уведомления не настроены: события не публикуются, захваты работают как обычно."""
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def start(self):
+        pass
+
+    def publish(self, event):
+        pass
+
+
+class InProcessBackend:
+    """
+    События доставляются только подписчикам этого процесса. Только для одного
+    ASGI-процесса: захват в другом процессе (WSGI-воркер) подписчики не получат.
+    """
+
+    def __init__(self, broker):
+        if not broker.asgi:
+            raise ImproperlyConfigured(
+                "landmarks.realtime.InProcessBackend works only inside a single ASGI process that serves "
+                "both captures and subscriptions; this process is not myproject.asgi, so its capture "
+                "events would be dropped. Use landmarks.realtime.RedisBackend"
+            )
+        self.broker = broker
+
+    def start(self):
+        pass
+
+    def publish(self, event):
+        self.broker.dispatch(event)
+
+
+class RedisBackend:
+    """
+    Pub/sub через Redis (LANDMARK_REALTIME_REDIS_URL): событие получают
+    брокеры всех воркеров, включая опубликовавший. Требует пакет redis.
+    """
+
+    def __init__(self, broker):
+        try:
+            import redis
+        except ImportError as exc:
+            raise ImproperlyConfigured(
+                "landmarks.realtime.RedisBackend requires the 'redis' package"
+            ) from exc
+        self.broker = broker
+        self.client = redis.Redis.from_url(settings.LANDMARK_REALTIME_REDIS_URL)
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='landmarks-realtime', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(REDIS_CHANNEL)
+                for message in pubsub.listen():
+                    self.broker.dispatch(json.loads(message['data']))
+            except Exception:
+                logger.exception("Redis listener failed, reconnecting")
+                time.sleep(1)
+
+    def publish(self, event):
+        self.client.publish(REDIS_CHANNEL, json.dumps(event))
+
+
+class Broker:
+    """
+    Подписки воркера по темам: достопримечательность (external_id) и ячейка сетки.
+    Подписки меняются и события раздаются только в цикле событий воркера;
+    из других потоков события передаются через call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self.asgi = False  # Процесс обслуживает myproject.asgi (check_backend)
+        self.loop = None
+        self.timers = None
+        self._timer_task = None
+        self._backend = None
+        self._backend_lock = threading.Lock()
+        self._landmarks = {}  # external_id -> set(Subscription)
+        self._cells = {}  # geo_cell -> set(Subscription)
+        self._cooldowns = {}  # external_id -> [captured_at (ISO), geo_cell] захвата с ожидающим таймером
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    self._backend = self._create_backend(getattr(settings, 'LANDMARK_REALTIME_BACKEND', None))
+        return self._backend
+
+    def _create_backend(self, path):
+        """
+        Бэкенд по пути из settings. ASGI-процессу (подписчики) нужен рабочий бэкенд;
+        WSGI-процесс только публикует - без него захваты идут без уведомлений.
+        """
+        if path is None:
+            if self.asgi:
+                raise ImproperlyConfigured("LANDMARK_REALTIME_BACKEND must be set to serve landmark realtime events")
+            logger.warning("LANDMARK_REALTIME_BACKEND is not set: capture events are not published")
+            return NullBackend(self)
+        try:
+            return import_string(path)(self)
+        except ImproperlyConfigured:
+            if self.asgi:
+                raise
+            logger.exception("Realtime backend %s is unavailable: capture events are not published", path)
+            return NullBackend(self)
+
+    def attach(self, start_backend=True):
+        """
+        Привязывает брокер к циклу событий воркера (при первом соединении).
+        start_backend=False - без приема событий бэкенда (замеры в одном процессе).
+        """
+        if self.loop is None or self.loop.is_closed():
+            self.loop = asyncio.get_running_loop()
+            self.timers = TimerWheel()
+            self._cooldowns = {}
+            self._timer_task = self.loop.create_task(self.timers.run())
+            if start_backend:
+                self.backend.start()
+
+    @property
+    def wants_cells(self):
+        """Есть подписки на области: публикации нужен номер ячейки."""
+        backend = self.backend
+        if isinstance(backend, NullBackend):
+            return False
+        return bool(self._cells) or not isinstance(backend, InProcessBackend)
+
+    def publish(self, event):
+        """Публикует событие (из любого потока) для подписчиков всех воркеров бэкенда."""
+        self.backend.publish(event)
+
+    def dispatch(self, event):
+        """Передает событие от бэкенда в цикл событий воркера (из любого потока)."""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._deliver, event)
+
+    def _subscribers(self, external_id, cell):
+        targets = set(self._landmarks.get(external_id, ()))
+        if cell is not None:
+            targets.update(self._cells.get(cell, ()))
+        return targets
+
+    def _deliver(self, event):
+        targets = self._subscribers(event['external_id'], event.get('cell'))
+        if not targets:
+            return
+        for subscription in targets:
+            subscription.push(event)
+        if event['type'] == 'ownership_changed':
+            self.watch_cooldown(event['external_id'], event.get('cell'), event['status']['captured_at'])
+
+    def watch_cooldown(self, external_id, cell, captured_at):
+        """Ставит таймер окончания перезарядки захвата captured_at (ISO)."""
+        pending = self._cooldowns.get(external_id)
+        if pending is not None and pending[0] == captured_at:
+            # Таймер уже стоит; ячейка могла стать известна только из события
+            pending[1] = pending[1] if cell is None else cell
+            return
+        delay = (datetime.fromisoformat(captured_at) + CAPTURE_COOLDOWN - timezone.now()).total_seconds()
+        if delay <= 0:
+            return
+        self._cooldowns[external_id] = [captured_at, cell]
+        self.timers.schedule(delay, self._cooldown_expired, external_id, captured_at)
+
+    def _cooldown_expired(self, external_id, captured_at):
+        pending = self._cooldowns.get(external_id)
+        if pending is None or pending[0] != captured_at:
+            # После этого захвата был новый - у него свой таймер
+            return
+        del self._cooldowns[external_id]
+        event = {"type": "cooldown_expired", "external_id": external_id, "captured_at": captured_at}
+        for subscription in self._subscribers(external_id, pending[1]):
+            subscription.push(event)
+
+    def subscribe(self, subscription, landmarks=(), cells=()):
+        for topic, index, subscribed in ((landmarks, self._landmarks, subscription.landmarks),
+                                         (cells, self._cells, subscription.cells)):
+            for key in topic:
+                index.setdefault(key, set()).add(subscription)
+                subscribed.add(key)
+
+    def unsubscribe(self, subscription, landmarks=(), cells=()):
+        for topic, index, subscribed in ((landmarks, self._landmarks, subscription.landmarks),
+                                         (cells, self._cells, subscription.cells)):
+            for key in topic:
+                subscribers = index.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del index[key]
+                subscribed.discard(key)
+
+    def remove(self, subscription):
+        self.unsubscribe(subscription, list(subscription.landmarks), list(subscription.cells))
+
+    def stats(self):
+        return {
+            "landmarks": len(self._landmarks),
+            "cells": len(self._cells),
+            "timers": self.timers.pending if self.timers else 0,
+        }
+
+
+broker = Broker()
+
+
+def check_backend(asgi):
+    """
+    Создает бэкенд при запуске процесса. Ошибка конфигурации (нет пакета redis,
+    InProcessBackend вне ASGI) останавливает ASGI-процесс, а WSGI-процесс
+    записывает ее в лог и продолжает работу без публикации событий.
+    """
+    broker.asgi = asgi
+    broker.backend
+
+
+def _ticket_key(ticket):
+    return f'landmarks:realtime_ticket:{ticket}'
+
+
+def issue_ticket(user_id):
+    """Одноразовый билет на подключение, действует TICKET_TTL секунд."""
+    ticket = secrets.token_urlsafe(32)
+    cache.set(_ticket_key(ticket), user_id, TICKET_TTL)
+    return ticket
+
+
+def _redeem_ticket(ticket):
+    """ID пользователя по билету или None; билет удаляется при первом использовании."""
+    key = _ticket_key(ticket)
+    user_id = cache.get(key)
+    # delete() вернет False, если параллельное подключение уже использовало билет
+    if user_id is None or not cache.delete(key):
+        return None
+    return user_id
+
+
+def publish_capture(landmark_id, external_id, status):
+    """
+    Публикует событие ownership_changed после успешного захвата.
+    Ошибка доставки не влияет на захват: клиенты получат статус при следующем чтении.
+    """
+    try:
+        cell = None
+        if broker.wants_cells:
+            from .models import Landmark
+            cell = Landmark.objects.filter(id=landmark_id).values_list('geo_cell', flat=True).first()
+        broker.publish({
+            "type": "ownership_changed",
+            "external_id": external_id,
+            "cell": cell,
+            "status": status,
+        })
+    except Exception:
+        logger.exception("Failed to publish capture of landmark %s", external_id)
+
+
+class SubscriptionError(ValueError):
+    pass
+
+
+def _area_cells(area):
+    try:
+        min_lat, min_lon = float(area['min_lat']), float(area['min_lon'])
+        max_lat, max_lon = float(area['max_lat']), float(area['max_lon'])
+    except (KeyError, TypeError, ValueError):
+        raise SubscriptionError("area requires numeric min_lat, min_lon, max_lat, max_lon")
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+        raise SubscriptionError("area is out of range")
+    try:
+        ranges = bbox_ranges(min_lat, min_lon, max_lat, max_lon)
+    except ValueError as exc:
+        raise SubscriptionError(str(exc))
+    return {cell for first, last in ranges for cell in range(first, last + 1)}
+
+
+def _landmark_ids(value):
+    if not isinstance(value, list) or not all(isinstance(item, (str, int)) for item in value):
+        raise SubscriptionError("landmarks must be a list of external ids")
+    return {str(item).strip() for item in value if str(item).strip()}
+
+
+async def _subscribe(subscription, landmarks, area):
+    """Подписка соединения; возвращает сообщение subscribed со статусами новых достопримечательностей."""
+    landmarks = _landmark_ids(landmarks) - subscription.landmarks if landmarks is not None else set()
+    cells = _area_cells(area) - subscription.cells if area is not None else set()
+    if len(subscription.landmarks) + len(landmarks) > MAX_SUBSCRIBED_LANDMARKS:
+        raise SubscriptionError(f"Too many landmarks, maximum {MAX_SUBSCRIBED_LANDMARKS} per connection")
+    if len(subscription.cells) + len(cells) > MAX_SUBSCRIBED_CELLS:
+        raise SubscriptionError(f"Too many cells, maximum {MAX_SUBSCRIBED_CELLS} per connection")
+
+    # Подписка до чтения статусов: захват между чтением и подпиской не теряется
+    broker.subscribe(subscription, landmarks, cells)
+    statuses = await sync_to_async(get_capture_statuses)(sorted(landmarks)) if landmarks else {}
+    for external_id, status in statuses.items():
+        if status is not None and not status['can_capture_now']:
+            broker.watch_cooldown(external_id, None, status['captured_at'])
+    return {
+        "type": "subscribed",
+        "server_time": timezone.now().isoformat(),
+        "statuses": statuses,
+        "landmarks": len(subscription.landmarks),
+        "cells": len(subscription.cells),
+    }
+
+
+@sync_to_async
+def _authenticate(scope):
+    """
+    Пользователь по JWT из заголовка Authorization или по одноразовому билету
+    ?ticket= (браузерам недоступны заголовки WebSocket). JWT в URL не принимается.
+    """
+    from django.contrib.auth import get_user_model
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+    from accounts.authentication import CachedJWTAuthentication
+
+    raw_token = None
+    for name, value in scope.get('headers', ()):
+        if name == b'authorization':
+            parts = value.split()
+            if len(parts) == 2 and parts[0].lower() == b'bearer':
+                raw_token = parts[1]
+    if raw_token is None:
+        ticket = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('ticket')
+        user_id = _redeem_ticket(ticket[0]) if ticket else None
+        if user_id is None:
+            return None
+        return get_user_model().objects.filter(id=user_id, is_active=True).first()
+    authentication = CachedJWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+
+
+async def _next_message(receive, subscription, heartbeat=None):
+    """
+    Ждет сообщение клиента или событие брокера.
+
+    Returns:
+        ('receive', message), ('event', event) или ('heartbeat', None)
+    """
+    tasks = {
+        asyncio.ensure_future(receive()): 'receive',
+        asyncio.ensure_future(subscription.queue.get()): 'event',
+    }
+    done, pending = await asyncio.wait(tasks, timeout=heartbeat, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    if not done:
+        return 'heartbeat', None
+    task = next(iter(done))
+    if len(done) > 1 and tasks[task] == 'event':
+        # Пришло и событие, и сообщение клиента: событие возвращается в очередь
+        subscription.queue.put_nowait(task.result())
+        task = next(item for item in done if tasks[item] == 'receive')
+    return tasks[task], task.result()
+
+
+async def websocket_app(scope, receive, send):
+    """
+    WebSocket /ws/landmarks/. Сообщения клиента (JSON):
+    {"action": "subscribe" | "unsubscribe", "landmarks": [...], "area": {...}} и {"action": "ping"}.
+    """
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    user = await _authenticate(scope)
+    if user is None:
+        await send({'type': 'websocket.close', 'code': 4401})
+        return
+    await send({'type': 'websocket.accept'})
+
+    broker.attach()
+    subscription = Subscription()
+    try:
+        while True:
+            kind, message = await _next_message(receive, subscription)
+            if kind == 'event':
+                await send({'type': 'websocket.send', 'text': json.dumps(message)})
+                continue
+            if message['type'] == 'websocket.disconnect':
+                break
+            if message['type'] != 'websocket.receive':
+                continue
+            reply = await _handle_command(subscription, message.get('text') or message.get('bytes') or '')
+            await send({'type': 'websocket.send', 'text': json.dumps(reply)})
+    finally:
+        broker.remove(subscription)
+
+
+async def _handle_command(subscription, text):
+    try:
+        command = json.loads(text)
+        if not isinstance(command, dict):
+            raise SubscriptionError("message must be a JSON object")
+        action = command.get('action')
+        if action == 'ping':
+            return {"type": "pong", "server_time": timezone.now().isoformat()}
+        if action == 'subscribe':
+            return await _subscribe(subscription, command.get('landmarks'), command.get('area'))
+        if action == 'unsubscribe':
+            landmarks = _landmark_ids(command['landmarks']) if 'landmarks' in command else ()
+            cells = _area_cells(command['area']) if 'area' in command else ()
+            broker.unsubscribe(subscription, landmarks, cells)
+            return {
+                "type": "unsubscribed",
+                "landmarks": len(subscription.landmarks),
+                "cells": len(subscription.cells),
+            }
+        raise SubscriptionError("Unknown action")
+    except (ValueError, SubscriptionError) as exc:
+        return {"type": "error", "error": str(exc)}
+
+
+async def events_app(scope, receive, send):
+    """
+    Server-Sent Events GET /api/landmarks/events/?landmarks=Q1,Q2&min_lat=..&min_lon=..&max_lat=..&max_lon=..
+    Подписка задается один раз при подключении.
+    """
+    if scope['method'] != 'GET':
+        await _plain_response(send, 405, {"success": False, "error": "Method not allowed"})
+        return
+    user = await _authenticate(scope)
+    if user is None:
+        await _plain_response(send, 401, {"success": False, "error": "Authentication credentials were not provided"})
+        return
+
+    params = parse_qs(scope.get('query_string', b'').decode('utf-8'))
+    landmarks = [item for value in params.get('landmarks', ()) for item in value.split(',')]
+    area = {key: params[key][0] for key in ('min_lat', 'min_lon', 'max_lat', 'max_lon') if key in params}
+    if not landmarks and not area:
+        await _plain_response(send, 400, {"success": False, "error": "Specify landmarks or area"})
+        return
+
+    broker.attach()
+    subscription = Subscription()
+    try:
+        try:
+            subscribed = await _subscribe(subscription, landmarks, area or None)
+        except SubscriptionError as exc:
+            await _plain_response(send, 400, {"success": False, "error": str(exc)})
+            return
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),  # nginx не буферизует поток
+            ],
+        })
+        await _send_event(send, subscribed)
+        while True:
+            kind, message = await _next_message(receive, subscription, heartbeat=HEARTBEAT_SECONDS)
+            if kind == 'event':
+                await _send_event(send, message)
+            elif kind == 'heartbeat':
+                await send({'type': 'http.response.body', 'body': b': ping\n\n', 'more_body': True})
+            elif message['type'] == 'http.disconnect':
+                break
+    finally:
+        broker.remove(subscription)
+
+
+async def _send_event(send, event):
+    body = f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+    await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+
+async def _plain_response(send, status, payload):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps(payload).encode()})
@@ -9,6 +9,7 @@ class PlayerLandmarkObservationSerializer(serializers.ModelSerializer):
     """Сериализатор для модели наблюдения игрока в достопримечательности"""
     player_id = serializers.IntegerField(read_only=True, source='player.id')
     player_username = serializers.CharField(read_only=True, source='player.username')
+    external_id = serializers.CharField(read_only=True, source='landmark.external_id')
     
     class Meta:
         model = PlayerLandmarkObservation
@@ -55,12 +56,32 @@ class CaptureLandmarkSerializer(serializers.Serializer):
         return value.strip()
 
 
+class CaptureStatusSerializer(serializers.Serializer):
+    """Сериализатор для запроса статусов захвата (видимая область карты)"""
+    external_ids = serializers.ListField(
+        child=serializers.CharField(),
+        allow_empty=False,
+        help_text="Список ID достопримечательностей из Wikipedia API"
+    )
+
+    def validate_external_ids(self, value):
+        from .ingest import normalize_external_ids
+        from .ownership import MAX_CAPTURE_STATUS_IDS
+        value = normalize_external_ids(value)
+        if not value:
+            raise serializers.ValidationError("external_ids cannot be empty")
+        if len(value) > MAX_CAPTURE_STATUS_IDS:
+            raise serializers.ValidationError(f"Maximum {MAX_CAPTURE_STATUS_IDS} external_ids per request")
+        return value
+
+
 class LandmarkCaptureSerializer(serializers.ModelSerializer):
     """Сериализатор для модели захвата достопримечательности"""
     captured_by_username = serializers.CharField(read_only=True, source='captured_by.username')
     captured_by_id = serializers.IntegerField(read_only=True, source='captured_by.id')
     clan_name = serializers.CharField(read_only=True, source='clan.name', allow_null=True)
     clan_id = serializers.IntegerField(read_only=True, source='clan.id', allow_null=True)
+    external_id = serializers.CharField(read_only=True, source='landmark.external_id')
     
     class Meta:
         model = LandmarkCapture
@@ -70,3 +91,49 @@ class LandmarkCaptureSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'captured_by_id', 'captured_by_username', 'clan_id', 'clan_name', 'captured_at']
 
+
+
+class LandmarkPointSerializer(serializers.Serializer):
+    """Координаты одной достопримечательности"""
+    external_id = serializers.CharField(max_length=200, help_text="ID достопримечательности из Wikipedia API")
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+
+
+class LandmarkCoordinatesSerializer(serializers.Serializer):
+    """Сериализатор для передачи координат достопримечательностей клиентом"""
+    landmarks = LandmarkPointSerializer(many=True, allow_empty=False)
+
+    def validate_landmarks(self, value):
+        from .geo import MAX_COORDINATES_PER_REQUEST
+        if len(value) > MAX_COORDINATES_PER_REQUEST:
+            raise serializers.ValidationError(f"Maximum {MAX_COORDINATES_PER_REQUEST} landmarks per request")
+        return value
+
+
+class BoundingBoxSerializer(serializers.Serializer):
+    """Параметры запроса по области карты (min_lon > max_lon - область через 180-й меридиан)"""
+    min_lat = serializers.FloatField(min_value=-90, max_value=90)
+    min_lon = serializers.FloatField(min_value=-180, max_value=180)
+    max_lat = serializers.FloatField(min_value=-90, max_value=90)
+    max_lon = serializers.FloatField(min_value=-180, max_value=180)
+    limit = serializers.IntegerField(required=False, min_value=1)
+
+    def validate(self, attrs):
+        if attrs['min_lat'] > attrs['max_lat']:
+            raise serializers.ValidationError({"min_lat": ["min_lat must not exceed max_lat"]})
+        return attrs
+
+
+class NearbySerializer(serializers.Serializer):
+    """Параметры запроса по радиусу (метры)"""
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+    radius = serializers.FloatField(min_value=1)
+    limit = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_radius(self, value):
+        from .geo import MAX_RADIUS_METERS
+        if value > MAX_RADIUS_METERS:
+            raise serializers.ValidationError(f"Maximum radius is {MAX_RADIUS_METERS} meters")
+        return value
@@ -1,3 +1,86 @@
-from django.test import TestCase
+import threading
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection
+from django.test import TransactionTestCase
+
+from .models import Landmark, LandmarkCapture, LandmarkOwnership
+from .ownership import capture_landmark
+
+User = get_user_model()
+
+THREADS = 8
+
+
+class CaptureConcurrencyTests(TransactionTestCase):
+    """Одновременные захваты из нескольких потоков (каждый поток - свое соединение с БД)."""
+
+    def setUp(self):
+        User.objects.bulk_create([User(username=f'capture_{index}', password='!') for index in range(THREADS)])
+        self.users = list(User.objects.filter(username__startswith='capture_').order_by('id'))
+
+    def create_landmarks(self, count):
+        Landmark.objects.bulk_create([Landmark(external_id=f'capture_{index}') for index in range(count)])
+        return list(Landmark.objects.order_by('id').values_list('id', flat=True))
+
+    def run_threads(self, plans):
+        """
+        Поток на пользователя, plans[i] - landmark_id для захвата потоком i.
+
+        Returns:
+            (list[(landmark_id, user_id)] успешных захватов, list ошибок БД)
+        """
+        barrier = threading.Barrier(len(plans))
+        wins = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker(user, plan):
+            try:
+                barrier.wait()
+                for landmark_id in plan:
+                    try:
+                        result = capture_landmark(landmark_id, user)
+                    except DatabaseError as e:
+                        with lock:
+                            errors.append(repr(e))
+                        continue
+                    if result.captured:
+                        with lock:
+                            wins.append((landmark_id, user.id))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(user, plan)) for user, plan in zip(self.users, plans)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return wins, errors
+
+    def assert_single_winners(self, wins, landmark_ids):
+        """Один успешный захват на достопримечательность, владелец и история с ним согласованы."""
+        winners = {}
+        for landmark_id, user_id in wins:
+            winners.setdefault(landmark_id, []).append(user_id)
+        owners = dict(LandmarkOwnership.objects.values_list('landmark_id', 'owner_id'))
+        history = {}
+        for landmark_id, user_id in LandmarkCapture.objects.values_list('landmark_id', 'captured_by_id'):
+            history.setdefault(landmark_id, []).append(user_id)
+        for landmark_id in landmark_ids:
+            self.assertEqual(len(winners.get(landmark_id, [])), 1, f"landmark {landmark_id}")
+            self.assertEqual(owners.get(landmark_id), winners[landmark_id][0])
+            self.assertEqual(history.get(landmark_id), winners[landmark_id])
+
+    def test_same_landmark_has_one_winner(self):
+        landmark_id, = self.create_landmarks(1)
+        wins, errors = self.run_threads([[landmark_id]] * THREADS)
+        self.assertEqual(errors, [])
+        self.assert_single_winners(wins, [landmark_id])
+
+    def test_shared_landmarks_in_random_order(self):
+        landmark_ids = self.create_landmarks(20)
+        plans = [landmark_ids[index:] + landmark_ids[:index] for index in range(THREADS)]
+        wins, errors = self.run_threads(plans)
+        self.assertEqual(errors, [])
+        self.assert_single_winners(wins, landmark_ids)
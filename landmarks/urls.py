@@ -1,7 +1,9 @@
 from django.urls import path
 from .views import (
     SavePlayerLandmarksView, GetPlayerLandmarksView, TestLandmarksView,
-    CaptureLandmarkView, GetLandmarkCaptureView
+    CaptureLandmarkView, GetLandmarkCaptureView, LandmarkCaptureStatusView,
+    SaveLandmarkCoordinatesView, LandmarksInAreaView, LandmarksNearbyView,
+    RealtimeTicketView
 )
 
 urlpatterns = [
@@ -10,8 +12,17 @@ urlpatterns = [
     path('player/<int:player_id>/', GetPlayerLandmarksView.as_view(), name='get-player-landmarks'),
     path('player/', GetPlayerLandmarksView.as_view(), name='get-player-landmarks-query'),
     
+    # Координаты и поиск по карте
+    path('coordinates/', SaveLandmarkCoordinatesView.as_view(), name='save-landmark-coordinates'),
+    path('area/', LandmarksInAreaView.as_view(), name='landmarks-in-area'),
+    path('nearby/', LandmarksNearbyView.as_view(), name='landmarks-nearby'),
+    
     # Landmark capture endpoints
     path('capture/', CaptureLandmarkView.as_view(), name='capture-landmark'),
+    path('capture/status/', LandmarkCaptureStatusView.as_view(), name='landmark-capture-status'),
     path('<str:external_id>/capture/', GetLandmarkCaptureView.as_view(), name='get-landmark-capture'),
+
+    # Билет для push-уведомлений о захватах (landmarks.realtime)
+    path('realtime/ticket/', RealtimeTicketView.as_view(), name='landmark-realtime-ticket'),
 ]
 
@@ -3,12 +3,22 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError
+from django.db import transaction
 from django.utils import timezone
 import logging
-from .models import PlayerLandmarkObservation, LandmarkCapture
-from .serializers import SavePlayerLandmarksSerializer, CaptureLandmarkSerializer, LandmarkCaptureSerializer
-from quests.models import Quest, QuestProgress, DailyQuest
+from .ingest import save_observations
+from .interning import intern_landmark
+from .ownership import capture_landmark, get_capture_statuses, get_ownership, ownership_status
+from .realtime import TICKET_TTL, issue_ticket, publish_capture
+from .geo import MAX_GEO_RESULTS, landmarks_in_bbox, landmarks_near, set_coordinates
+from .serializers import (
+    SavePlayerLandmarksSerializer, CaptureLandmarkSerializer, CaptureStatusSerializer, LandmarkCaptureSerializer,
+    LandmarkCoordinatesSerializer, BoundingBoxSerializer, NearbySerializer
+)
+from quests.progress import advance_quest_progress
+from accounts.profile_cache import get_player_landmarks, invalidate_player_profile, iterate_player_landmarks
+from myproject.streaming import get_stream_format, stream_list_response
+from idempotency.decorators import idempotent
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -22,6 +32,8 @@ class SavePlayerLandmarksView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    # Наблюдения сохраняются своей транзакцией, повторное выполнение ничего не дублирует
+    @idempotent(atomic=False)
     def post(self, request):
         try:
             serializer = SavePlayerLandmarksSerializer(data=request.data)
@@ -45,93 +57,16 @@ class SavePlayerLandmarksView(APIView):
                     "error": f"Player with ID {player_id} not found"
                 }, status=404)
 
-            # Сохраняем наблюдения (unique_together предотвращает дубликаты)
-            saved_external_ids = []
-            newly_created_count = 0
-            
-            for external_id in external_ids:
-                try:
-                    # Преобразуем в строку на случай, если пришло число
-                    external_id = str(external_id).strip()
-                    if not external_id:
-                        continue
-                        
-                    # Создаем или получаем наблюдение (unique_together предотвращает дубликаты)
-                    observation, created = PlayerLandmarkObservation.objects.get_or_create(
-                        player=player,
-                        external_id=external_id
-                    )
-                    if created:
-                        saved_external_ids.append(external_id)
-                        newly_created_count += 1
-                except IntegrityError as e:
-                    logger.error(f"IntegrityError for external_id {external_id}: {str(e)}")
-                    # Пропускаем этот external_id и продолжаем
-                    continue
-                except Exception as e:
-                    logger.error(f"Error saving external_id {external_id}: {str(e)}")
-                    # Пропускаем этот external_id и продолжаем
-                    continue
-
-            # Обновляем прогресс квестов типа 'mark_sights'
+            # Наблюдения и прогресс квестов 'mark_sights' сохраняются одной транзакцией:
+            # один IN-запрос и один bulk_create для наблюдений, INSERT и UPDATE для прогресса
+            with transaction.atomic():
+                saved_external_ids = save_observations(player.id, external_ids)
+                newly_created_count = len(saved_external_ids)
+                if newly_created_count > 0:
+                    advance_quest_progress(player.id, 'mark_sights', newly_created_count)
+
             if newly_created_count > 0:
-                try:
-                    today = timezone.now().date()
-                    
-                    # Находим все активные квесты типа 'mark_sights' для игрока
-                    # Получаем квесты через DailyQuest для текущей даты
-                    daily_quests = DailyQuest.objects.filter(
-                        user=player,
-                        date=today,
-                        quest__type='mark_sights',
-                        quest__is_active=True
-                    ).select_related('quest')
-                    
-                    # Обновляем прогресс для каждого квеста
-                    for daily_quest in daily_quests:
-                        quest = daily_quest.quest
-                        
-                        # Получаем или создаем QuestProgress
-                        quest_progress, created = QuestProgress.objects.get_or_create(
-                            user=player,
-                            quest=quest,
-                            date=today,
-                            defaults={
-                                'current_progress': 0,
-                                'is_completed': False,
-                                'reward_claimed': False,
-                                'daily_quest': daily_quest
-                            }
-                        )
-                        
-                        # Если QuestProgress уже существовал, обновляем daily_quest если нужно
-                        if not created and not quest_progress.daily_quest:
-                            quest_progress.daily_quest = daily_quest
-                        
-                        # Увеличиваем прогресс (но не больше требуемого количества)
-                        new_progress = min(
-                            quest_progress.current_progress + newly_created_count,
-                            quest.count
-                        )
-                        quest_progress.current_progress = new_progress
-                        
-                        # Проверяем, выполнен ли квест
-                        if new_progress >= quest.count:
-                            quest_progress.is_completed = True
-                        
-                        quest_progress.save()
-                        
-                        logger.info(
-                            f"Updated quest progress for player {player_id}, "
-                            f"quest {quest.id}: {quest_progress.current_progress}/{quest.count}"
-                        )
-                        
-                except Exception as e:
-                    # Логируем ошибку, но не прерываем сохранение достопримечательностей
-                    logger.error(
-                        f"Error updating quest progress for player {player_id}: {str(e)}",
-                        exc_info=True
-                    )
+                invalidate_player_profile(player.id)
 
             return Response({
                 "success": True,
@@ -155,6 +90,7 @@ class GetPlayerLandmarksView(APIView):
     API endpoint для получения списка ID достопримечательностей, где был игрок.
     Принимает player_id как query параметр или в URL path.
     Возвращает список external_ids (ID из Wikipedia API).
+    ?stream=json|ndjson - потоковый ответ из БД без сборки списка в памяти (myproject.streaming).
     """
     permission_classes = [IsAuthenticated]
 
@@ -176,23 +112,26 @@ class GetPlayerLandmarksView(APIView):
                 "error": "player_id must be a valid integer"
             }, status=400)
 
-        # Получаем игрока
-        try:
-            player = User.objects.get(id=player_id)
-        except User.DoesNotExist:
+        stream = get_stream_format(request)
+
+        # Список берется из кэша профилей, инвалидируемого при сохранении наблюдений;
+        # потоковый ответ читает его курсором из БД
+        landmarks = iterate_player_landmarks(player_id) if stream else get_player_landmarks(player_id)
+        if landmarks is None:
             return Response({
                 "success": False,
                 "error": f"Player with ID {player_id} not found"
             }, status=404)
 
-        # Получаем все наблюдения игрока
-        observations = PlayerLandmarkObservation.objects.filter(player=player)
-        external_ids = [obs.external_id for obs in observations]
-        
+        username, external_ids = landmarks
+        if stream:
+            return stream_list_response(
+                stream, {"success": True, "player_id": player_id, "player_username": username}, 'external_ids', external_ids
+            )
         return Response({
             "success": True,
-            "player_id": player.id,
-            "player_username": player.username,
+            "player_id": player_id,
+            "player_username": username,
             "external_ids": external_ids,
             "total_count": len(external_ids)
         }, status=200)
@@ -227,8 +166,9 @@ class CaptureLandmarkView(APIView):
     Body: {"external_id": "12345"}
     
     Логика:
-    - Проверяет can_capture_now через метод can_capture()
-    - Если можно - создает новую запись захвата (меняет владельца)
+    - Проверка can_capture_now и смена владельца - одна условная запись
+      в строку LandmarkOwnership (landmarks.ownership.capture_landmark)
+    - Если можно - меняет владельца и создает новую запись захвата
     - Если нельзя - возвращает ошибку
     """
     permission_classes = [IsAuthenticated]
@@ -244,12 +184,14 @@ class CaptureLandmarkView(APIView):
         external_id = serializer.validated_data['external_id']
         user = request.user
         
-        # Проверяем, можно ли захватить достопримечательность сейчас
-        can_capture_now, latest_capture = LandmarkCapture.can_capture(external_id)
+        # Проверка перезарядки и смена владельца - один условный UPDATE строки владельца:
+        # из одновременных захватов одной достопримечательности успешен ровно один
+        result = capture_landmark(intern_landmark(external_id), user)
         
-        if not can_capture_now:
+        if not result.captured:
+            ownership = result.ownership
             # Вычисляем оставшееся время
-            time_remaining = latest_capture.time_until_next_capture_allowed()
+            time_remaining = ownership.time_until_next_capture_allowed()
             minutes_remaining = int(time_remaining.total_seconds() / 60)
             seconds_remaining = int(time_remaining.total_seconds() % 60)
             
@@ -259,30 +201,32 @@ class CaptureLandmarkView(APIView):
                 "message": f"Нельзя захватить достопримечательность сейчас. Повторный захват возможен через {minutes_remaining} мин {seconds_remaining} сек",
                 "can_capture_now": False,
                 "current_owner": {
-                    "id": latest_capture.captured_by.id,
-                    "username": latest_capture.captured_by.username
+                    "id": ownership.owner.id,
+                    "username": ownership.owner.username
                 },
-                "captured_at": latest_capture.captured_at.isoformat(),
+                "captured_at": ownership.captured_at.isoformat(),
                 "time_until_next_capture_minutes": minutes_remaining,
                 "time_until_next_capture_seconds": seconds_remaining,
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Создаем новый захват (меняем владельца)
-        new_capture = LandmarkCapture.objects.create(
-            external_id=external_id,
-            captured_by=user,
-            clan=user.clan  # Клан игрока (может быть None)
+        new_capture = result.capture
+        landmark_status = ownership_status(
+            (user.id, user.username, new_capture.clan_id,
+             new_capture.clan.name if new_capture.clan else None, new_capture.captured_at),
+            new_capture.captured_at,
         )
+        # Подписчики (landmarks.realtime) узнают о смене владельца без опроса
+        transaction.on_commit(lambda: publish_capture(new_capture.landmark_id, external_id, landmark_status))
         
         return Response({
             "success": True,
             "message": "Landmark captured successfully. Owner changed.",
             "capture": {
                 "id": new_capture.id,
-                "external_id": new_capture.external_id,
+                "external_id": external_id,
                 "captured_by": {
-                    "id": new_capture.captured_by.id,
-                    "username": new_capture.captured_by.username
+                    "id": user.id,
+                    "username": user.username
                 },
                 "captured_at": new_capture.captured_at.isoformat(),
                 "clan": {
@@ -307,14 +251,11 @@ class GetLandmarkCaptureView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, external_id):
-        # Получаем последний захват
-        latest_capture = LandmarkCapture.get_latest_capture(external_id)
-        
-        # Проверяем, можно ли захватить сейчас
-        can_capture_now, _ = LandmarkCapture.can_capture(external_id)
+        # Текущий владелец - один запрос по первичному ключу (вместе с игроком и кланом)
+        ownership = get_ownership(external_id)
         
         # Если достопримечательность еще не захватывалась
-        if latest_capture is None:
+        if ownership is None:
             return Response({
                 "success": True,
                 "captured": False,
@@ -328,14 +269,166 @@ class GetLandmarkCaptureView(APIView):
         return Response({
             "success": True,
             "captured": True,
-            "can_capture_now": can_capture_now,
+            "can_capture_now": ownership.can_capture_now(),
             "captured_by": {
-                "id": latest_capture.captured_by.id,
-                "username": latest_capture.captured_by.username
+                "id": ownership.owner.id,
+                "username": ownership.owner.username
             },
-            "captured_at": latest_capture.captured_at.isoformat(),
+            "captured_at": ownership.captured_at.isoformat(),
             "clan": {
-                "id": latest_capture.clan.id,
-                "name": latest_capture.clan.name
-            } if latest_capture.clan else None
+                "id": ownership.clan.id,
+                "name": ownership.clan.name
+            } if ownership.clan else None
+        }, status=status.HTTP_200_OK)
+
+
+class LandmarkCaptureStatusView(APIView):
+    """
+    Статусы захвата нескольких достопримечательностей (видимая область карты).
+    POST /api/landmarks/capture/status/
+    Body: {"external_ids": ["12345", "Q42", ...]}  (до MAX_CAPTURE_STATUS_IDS)
+    
+    Вместо GET /api/landmarks/<external_id>/capture/ на каждую метку - один запрос
+    с постоянным числом запросов к БД. Для незахваченных достопримечательностей - null.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = CaptureStatusSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                "success": False,
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        statuses = get_capture_statuses(serializer.validated_data['external_ids'], now=now)
+        return Response({
+            "success": True,
+            "server_time": now.isoformat(),
+            "statuses": statuses
+        }, status=status.HTTP_200_OK)
+
+
+class SaveLandmarkCoordinatesView(APIView):
+    """
+    Координаты достопримечательностей, полученные клиентом из Wikipedia API.
+    POST /api/landmarks/coordinates/
+    Body: {"landmarks": [{"external_id": "Q42", "latitude": 55.75, "longitude": 37.61}, ...]}
+    
+    Сохраняются только для достопримечательностей без координат - известные
+    координаты клиентом не перезаписываются (для исправления - импорт).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = LandmarkCoordinatesSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                "success": False,
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        coordinates = {}
+        for point in serializer.validated_data['landmarks']:
+            external_id = point['external_id'].strip()
+            if external_id:
+                coordinates[external_id] = (point['latitude'], point['longitude'])
+        updated = set_coordinates(coordinates)
+        return Response({
+            "success": True,
+            "updated": updated
+        }, status=status.HTTP_200_OK)
+
+
+class LandmarksInAreaView(APIView):
+    """
+    Достопримечательности в видимой области карты и их владельцы.
+    GET /api/landmarks/area/?min_lat=55.70&min_lon=37.50&max_lat=55.80&max_lon=37.70[&limit=500]
+    
+    Возвращает только достопримечательности с известными координатами.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        serializer = BoundingBoxSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response({
+                "success": False,
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        now = timezone.now()
+        try:
+            landmarks, truncated = landmarks_in_bbox(
+                data['min_lat'], data['min_lon'], data['max_lat'], data['max_lon'],
+                limit=min(data.get('limit', MAX_GEO_RESULTS), MAX_GEO_RESULTS), now=now
+            )
+        except ValueError as e:
+            return Response({
+                "success": False,
+                "error": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "success": True,
+            "server_time": now.isoformat(),
+            "landmarks": landmarks,
+            "truncated": truncated
+        }, status=status.HTTP_200_OK)
+
+
+class LandmarksNearbyView(APIView):
+    """
+    Достопримечательности рядом с точкой (ближние первыми) и их владельцы.
+    GET /api/landmarks/nearby/?lat=55.75&lon=37.61&radius=1000[&limit=100]
+    
+    radius - в метрах (до MAX_RADIUS_METERS), distance в ответе - в метрах.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        serializer = NearbySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response({
+                "success": False,
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        now = timezone.now()
+        try:
+            landmarks, truncated = landmarks_near(
+                data['lat'], data['lon'], data['radius'],
+                limit=min(data.get('limit', MAX_GEO_RESULTS), MAX_GEO_RESULTS), now=now
+            )
+        except ValueError as e:
+            return Response({
+                "success": False,
+                "error": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "success": True,
+            "server_time": now.isoformat(),
+            "landmarks": landmarks,
+            "truncated": truncated
+        }, status=status.HTTP_200_OK)
+
+
+class RealtimeTicketView(APIView):
+    """
+    Одноразовый билет для подключения к push-уведомлениям о захватах.
+    POST /api/landmarks/realtime/ticket/
+    Билет передается в ?ticket= (WebSocket и EventSource не поддерживают
+    заголовки в браузере); JWT в URL попадал бы в логи прокси.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response({
+            "success": True,
+            "ticket": issue_ticket(request.user.id),
+            "expires_in": TICKET_TTL,
         }, status=status.HTTP_200_OK)
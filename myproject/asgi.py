@@ -13,4 +13,25 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Импорт после инициализации Django (модули приложений используют модели)
+from landmarks.realtime import EVENTS_PATH, WEBSOCKET_PATH, check_backend, events_app, websocket_app  # noqa: E402
+
+check_backend(asgi=True)
+
+
+async def application(scope, receive, send):
+    """
+    Push-уведомления о захватах (landmarks.realtime) - WebSocket и SSE;
+    остальные HTTP-запросы обрабатывает Django.
+    """
+    if scope['type'] == 'websocket':
+        if scope['path'] == WEBSOCKET_PATH:
+            return await websocket_app(scope, receive, send)
+        await receive()
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+    if scope['type'] == 'http' and scope['path'] == EVENTS_PATH:
+        return await events_app(scope, receive, send)
+    return await django_application(scope, receive, send)
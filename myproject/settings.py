@@ -20,6 +20,8 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": False,
     "BLACKLIST_AFTER_ROTATION": True,
     "AUTH_HEADER_TYPES": ("Bearer",),
+    # Новый access-токен получает актуальные claims игрока (клан, уровень, версия авторизации)
+    "TOKEN_REFRESH_SERIALIZER": "accounts.serializers.PlayerTokenRefreshSerializer",
 }
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -55,6 +57,9 @@ INSTALLED_APPS = [
     'landmarks',
     'shop',
     'clans',
+    'wallet',
+    'idempotency',
+    'sync',
 ]
 
 MIDDLEWARE = [
@@ -65,6 +70,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Заголовок X-Token-Stale для токенов с устаревшими claims (accounts.authentication)
+    'accounts.middleware.StaleTokenMiddleware',
 ]
 
 ROOT_URLCONF = 'myproject.urls'
@@ -94,6 +101,17 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # BEGIN IMMEDIATE для всех транзакций проекта: транзакция сразу берет блокировку записи
+        # и ждет ее до timeout секунд. При BEGIN DEFERRED две транзакции, начавшие с чтения
+        # (покупка, ответ по Idempotency-Key, журнал баланса), не могут повысить блокировку до
+        # записи, и одна сразу падает с "database is locked" без ожидания.
+        # Цена: блоки atomic, которые только читают, тоже ждут блокировку записи и не идут
+        # параллельно с пишущей транзакцией. Запросы вне atomic не затрагиваются. На других БД
+        # (PostgreSQL) параметра нет, блокировки там построчные
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+        # Тестовая БД в файле: тесты параллельных запросов (потоки со своими соединениями)
+        # в общей памяти получают "database table is locked" без ожидания
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -143,11 +161,88 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.authentication.CachedJWTAuthentication",
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Кэш, общий для всех воркеров gunicorn на сервере (снимки состояния пользователей
+# для аутентификации). Для нескольких серверов заменить на Redis/Memcached.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'django_cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    }
+}
+
+# Аутентификация без обращения к БД (accounts.authentication)
+ACCOUNTS_VERIFIED_TOKEN_CACHE_SIZE = 10000  # Проверенных токенов в LRU одного воркера
+ACCOUNTS_AUTH_STATE_TTL = 300  # Время жизни снимка состояния пользователя в кэше (сек)
+
+# Кэш публичных профилей игроков (accounts.profile_cache): максимальный суммарный
+# вес записей в одном воркере, вес записи = 1 + количество external_ids игрока
+PLAYER_PROFILE_CACHE_MAX_WEIGHT = 500000
+
+# Размер LRU соответствий ID достопримечательностей -> ключи Landmark в одном воркере (landmarks.interning)
+LANDMARK_INTERN_CACHE_SIZE = 200000
+
+# Кэш ячеек пространственного индекса (landmarks.geo): максимальный суммарный вес
+# в одном воркере, вес ячейки = 1 + количество достопримечательностей в ней
+LANDMARK_GEO_TILE_CACHE_MAX_WEIGHT = 500000
+
+# Бэкенд push-уведомлений о захватах (landmarks.realtime). None - уведомления выключены:
+# захваты работают, события не публикуются (предупреждение в логе), ASGI-процесс не запускается.
+# 'landmarks.realtime.RedisBackend' (pip install redis) доставляет события из WSGI-воркеров
+# подписчикам ASGI-процесса. InProcessBackend - только для одного ASGI-процесса без WSGI-воркеров
+LANDMARK_REALTIME_BACKEND = None
+LANDMARK_REALTIME_REDIS_URL = 'redis://localhost:6379/0'
+
+# Время жизни закэшированного множества ID друзей (accounts.friends), сек
+ACCOUNTS_FRIEND_IDS_TTL = 3600
+
+# Рекомендации друзей (accounts.suggestions): размер списка на пользователя и веса признаков
+FRIEND_SUGGESTIONS_TOP_K = 50
+FRIEND_SUGGESTION_WEIGHTS = {'mutual_friends': 10, 'shared_clan': 5, 'shared_landmarks': 1}
+# Сколько друзей у каждого из пары допускает пересчет оценок прямо в запросе (принятие, удаление друга),
+# при большем числе - отложенно (process_friend_suggestion_updates)
+FRIEND_SUGGESTIONS_INLINE_RESCORE_LIMIT = 500
+
+# Заголовок Idempotency-Key (idempotency): сколько хранить первый ответ (сек), сколько повтор
+# ждет выполняющийся запрос (сек), через сколько блокировка считается брошенной (сек),
+# максимальный размер сжатого ответа (байт) и лимит записей для purge_idempotency_keys
+IDEMPOTENCY_KEY_TTL = 24 * 3600
+IDEMPOTENCY_WAIT_SECONDS = 3
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+IDEMPOTENCY_MAX_RESPONSE_BYTES = 64 * 1024
+IDEMPOTENCY_MAX_RECORDS = 1000000
+
+# Синхронизация изменений (sync.changes): запас перед курсором для транзакций, закоммиченных
+# после него (сек), и время хранения отметок об удалении (сек). Курсор старше - полный снимок
+SYNC_CURSOR_OVERLAP = 10
+SYNC_TOMBSTONE_TTL = 30 * 24 * 3600
+
+# Выбор ежедневных квестов (quests.daily): 'stored' - наборы хранятся в DailyQuest и назначаются
+# заранее командой generate_daily_quests; 'derived' - вычисляются при запросе без записи в БД
+QUEST_DAILY_SELECTION_MODE = 'stored'
+# Квестов одного типа в ежедневном наборе (None - без ограничения; если с ограничением
+# уровню игрока не набрать 3 квеста, оно не действует); веса и уровни - в полях Quest
+QUEST_DAILY_MAX_PER_TYPE = None
+# Кэш каталога активных квестов в воркере (quests.catalog): как часто сверять версию
+# каталога с общим кэшем (сек) - изменения в админке видны во всех воркерах не позже
+QUEST_CATALOG_CHECK_INTERVAL = 5
+
+# Кривые уровней по сезонам (accounts.leveling). Формат:
+#   {'thresholds': [0, 1000, 2500, ...]} - накопленный опыт для уровней 1, 2, 3, ...
+#   {'xp_per_level': 1000, 'growth': 1.1, 'max_level': 100} - опыт на переход n -> n+1 = xp_per_level * growth ** (n - 1)
+# После смены кривой выполнить: python manage.py recompute_levels
+LEVEL_CURVE_SEASON = 'default'
+LEVEL_CURVES = {
+    'default': {'xp_per_level': 1000, 'max_level': 1000},
+}
+
 # Настройки для drf-spectacular (Swagger/OpenAPI)
 SPECTACULAR_SETTINGS = {
     'TITLE': 'ActiveGrad API',
@@ -157,6 +252,6 @@ SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
     'SCHEMA_PATH_PREFIX': '/api/',
     'AUTHENTICATION_WHITELIST': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ],
 }
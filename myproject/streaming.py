@@ -0,0 +1,116 @@
+"""
+Потоковые ответы для длинных списков (?stream=json или ?stream=ndjson).
+
+Обычный ответ собирает весь список и весь JSON в памяти. Потоковый
+читает queryset через .iterator(chunk_size) и пишет JSON частями через
+StreamingHttpResponse, поэтому память воркера не растет с длиной списка.
+
+- stream=json - тот же объект, что у обычного ответа. total_count идет
+  после списка: длина известна только в конце.
+- stream=ndjson - только элементы списка, по одному JSON на строку (для выгрузок).
+"""
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_FORMATS = ('json', 'ndjson')
+STREAM_CHUNK_SIZE = 2000  # Строк из БД за одно чтение курсора
+ITEMS_PER_WRITE = 500  # Элементов в одной части ответа
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class InvalidStreamFormat(APIException):
+    """
+    Неизвестный формат в параметре stream. Обработчик исключений DRF отвечает
+    400 {"success": false, "error": ...} - как остальные ошибки параметров.
+    """
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_code = 'invalid_stream_format'
+
+    def __init__(self, message):
+        super().__init__(message)
+        # Словарь DRF отдает как есть, без обертки в {"detail": ...}
+        self.detail = {"success": False, "error": message}
+
+
+def get_stream_format(request):
+    """
+    Формат потокового ответа из параметра stream или None (обычный ответ).
+
+    Raises:
+        InvalidStreamFormat: Неизвестный формат (ответ 400 из APIView)
+    """
+    stream = request.query_params.get('stream')
+    if not stream:
+        return None
+    if stream not in STREAM_FORMATS:
+        raise InvalidStreamFormat(f"stream must be one of: {', '.join(STREAM_FORMATS)}")
+    return stream
+
+
+# Как JSONRenderer DRF: компактно, без экранирования не-ASCII. Один экземпляр на процесс -
+# json.dumps(cls=...) создавал бы кодировщик на каждый элемент
+_dumps = JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+def iterate_values(queryset, *fields, flat=False, chunk_size=STREAM_CHUNK_SIZE):
+    """Строки values_list без кэша queryset."""
+    return queryset.values_list(*fields, flat=flat).iterator(chunk_size=chunk_size)
+
+
+def iterate_serialized(queryset, serializer_class, chunk_size=STREAM_CHUNK_SIZE):
+    """Объекты queryset в формате serializer_class, по одному (вывод совпадает с many=True)."""
+    serializer = serializer_class()
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        yield serializer.to_representation(instance)
+
+
+def _json_chunks(envelope, key, items):
+    head = _dumps(envelope)
+    yield f'{head[:-1]}{"," if len(head) > 2 else ""}"{key}":['.encode()
+    count = 0
+    batch = []
+    for item in items:
+        batch.append(_dumps(item))
+        count += 1
+        if len(batch) >= ITEMS_PER_WRITE:
+            yield (',' if count > len(batch) else '').encode() + ','.join(batch).encode()
+            batch = []
+    if batch:
+        yield (',' if count > len(batch) else '').encode() + ','.join(batch).encode()
+    yield f'],"total_count":{count}}}'.encode()
+
+
+def _ndjson_chunks(items):
+    batch = []
+    for item in items:
+        batch.append(_dumps(item))
+        if len(batch) >= ITEMS_PER_WRITE:
+            yield ('\n'.join(batch) + '\n').encode()
+            batch = []
+    if batch:
+        yield ('\n'.join(batch) + '\n').encode()
+
+
+def stream_list_response(stream, envelope, key, items):
+    """
+    Потоковый ответ со списком.
+
+    Args:
+        stream: 'json' или 'ndjson' (get_stream_format)
+        envelope: Поля ответа кроме списка и total_count (для ndjson не выводятся)
+        key: Имя поля со списком
+        items: Итератор элементов (iterate_values, iterate_serialized)
+    """
+    if stream == 'ndjson':
+        chunks = _ndjson_chunks(items)
+    else:
+        chunks = _json_chunks(envelope, key, items)
+    response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[stream])
+    # nginx отдает части клиенту сразу, не накапливая ответ
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
 
 application = get_wsgi_application()
+
+# Захваты в WSGI-воркерах публикуют push-уведомления (landmarks.realtime). Бэкенд
+# создается при запуске: ошибка настройки пишется в лог, захваты работают без уведомлений
+from landmarks.realtime import check_backend  # noqa: E402
+
+check_backend(asgi=False)
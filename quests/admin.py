@@ -1,10 +1,10 @@
 from django.contrib import admin
-from .models import Quest, DailyQuest, QuestProgress, QuestPromoCode
+from .models import Quest, DailyQuest, PinnedDailyQuest, QuestProgress, QuestPromoCode
 
 
 @admin.register(Quest)
 class QuestAdmin(admin.ModelAdmin):
-    list_display = ("id", "type", "title", "count", "reward_type", "reward_amount", "is_active", "created_at")
+    list_display = ("id", "type", "title", "count", "reward_type", "reward_amount", "weight", "min_level", "max_level", "is_active", "created_at")
     list_filter = ("type", "reward_type", "is_active", "created_at")
     search_fields = ("title", "description", "type")
     readonly_fields = ("created_at", "updated_at")
@@ -20,6 +20,9 @@ class QuestAdmin(admin.ModelAdmin):
                 ("Награда", {
                     "fields": ("reward_type", "reward_amount", "item_id")
                 }),
+                ("Выбор в ежедневные квесты", {
+                    "fields": ("weight", "min_level", "max_level")
+                }),
                 ("Промокод и изображение", {
                     "fields": ("promo_code", "image_url")
                 }),
@@ -33,6 +36,9 @@ class QuestAdmin(admin.ModelAdmin):
                 ("Награда", {
                     "fields": ("reward_type", "reward_amount", "item_id")
                 }),
+                ("Выбор в ежедневные квесты", {
+                    "fields": ("weight", "min_level", "max_level")
+                }),
                 ("Промокод и изображение", {
                     "fields": ("promo_code", "image_url")
                 }),
@@ -51,6 +57,19 @@ class DailyQuestAdmin(admin.ModelAdmin):
     date_hierarchy = "date"
 
 
+@admin.register(PinnedDailyQuest)
+class PinnedDailyQuestAdmin(admin.ModelAdmin):
+    """
+    Закрепленные квесты входят в ежедневные квесты на дату в любом режиме выбора,
+    в том числе если набор игрока на эту дату уже назначен.
+    """
+    list_display = ("quest", "date", "user")
+    list_filter = ("date", "quest__type")
+    search_fields = ("user__username", "quest__title")
+    raw_id_fields = ("user",)
+    date_hierarchy = "date"
+
+
 @admin.register(QuestProgress)
 class QuestProgressAdmin(admin.ModelAdmin):
     list_display = ("user", "quest", "current_progress", "is_completed", "reward_claimed", "date")
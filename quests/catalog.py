@@ -0,0 +1,102 @@
+"""
+Кэш каталога активных квестов внутри воркера.
+
+Каталог (активные квесты по ID и по типу и пул для выбора ежедневных
+квестов) загружается одним запросом и хранится в воркере как неизменяемая
+структура. Версия каталога хранится в общем кэше и повышается сигналами
+сохранения и удаления Quest. Воркер сверяет версию не чаще раза в
+CHECK_INTERVAL секунд, поэтому изменения из админки видны во всех воркерах
+не позже чем через CHECK_INTERVAL, а в воркере, где изменены, - сразу.
+
+QuerySet.update() сигналы не отправляет - после массового изменения
+квестов вызвать invalidate_catalog().
+"""
+import threading
+import time
+from types import MappingProxyType
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Quest
+from .selection import QuestPool, build_pool
+
+CATALOG_VERSION_KEY = 'quests:catalog_version'
+CHECK_INTERVAL = getattr(settings, 'QUEST_CATALOG_CHECK_INTERVAL', 5)
+
+
+class Catalog(NamedTuple):
+    """
+    Активные квесты. Экземпляры Quest общие для всех запросов воркера -
+    только для чтения.
+    """
+    version: int
+    by_id: MappingProxyType
+    by_type: MappingProxyType
+    pool: QuestPool
+
+
+def get_catalog_version():
+    """Текущая версия каталога. Если ключа нет в общем кэше, создается новая версия."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Версия от времени исключает совпадение со старым каталогом после вытеснения ключа
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def _bump_catalog_version():
+    global _checked_at
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, time.time_ns(), None)
+    _checked_at = None
+
+
+def invalidate_catalog():
+    """
+    Делает каталог недействительным во всех воркерах
+    (сразу и после коммита, как invalidate_player_profile).
+    """
+    _bump_catalog_version()
+    transaction.on_commit(_bump_catalog_version)
+
+
+def _load(version):
+    quests = list(Quest.objects.filter(is_active=True).order_by('id'))
+    by_type = {}
+    for quest in quests:
+        by_type.setdefault(quest.type, []).append(quest)
+    return Catalog(
+        version,
+        MappingProxyType({quest.id: quest for quest in quests}),
+        MappingProxyType({quest_type: tuple(group) for quest_type, group in by_type.items()}),
+        build_pool(quests),
+    )
+
+
+_catalog = None
+_checked_at = None
+_lock = threading.Lock()
+
+
+def get_catalog():
+    """Каталог активных квестов; версия сверяется с общим кэшем не чаще раза в CHECK_INTERVAL секунд."""
+    global _catalog, _checked_at
+    catalog, checked_at = _catalog, _checked_at
+    now = time.monotonic()
+    if catalog is not None and checked_at is not None and now - checked_at < CHECK_INTERVAL:
+        return catalog
+    version = get_catalog_version()
+    if catalog is None or catalog.version != version:
+        # Один поток воркера загружает каталог, остальные ждут его
+        with _lock:
+            catalog = _catalog
+            if catalog is None or catalog.version != version:
+                catalog = _catalog = _load(version)
+    _checked_at = now
+    return catalog
@@ -0,0 +1,241 @@
+"""
+Назначение ежедневных квестов (DailyQuest).
+
+Набор квестов игрока на дату вычисляется детерминированно из хэша
+(user_id, дата, версия каталога) взвешенным выбором по пулу активных
+квестов для уровня игрока (quests.selection), плюс квесты, закрепленные
+администратором (PinnedDailyQuest). Для одних входных
+данных результат одинаков в любом процессе, поэтому режимы
+QUEST_DAILY_SELECTION_MODE дают одинаковые наборы:
+
+- 'stored' (по умолчанию) - набор хранится строками DailyQuest. Команда
+  generate_daily_quests накануне назначает квесты всем активным игрокам
+  пачками bulk_create(ignore_conflicts=True), и в 00:00 UTC DailyQuestsView
+  только читает. Игроку без назначения квесты назначаются при первом
+  запросе; параллельные запросы вставляют одни и те же строки. Квесты,
+  закрепленные после назначения, добавляются к сохраненному набору при
+  чтении.
+- 'derived' - строки DailyQuest не создаются, набор вычисляется при
+  каждом запросе. Строки QuestProgress создаются, только когда игрок
+  продвигается в квесте. Уже сохраненные назначения (история и дни до
+  переключения режима) читаются как раньше.
+"""
+import hashlib
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
+
+from .catalog import get_catalog
+from .models import DailyQuest, PinnedDailyQuest, Quest, QuestProgress
+from .selection import MAX_DAILY_QUESTS, MIN_DAILY_QUESTS, QuestRow, build_pool, draw_quests, get_compiled
+
+User = get_user_model()
+
+SELECTION_MODE = getattr(settings, 'QUEST_DAILY_SELECTION_MODE', 'stored')
+# Активные игроки для пред-генерации - получавшие ежедневные квесты или продвигавшиеся в них за последние N дней
+ACTIVE_DAYS = 7
+
+
+def load_pool():
+    """
+    Пул активных квестов из БД - для пред-генерации. Запросы игроков
+    берут пул из кэша каталога (quests.catalog).
+    """
+    return build_pool(
+        QuestRow(*row) for row in
+        Quest.objects.filter(is_active=True, type__isnull=False).exclude(type='')
+        .values_list('id', 'type', 'weight', 'min_level', 'max_level')
+    )
+
+
+def has_enough_quests(pool, level):
+    """Можно ли выбрать игроку уровня level не меньше MIN_DAILY_QUESTS квестов."""
+    return get_compiled(pool).bracket(level).capacity >= MIN_DAILY_QUESTS
+
+
+def insufficient_level_ranges(pool):
+    """
+    Диапазоны уровней, игрокам которых нельзя выбрать MIN_DAILY_QUESTS квестов.
+
+    Returns:
+        list[(первый уровень, последний уровень | None)]
+    """
+    compiled = get_compiled(pool)
+    ends = [start - 1 for start in compiled.starts[1:]] + [None]
+    return [
+        (start, end)
+        for start, end, bracket in zip(compiled.starts, ends, compiled.brackets)
+        if bracket.capacity < MIN_DAILY_QUESTS
+    ]
+
+
+def _user_levels(user_ids):
+    return dict(User.objects.filter(id__in=user_ids).values_list('id', 'level'))
+
+
+def load_pins(date, user_ids=None):
+    """
+    Закрепленные квесты на дату.
+
+    Returns:
+        (tuple общих ID квестов, {user_id: tuple ID квестов игрока})
+    """
+    pins = PinnedDailyQuest.objects.filter(date=date, quest__is_active=True)
+    if user_ids is not None:
+        pins = pins.filter(user_id__in=user_ids) | pins.filter(user__isnull=True)
+    common = []
+    personal = {}
+    for user_id, quest_id in pins.order_by('quest_id').values_list('user_id', 'quest_id'):
+        if user_id is None:
+            common.append(quest_id)
+        else:
+            personal.setdefault(user_id, []).append(quest_id)
+    return tuple(common), {user_id: tuple(quest_ids) for user_id, quest_ids in personal.items()}
+
+
+def _late_pins(user_id, date, quest_ids):
+    """Квесты, закрепленные для игрока на дату, которых нет в уже назначенном наборе quest_ids."""
+    common, personal = load_pins(date, [user_id])
+    assigned = set(quest_ids)
+    return [quest_id for quest_id in dict.fromkeys(common + personal.get(user_id, ())) if quest_id not in assigned]
+
+
+def select_daily_quests(user_id, date, pool, pinned=(), level=1):
+    """
+    ID квестов игрока на дату: закрепленные, затем выбранные из пула для
+    уровня level (всего от MIN_DAILY_QUESTS до MAX_DAILY_QUESTS, если
+    хватает квестов; закрепленные - все). Один и тот же результат для
+    одних аргументов в любом процессе.
+    """
+    digest = hashlib.sha256(f'{user_id}:{date.isoformat()}:{pool.version}'.encode()).digest()
+    rng = random.Random(int.from_bytes(digest[:8], 'big'))
+    count = rng.randint(MIN_DAILY_QUESTS, MAX_DAILY_QUESTS)
+    pinned = list(dict.fromkeys(pinned))
+    return pinned + draw_quests(get_compiled(pool), level, rng, count - len(pinned), pinned)
+
+
+def assign_daily_quests(user_ids, date, pool=None):
+    """
+    Назначает квесты на дату игрокам, у которых еще нет назначения.
+    Конфликты с параллельным назначением пропускаются.
+
+    Returns:
+        int: Количество игроков, которым назначены квесты
+    """
+    if pool is None:
+        pool = load_pool()
+    assigned = set(
+        DailyQuest.objects.filter(user_id__in=user_ids, date=date).values_list('user_id', flat=True).distinct()
+    )
+    levels = _user_levels([user_id for user_id in user_ids if user_id not in assigned])
+    # Игроки, для уровня которых квестов не хватает, остаются без назначения
+    pending = [user_id for user_id, level in levels.items() if has_enough_quests(pool, level)]
+    if not pending:
+        return 0
+    common, personal = load_pins(date, pending)
+    DailyQuest.objects.bulk_create(
+        [
+            DailyQuest(user_id=user_id, quest_id=quest_id, date=date)
+            for user_id in pending
+            for quest_id in select_daily_quests(
+                user_id, date, pool, common + personal.get(user_id, ()), levels[user_id]
+            )
+        ],
+        ignore_conflicts=True,
+        batch_size=1000,
+    )
+    return len(pending)
+
+
+def _derive(user_id, date, pool, level):
+    """Набор игрока без записи в БД - тот же, что сохранил бы assign_daily_quests."""
+    common, personal = load_pins(date, [user_id])
+    return select_daily_quests(user_id, date, pool, common + personal.get(user_id, ()), level)
+
+
+def daily_quest_ids(user_id, date, level=None):
+    """
+    ID квестов игрока на дату и ID строк DailyQuest (None в режиме 'derived')
+    без записи в БД. level - уровень игрока, если уже известен.
+
+    Returns:
+        list[(daily_quest_id | None, quest_id)]
+    """
+    stored = list(
+        DailyQuest.objects.filter(user_id=user_id, date=date).order_by('id').values_list('id', 'quest_id')
+    )
+    if stored:
+        # Закрепленные после назначения - без строк DailyQuest, как в режиме 'derived'
+        late = _late_pins(user_id, date, [quest_id for _daily_quest_id, quest_id in stored])
+        return stored + [(None, quest_id) for quest_id in late]
+    if SELECTION_MODE != 'derived':
+        return stored
+    pool = get_catalog().pool
+    if level is None:
+        level = _user_levels([user_id]).get(user_id, 1)
+    if not has_enough_quests(pool, level):
+        return []
+    return [(None, quest_id) for quest_id in _derive(user_id, date, pool, level)]
+
+
+def get_daily_quests(user_id, date, level=None):
+    """
+    Квесты игрока на дату. В режиме 'stored' назначает их, если их еще нет
+    (пред-генерация не застала игрока); в режиме 'derived' вычисляет без записи.
+    level - уровень игрока, если уже известен.
+
+    Returns:
+        list[Quest] | None: None - для уровня игрока в каталоге не хватает квестов
+    """
+    catalog = get_catalog()
+    stored = DailyQuest.objects.filter(user_id=user_id, date=date).order_by('id').values_list('quest_id', flat=True)
+    quest_ids = list(stored)
+    if quest_ids:
+        late = _late_pins(user_id, date, quest_ids)
+        if late and SELECTION_MODE != 'derived':
+            DailyQuest.objects.bulk_create(
+                [DailyQuest(user_id=user_id, quest_id=quest_id, date=date) for quest_id in late],
+                ignore_conflicts=True,
+            )
+            return _catalog_quests(catalog, list(stored.all()))
+        return _catalog_quests(catalog, quest_ids + late)
+    pool = catalog.pool
+    if level is None:
+        level = _user_levels([user_id]).get(user_id, 1)
+    if not has_enough_quests(pool, level):
+        return None
+    if SELECTION_MODE == 'derived':
+        return _catalog_quests(catalog, _derive(user_id, date, pool, level))
+    # Параллельный запрос мог назначить квесты раньше - тогда вставка ничего не добавит
+    assign_daily_quests([user_id], date, pool)
+    return _catalog_quests(catalog, list(stored.all()))
+
+
+def _catalog_quests(catalog, quest_ids):
+    """Квесты по ID из кэша каталога; назначенные, но уже не активные - из БД."""
+    missing = [quest_id for quest_id in quest_ids if quest_id not in catalog.by_id]
+    by_id = {**Quest.objects.in_bulk(missing), **catalog.by_id} if missing else catalog.by_id
+    return [by_id[quest_id] for quest_id in quest_ids if quest_id in by_id]
+
+
+def active_user_ids(date, active_days=ACTIVE_DAYS, batch_size=1000):
+    """
+    ID активных игроков пачками по batch_size: is_active и ежедневные
+    квесты или прогресс квестов (режим 'derived') за active_days дней до date.
+    """
+    since = date - timedelta(days=active_days)
+    recent_daily = DailyQuest.objects.filter(user_id=OuterRef('id'), date__gte=since, date__lt=date)
+    recent_progress = QuestProgress.objects.filter(user_id=OuterRef('id'), date__gte=since, date__lt=date)
+    last_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(id__gt=last_id, is_active=True).filter(Exists(recent_daily) | Exists(recent_progress))
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not user_ids:
+            return
+        last_id = user_ids[-1]
+        yield user_ids
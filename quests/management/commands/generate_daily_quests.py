@@ -0,0 +1,61 @@
+import time
+from datetime import date as date_type, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from quests.daily import (
+    ACTIVE_DAYS, MIN_DAILY_QUESTS, SELECTION_MODE, active_user_ids, assign_daily_quests, insufficient_level_ranges,
+    load_pool,
+)
+from quests.selection import get_compiled
+
+
+class Command(BaseCommand):
+    help = (
+        "Заранее назначает ежедневные квесты на дату (по умолчанию - завтра по UTC) всем активным "
+        "игрокам, чтобы в 00:00 UTC DailyQuestsView только читал. Запускать раз в сутки до полуночи (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Дата в формате YYYY-MM-DD (по умолчанию - завтра)")
+        parser.add_argument(
+            '--active-days', type=int, default=ACTIVE_DAYS,
+            help="Активные игроки - получавшие ежедневные квесты или прогресс квестов за последние N дней"
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help="Игроков в одной транзакции")
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Назначить и в режиме 'derived' (перед возвратом к режиму 'stored' - наборы совпадут)"
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                target = date_type.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError("--date must be YYYY-MM-DD")
+        else:
+            target = timezone.now().date() + timedelta(days=1)
+
+        if SELECTION_MODE == 'derived' and not options['force']:
+            self.stdout.write("QUEST_DAILY_SELECTION_MODE = 'derived': квесты вычисляются при запросе, назначение не нужно")
+            return
+        pool = load_pool()
+        insufficient = insufficient_level_ranges(pool)
+        ranges = ', '.join(f"{start}-{end if end is not None else '...'}" for start, end in insufficient)
+        if len(insufficient) == len(get_compiled(pool).brackets):
+            raise CommandError(f"Not enough active quests: fewer than {MIN_DAILY_QUESTS} can be selected for any level")
+        if insufficient:
+            # Игроки этих уровней не получат назначения - DailyQuestsView ответит им 400
+            self.stderr.write(f"Not enough active quests for levels {ranges}: these players are skipped")
+
+        started = time.perf_counter()
+        assigned = 0
+        for user_ids in active_user_ids(target, options['active_days'], options['batch_size']):
+            with transaction.atomic():
+                assigned += assign_daily_quests(user_ids, target, pool)
+        self.stdout.write(
+            f"{target}: квесты назначены {assigned} игрокам за {time.perf_counter() - started:.1f} с"
+        )
@@ -0,0 +1,126 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quests', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='dailyquest',
+            options={'ordering': ['-date'], 'verbose_name': 'Ежедневный квест', 'verbose_name_plural': 'Ежедневные квесты'},
+        ),
+        migrations.AlterModelOptions(
+            name='quest',
+            options={'ordering': ['-created_at'], 'verbose_name': 'Квест', 'verbose_name_plural': 'Квесты'},
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='image_url',
+            field=models.URLField(blank=True, help_text='URL картинки квеста', max_length=500, null=True),
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='is_active',
+            field=models.BooleanField(default=True, help_text='Активен ли квест'),
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='item_id',
+            field=models.IntegerField(blank=True, help_text="ID предмета (требуется если reward_type='item')", null=True),
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='promo_code',
+            field=models.CharField(blank=True, help_text='Промокод, который выдается за выполнение квеста', max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='reward_amount',
+            field=models.IntegerField(default=0, help_text='Количество награды (>= 0)'),
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='reward_type',
+            field=models.CharField(choices=[('coins', 'Coins'), ('experience', 'Experience'), ('item', 'Item')], default='coins', help_text='Тип награды: coins, experience, item', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='type',
+            field=models.CharField(choices=[('mark_sights', 'Mark Sights'), ('visit_sights', 'Visit Sights'), ('steps', 'Steps'), ('collect_coins', 'Collect Coins'), ('level_up', 'Level Up')], default='mark_sights', help_text='Тип условия квеста. КРИТИЧЕСКИ ВАЖНО - не может быть пустым!', max_length=50),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='quest',
+            name='count',
+            field=models.IntegerField(default=1, help_text='Требуемое количество для выполнения'),
+        ),
+        migrations.AlterField(
+            model_name='quest',
+            name='description',
+            field=models.TextField(help_text='Описание квеста', max_length=500),
+        ),
+        migrations.AlterField(
+            model_name='quest',
+            name='title',
+            field=models.CharField(help_text='Название квеста', max_length=200),
+        ),
+        migrations.CreateModel(
+            name='QuestProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('current_progress', models.IntegerField(default=0, help_text='Текущий прогресс выполнения')),
+                ('is_completed', models.BooleanField(default=False, help_text='Выполнен ли квест')),
+                ('reward_claimed', models.BooleanField(default=False, help_text='Получена ли награда')),
+                ('date', models.DateField(help_text='Дата квеста')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('daily_quest', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='progresses', to='quests.dailyquest')),
+                ('quest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progresses', to='quests.quest')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quest_progresses', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Прогресс квеста',
+                'verbose_name_plural': 'Прогрессы квестов',
+                'ordering': ['-date', '-created_at'],
+                'unique_together': {('user', 'quest', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestPromoCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('promo_code', models.CharField(max_length=100, verbose_name='Промокод')),
+                ('date', models.DateField(help_text='Дата, когда был выполнен квест и получен промокод', verbose_name='Дата получения')),
+                ('obtained_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата и время получения')),
+                ('quest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='promo_codes_issued', to='quests.quest', verbose_name='Квест')),
+                ('quest_progress', models.ForeignKey(blank=True, help_text='Связь с конкретным выполнением квеста', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='promo_code_issued', to='quests.questprogress', verbose_name='Прогресс квеста')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quest_promo_codes', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Промокод за квест',
+                'verbose_name_plural': 'Промокоды за квесты',
+                'ordering': ['-obtained_at'],
+                'unique_together': {('user', 'quest', 'date', 'promo_code')},
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quests', '0002_quest_rewards_progress_promo_codes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PinnedDailyQuest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+            ],
+            options={
+                'verbose_name': 'Закрепленный квест',
+                'verbose_name_plural': 'Закрепленные квесты',
+                'ordering': ['-date', 'quest_id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='max_level',
+            field=models.PositiveIntegerField(blank=True, help_text='Максимальный уровень игрока (пусто - без ограничения)', null=True),
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='min_level',
+            field=models.PositiveIntegerField(default=1, help_text='Минимальный уровень игрока'),
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='weight',
+            field=models.PositiveIntegerField(default=1, help_text='Относительный вес при выборе в ежедневные квесты (0 - не выбирается, только закрепление)'),
+        ),
+        migrations.AddIndex(
+            model_name='questpromocode',
+            index=models.Index(fields=['user', 'obtained_at'], name='quests_promo_user_time_idx'),
+        ),
+        migrations.AddField(
+            model_name='pinneddailyquest',
+            name='quest',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pins', to='quests.quest', verbose_name='Квест'),
+        ),
+        migrations.AddField(
+            model_name='pinneddailyquest',
+            name='user',
+            field=models.ForeignKey(blank=True, help_text='Пусто - для всех игроков', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Игрок'),
+        ),
+        migrations.AddIndex(
+            model_name='pinneddailyquest',
+            index=models.Index(fields=['date', 'user'], name='quests_pin_date_user_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='pinneddailyquest',
+            constraint=models.UniqueConstraint(fields=('quest', 'date', 'user'), name='quests_pin_unique'),
+        ),
+    ]
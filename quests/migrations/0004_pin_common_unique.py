@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def delete_duplicate_common_pins(apps, schema_editor):
+    """Оставляет одно общее закрепление (user пустой) на квест и дату - самое раннее."""
+    PinnedDailyQuest = apps.get_model('quests', 'PinnedDailyQuest')
+
+    seen = set()
+    duplicates = []
+    for pin_id, quest_id, date in PinnedDailyQuest.objects.filter(user__isnull=True).order_by('id').values_list(
+        'id', 'quest_id', 'date'
+    ).iterator():
+        if (quest_id, date) in seen:
+            duplicates.append(pin_id)
+        else:
+            seen.add((quest_id, date))
+    PinnedDailyQuest.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quests', '0003_pinned_quests_level_weights'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_common_pins, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='pinneddailyquest',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('quest', 'date'), name='quests_pin_common_unique'),
+        ),
+    ]
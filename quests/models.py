@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 
@@ -64,6 +66,18 @@ class Quest(models.Model):
         help_text="URL картинки квеста"
     )
     
+    # Поля выбора в ежедневные квесты (quests.selection)
+    weight = models.PositiveIntegerField(
+        default=1,
+        help_text="Относительный вес при выборе в ежедневные квесты (0 - не выбирается, только закрепление)"
+    )
+    min_level = models.PositiveIntegerField(default=1, help_text="Минимальный уровень игрока")
+    max_level = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Максимальный уровень игрока (пусто - без ограничения)"
+    )
+
     # Дополнительные поля
     is_active = models.BooleanField(default=True, help_text="Активен ли квест")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -92,6 +106,10 @@ class Quest(models.Model):
         if self.reward_type == 'item' and not self.item_id:
             raise ValidationError({'item_id': 'Поле item_id обязательно если reward_type="item"'})
         
+        # Диапазон уровней не может быть пустым
+        if self.max_level is not None and self.max_level < self.min_level:
+            raise ValidationError({'max_level': 'Поле max_level должно быть >= min_level'})
+        
         # Маппинг visit_sights на mark_sights
         if self.type == 'visit_sights':
             self.type = 'mark_sights'
@@ -104,6 +122,13 @@ class Quest(models.Model):
         return f"{self.title} ({self.type})"
 
 
+@receiver([post_save, post_delete], sender=Quest)
+def invalidate_quest_catalog(sender, **kwargs):
+    """Кэш каталога квестов в воркерах (quests.catalog) устаревает при любом изменении квеста."""
+    from .catalog import invalidate_catalog
+    invalidate_catalog()
+
+
 class DailyQuest(models.Model):
     """Связь пользователя с квестом на конкретную дату"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_quests')
@@ -120,6 +145,42 @@ class DailyQuest(models.Model):
         return f"{self.user.username} - {self.quest.title} ({self.date})"
 
 
+class PinnedDailyQuest(models.Model):
+    """
+    Квест, закрепленный администратором в ежедневных квестах на дату:
+    добавляется к выбранным квестам всех игроков (user пустой) или одного игрока.
+    """
+    quest = models.ForeignKey(Quest, on_delete=models.CASCADE, related_name='pins', verbose_name="Квест")
+    date = models.DateField(verbose_name="Дата")
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        null=True,
+        blank=True,
+        verbose_name="Игрок",
+        help_text="Пусто - для всех игроков"
+    )
+
+    class Meta:
+        verbose_name = "Закрепленный квест"
+        verbose_name_plural = "Закрепленные квесты"
+        ordering = ['-date', 'quest_id']
+        constraints = [
+            models.UniqueConstraint(fields=['quest', 'date', 'user'], name='quests_pin_unique'),
+            # NULL не равен NULL: общие закрепления (user пустой) уникальны отдельным частичным индексом
+            models.UniqueConstraint(
+                fields=['quest', 'date'], condition=models.Q(user__isnull=True), name='quests_pin_common_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'user'], name='quests_pin_date_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quest.title} ({self.date}, {self.user.username if self.user_id else 'все игроки'})"
+
+
 class QuestProgress(models.Model):
     """Прогресс выполнения квеста пользователем"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quest_progresses')
@@ -189,6 +250,10 @@ class QuestPromoCode(models.Model):
         verbose_name_plural = "Промокоды за квесты"
         ordering = ['-obtained_at']
         unique_together = ('user', 'quest', 'date', 'promo_code')  # Предотвращает дубликаты
+        indexes = [
+            # Изменения с момента последней синхронизации (sync.changes)
+            models.Index(fields=['user', 'obtained_at'], name='quests_promo_user_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.promo_code} ({self.quest.title}, {self.date})"
\ No newline at end of file
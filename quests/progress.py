@@ -0,0 +1,64 @@
+"""
+Продвижение прогресса квестов (QuestProgress).
+
+Прогресс всех подходящих квестов игрока увеличивается одним UPDATE:
+current_progress = LEAST(current_progress + amount, quest.count), а
+is_completed вычисляется в том же выражении. Недостающие строки
+прогресса создаются заранее одним INSERT с пропуском существующих.
+Число запросов не зависит от числа квестов, а параллельные вызовы не
+теряют приращения: UPDATE читает текущее значение в БД, а не в памяти.
+"""
+from django.db.models import Case, F, OuterRef, Subquery, When
+from django.db.models.functions import Coalesce, Least
+from django.utils import timezone
+
+from .catalog import get_catalog
+from .daily import daily_quest_ids
+from .models import DailyQuest, Quest, QuestProgress
+
+
+def advance_quest_progress(user_id, quest_type, amount, date=None):
+    """
+    Увеличивает на amount прогресс активных ежедневных квестов игрока
+    типа quest_type за дату date (по умолчанию - сегодня). Вызывается в
+    транзакции изменения, которое засчитывается в прогресс.
+
+    Returns:
+        int: Количество квестов, прогресс которых изменился
+    """
+    if amount <= 0:
+        return 0
+    date = date or timezone.now().date()
+    # Назначенные квесты (в режиме 'derived' - вычисленные, без строк DailyQuest)
+    # Тип и активность квестов - из кэша каталога (quests.catalog)
+    matching = {quest.id for quest in get_catalog().by_type.get(quest_type, ())}
+    daily_quests = [
+        (daily_quest_id, quest_id) for daily_quest_id, quest_id in daily_quest_ids(user_id, date)
+        if quest_id in matching
+    ]
+    if not daily_quests:
+        return 0
+
+    quest_ids = [quest_id for _daily_quest_id, quest_id in daily_quests]
+    QuestProgress.objects.bulk_create(
+        [
+            QuestProgress(user_id=user_id, quest_id=quest_id, date=date, daily_quest_id=daily_quest_id)
+            for daily_quest_id, quest_id in daily_quests
+        ],
+        ignore_conflicts=True,
+    )
+
+    required = Subquery(Quest.objects.filter(id=OuterRef('quest_id')).values('count')[:1])
+    daily_quest = Subquery(
+        DailyQuest.objects.filter(
+            user_id=OuterRef('user_id'), quest_id=OuterRef('quest_id'), date=OuterRef('date')
+        ).values('id')[:1]
+    )
+    return QuestProgress.objects.filter(
+        user_id=user_id, date=date, quest_id__in=quest_ids, is_completed=False
+    ).update(
+        current_progress=Least(F('current_progress') + amount, required),
+        is_completed=Case(When(current_progress__gte=required - amount, then=True), default=False),
+        daily_quest_id=Coalesce(F('daily_quest_id'), daily_quest),
+        updated_at=timezone.now(),
+    )
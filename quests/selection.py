@@ -0,0 +1,212 @@
+"""
+Взвешенный выбор ежедневных квестов с учетом уровня игрока.
+
+Пул активных квестов при изменении каталога компилируется в диапазоны
+уровней: внутри диапазона набор доступных квестов одинаков (границы -
+min_level и max_level + 1 квестов). Для каждого диапазона строятся
+таблицы псевдонимов (метод Уолкера): по типам квестов (вес типа - сумма
+весов его квестов) и по квестам каждого типа. Квест выбирается за O(1):
+сначала тип, затем квест этого типа. Тип, набравший MAX_PER_TYPE
+квестов, и уже выбранные квесты отбрасываются и тянутся заново. Если с
+ограничением MAX_PER_TYPE в диапазоне не набрать MIN_DAILY_QUESTS
+квестов, ограничение в этом диапазоне не действует.
+
+Скомпилированный пул хранится в процессе до смены версии каталога и
+общий для выбора при запросе и пред-генерации (quests.daily).
+"""
+import bisect
+import hashlib
+from collections import Counter
+from typing import NamedTuple
+
+from django.conf import settings
+
+MIN_DAILY_QUESTS = 3
+MAX_DAILY_QUESTS = 5
+# Квестов одного типа в наборе игрока (None - без ограничения)
+MAX_PER_TYPE = getattr(settings, 'QUEST_DAILY_MAX_PER_TYPE', None)
+# Попыток вытянуть не отброшенный элемент, затем - выбор среди оставшихся
+DRAW_ATTEMPTS = 16
+
+
+class QuestRow(NamedTuple):
+    """Поля квеста, от которых зависит выбор."""
+    id: int
+    type: str
+    weight: int
+    min_level: int
+    max_level: int
+
+
+class QuestPool(NamedTuple):
+    """Пул для выбора: активные квесты по возрастанию ID и версия каталога."""
+    quests: tuple
+    version: str
+
+
+def build_pool(quests):
+    """
+    Пул из активных квестов (Quest или QuestRow); квесты без type не входят.
+    Версия меняется при изменении состава пула, типов, весов или диапазонов уровней.
+    """
+    rows = tuple(sorted(
+        (
+            QuestRow(quest.id, quest.type, quest.weight, quest.min_level, quest.max_level)
+            for quest in quests if quest.type
+        ),
+        key=lambda row: row.id,
+    ))
+    return QuestPool(rows, hashlib.sha256(repr(rows).encode()).hexdigest()[:16])
+
+
+class AliasTable(NamedTuple):
+    """Таблица псевдонимов: выбор элемента с вероятностью, пропорциональной весу, за O(1)."""
+    items: tuple
+    weights: tuple
+    prob: tuple
+    alias: tuple
+
+    def draw(self, rng, exclude=()):
+        """
+        Элемент, кроме exclude.
+
+        Returns:
+            Элемент или None, если все элементы в exclude
+        """
+        for _attempt in range(DRAW_ATTEMPTS):
+            index = rng.randrange(len(self.items))
+            item = self.items[index] if rng.random() < self.prob[index] else self.items[self.alias[index]]
+            if item not in exclude:
+                return item
+        # Отброшенные элементы занимают большую часть веса - выбираем среди оставшихся за O(n)
+        rest = [(item, weight) for item, weight in zip(self.items, self.weights) if item not in exclude]
+        if not rest:
+            return None
+        return rng.choices([item for item, _weight in rest], [weight for _item, weight in rest])[0]
+
+
+def build_alias_table(items, weights):
+    """Таблица псевдонимов (метод Возе) для элементов items с положительными весами weights."""
+    size = len(items)
+    total = sum(weights)
+    scaled = [weight * size / total for weight in weights]
+    prob = [1.0] * size
+    alias = list(range(size))
+    small = [index for index, value in enumerate(scaled) if value < 1]
+    large = [index for index, value in enumerate(scaled) if value >= 1]
+    while small and large:
+        low = small.pop()
+        high = large.pop()
+        prob[low] = scaled[low]
+        alias[low] = high
+        scaled[high] -= 1 - scaled[low]
+        (small if scaled[high] < 1 else large).append(high)
+    return AliasTable(tuple(items), tuple(weights), tuple(prob), tuple(alias))
+
+
+class Bracket(NamedTuple):
+    """
+    Диапазон уровней: таблица типов, таблицы квестов по типам, ограничение
+    квестов одного типа (None - без ограничения) и сколько квестов можно выбрать.
+    """
+    types: AliasTable
+    by_type: dict
+    type_limit: int
+    capacity: int
+
+
+class CompiledPool(NamedTuple):
+    """Пул, скомпилированный для выбора: диапазоны уровней по возрастанию их начала."""
+    version: str
+    starts: tuple
+    brackets: tuple
+    quest_types: dict
+
+    def bracket(self, level):
+        """Диапазон, в который входит уровень level."""
+        return self.brackets[max(bisect.bisect_right(self.starts, level) - 1, 0)]
+
+
+def _type_limit(table, limit):
+    return len(table.items) if limit is None else min(limit, len(table.items))
+
+
+def _compile_bracket(quests):
+    by_type = {}
+    for quest in quests:
+        by_type.setdefault(quest.type, []).append(quest)
+    tables = {
+        quest_type: build_alias_table([quest.id for quest in group], [quest.weight for quest in group])
+        for quest_type, group in sorted(by_type.items())
+    }
+    types = build_alias_table(list(tables), [sum(table.weights) for table in tables.values()]) if tables else None
+    limit = MAX_PER_TYPE
+    if limit is not None and sum(_type_limit(table, limit) for table in tables.values()) < MIN_DAILY_QUESTS:
+        # Типов в диапазоне слишком мало - лучше повтор типа, чем игрок без квестов
+        limit = None
+    return Bracket(types, tables, limit, sum(_type_limit(table, limit) for table in tables.values()))
+
+
+def compile_pool(pool):
+    """
+    Компилирует пул (QuestPool) в таблицы по диапазонам уровней.
+    Квесты с весом 0 не выбираются, но могут быть закреплены.
+    """
+    quests = [quest for quest in pool.quests if quest.weight > 0]
+    starts = sorted(
+        {1}
+        | {quest.min_level for quest in quests}
+        | {quest.max_level + 1 for quest in quests if quest.max_level is not None}
+    )
+    brackets = tuple(
+        _compile_bracket([
+            quest for quest in quests
+            if quest.min_level <= start and (quest.max_level is None or quest.max_level >= start)
+        ])
+        for start in starts
+    )
+    return CompiledPool(pool.version, tuple(starts), brackets, {quest.id: quest.type for quest in pool.quests})
+
+
+_compiled = None
+
+
+def get_compiled(pool):
+    """Скомпилированный пул; компилируется заново только при смене версии каталога."""
+    global _compiled
+    compiled = _compiled
+    if compiled is None or compiled.version != pool.version:
+        compiled = _compiled = compile_pool(pool)
+    return compiled
+
+
+def draw_quests(compiled, level, rng, count, taken=()):
+    """
+    До count ID квестов для уровня level без повторов и не больше
+    Bracket.type_limit квестов одного типа. Квесты taken (закрепленные) не
+    повторяются и занимают места своего типа.
+    """
+    bracket = compiled.bracket(level)
+    if bracket.types is None:
+        return []
+    per_type = Counter(compiled.quest_types.get(quest_id) for quest_id in taken)
+    excluded = set(taken)
+    full = {
+        quest_type for quest_type, table in bracket.by_type.items()
+        if per_type[quest_type] >= _type_limit(table, bracket.type_limit)
+    }
+    chosen = []
+    while len(chosen) < count:
+        quest_type = bracket.types.draw(rng, full)
+        if quest_type is None:
+            break
+        quest_id = bracket.by_type[quest_type].draw(rng, excluded)
+        if quest_id is None:
+            full.add(quest_type)
+            continue
+        chosen.append(quest_id)
+        excluded.add(quest_id)
+        per_type[quest_type] += 1
+        if per_type[quest_type] >= _type_limit(bracket.by_type[quest_type], bracket.type_limit):
+            full.add(quest_type)
+    return chosen
@@ -5,9 +5,12 @@ from rest_framework import status
 from django.utils import timezone
 from django.db import transaction
 from django.contrib.auth import get_user_model
-import random
-from .models import Quest, DailyQuest, QuestProgress, QuestPromoCode
+from .catalog import get_catalog
+from .daily import get_daily_quests
+from .models import QuestProgress, QuestPromoCode
 from .serializers import QuestSerializer, QuestCompleteSerializer, QuestProgressSerializer, QuestPromoCodeSerializer
+from myproject.streaming import get_stream_format, iterate_serialized, stream_list_response
+from idempotency.decorators import idempotent
 
 User = get_user_model()
 
@@ -33,36 +36,13 @@ class DailyQuestsView(APIView):
         today = timezone.now().date()
         user = request.user
 
-        # Проверяем существующие квесты на сегодня
-        existing_daily_quests = DailyQuest.objects.filter(user=user, date=today)
-        
-        if existing_daily_quests.exists():
-            # Получаем квесты из существующих связей
-            quests = [dq.quest for dq in existing_daily_quests.select_related('quest')]
-        else:
-            # Создаем новые квесты на сегодня
-            # Фильтруем только активные квесты с валидным type
-            all_quests = list(
-                Quest.objects.filter(
-                    is_active=True,
-                    type__isnull=False
-                ).exclude(type='')
-            )
-            
-            if len(all_quests) < 3:
-                return Response({
-                    "error": "Not enough quests in database. Need at least 3 active quests with valid type."
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Выбираем случайные квесты (обычно 3-5)
-            num_quests = min(random.randint(3, 5), len(all_quests))
-            selected_quests = random.sample(all_quests, num_quests)
-            
-            # Создаем связи DailyQuest
-            for quest in selected_quests:
-                DailyQuest.objects.create(user=user, quest=quest, date=today)
-            
-            quests = selected_quests
+        # Квесты назначены заранее командой generate_daily_quests; игроку, которого
+        # она не застала, квесты назначаются здесь (quests.daily) с учетом его уровня
+        quests = get_daily_quests(user.id, today, user.level)
+        if quests is None:
+            return Response({
+                "error": "Not enough quests in database. Need at least 3 active quests with valid type."
+            }, status=status.HTTP_400_BAD_REQUEST)
 
         # Сериализуем квесты
         serializer = QuestSerializer(quests, many=True)
@@ -103,6 +83,7 @@ class CompleteQuestView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     @transaction.atomic
     def post(self, request, quest_id):
         serializer = QuestCompleteSerializer(data=request.data)
@@ -122,10 +103,9 @@ class CompleteQuestView(APIView):
                 "message": "player_id does not match authenticated user"
             }, status=status.HTTP_403_FORBIDDEN)
 
-        # Получаем квест
-        try:
-            quest = Quest.objects.get(id=quest_id, is_active=True)
-        except Quest.DoesNotExist:
+        # Получаем квест из кэша каталога активных квестов (quests.catalog)
+        quest = get_catalog().by_id.get(quest_id)
+        if quest is None:
             return Response({
                 "success": False,
                 "message": "Quest not found"
@@ -163,10 +143,10 @@ class CompleteQuestView(APIView):
         level_info = None
 
         if quest.reward_type == 'coins':
-            new_coins = user.add_coins(quest.reward_amount)
+            new_coins = user.add_coins(quest.reward_amount, source='quest_reward', reference=f'quest:{quest.id}')
             reward_given['new_balance'] = new_coins
         elif quest.reward_type == 'experience':
-            exp_result = user.add_experience(quest.reward_amount)
+            exp_result = user.add_experience(quest.reward_amount, source='quest_reward', reference=f'quest:{quest.id}')
             reward_given['new_experience'] = exp_result['experience']
             if exp_result['leveled_up']:
                 level_info = {
@@ -285,19 +265,29 @@ class QuestPromoCodesView(APIView):
     
     **Ответ:**
     - 200 OK: Список промокодов с информацией о квестах
+    - 400 Bad Request: Неизвестный формат stream
     - 401 Unauthorized: Требуется аутентификация
+
+    ?stream=json|ndjson - потоковый ответ без сборки списка в памяти (myproject.streaming).
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         # Используем пользователя из токена аутентификации
         user = request.user
+        stream = get_stream_format(request)
         
         # Получаем все промокоды игрока, отсортированные по дате получения (новые первыми)
         promo_codes = QuestPromoCode.objects.filter(
             user=user
         ).select_related('quest').order_by('-obtained_at')
         
+        if stream:
+            return stream_list_response(
+                stream, {"success": True, "player_id": user.id}, 'promo_codes',
+                iterate_serialized(promo_codes, QuestPromoCodeSerializer),
+            )
+        
         serializer = QuestPromoCodeSerializer(promo_codes, many=True)
         
         return Response({
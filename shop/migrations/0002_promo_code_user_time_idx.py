@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userpromocode',
+            index=models.Index(fields=['user', 'purchased_at'], name='shop_promo_user_time_idx'),
+        ),
+    ]
@@ -42,6 +42,10 @@ class UserPromoCode(models.Model):
         verbose_name_plural = "Промокоды пользователей"
         ordering = ['-purchased_at']
         unique_together = ('user', 'shop_item', 'promo_code')  # Предотвращает дубликаты
+        indexes = [
+            # Изменения с момента последней синхронизации (sync.changes)
+            models.Index(fields=['user', 'purchased_at'], name='shop_promo_user_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.promo_code} ({self.shop_item.name})"
@@ -3,6 +3,11 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from django.db import transaction
+from django.contrib.auth import get_user_model
+from myproject.streaming import get_stream_format, iterate_serialized, stream_list_response
+from wallet.ledger import debit_coins
+from sync.changes import record_deletions
+from idempotency.decorators import idempotent
 from .models import ShopItem, UserPromoCode, PurchaseHistory
 from .serializers import (
     ShopItemSerializer,
@@ -12,6 +17,8 @@ from .serializers import (
     DeletePromoCodeSerializer
 )
 
+User = get_user_model()
+
 
 class ShopItemsListView(APIView):
     """
@@ -36,6 +43,7 @@ class PurchaseItemView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     @transaction.atomic
     def post(self, request):
         serializer = PurchaseItemSerializer(data=request.data)
@@ -57,16 +65,6 @@ class PurchaseItemView(APIView):
                 "error": f"Item with ID {item_id} not found or not available"
             }, status=status.HTTP_404_NOT_FOUND)
 
-        # Проверяем баланс
-        if user.coins < item.price:
-            return Response({
-                "success": False,
-                "error": "Insufficient funds",
-                "message": f"You have {user.coins} coins, but need {item.price} coins",
-                "required": item.price,
-                "available": user.coins
-            }, status=status.HTTP_400_BAD_REQUEST)
-
         # Проверяем, не купил ли пользователь уже этот товар (опционально - можно убрать, если разрешить повторные покупки)
         # Если нужно разрешить только одну покупку каждого товара, раскомментируйте:
         # if UserPromoCode.objects.filter(user=user, shop_item=item).exists():
@@ -75,9 +73,18 @@ class PurchaseItemView(APIView):
         #         "error": "You have already purchased this item"
         #     }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Списываем деньги
-        user.coins -= item.price
-        user.save()
+        # Проверяем баланс и списываем деньги одним условным UPDATE (с записью в журнал баланса)
+        remaining_coins = debit_coins(user.id, item.price, 'purchase', f'shop_item:{item.id}')
+        if remaining_coins is None:
+            available = User.objects.filter(id=user.id).values_list('coins', flat=True).get()
+            return Response({
+                "success": False,
+                "error": "Insufficient funds",
+                "message": f"You have {available} coins, but need {item.price} coins",
+                "required": item.price,
+                "available": available
+            }, status=status.HTTP_400_BAD_REQUEST)
+        user.coins = remaining_coins
 
         # Создаем запись о промокоде
         user_promo_code, created = UserPromoCode.objects.get_or_create(
@@ -108,12 +115,19 @@ class PurchaseItemView(APIView):
 class UserPromoCodesView(APIView):
     """
     API endpoint для получения списка промокодов пользователя.
+    ?stream=json|ndjson - потоковый ответ без сборки списка в памяти (myproject.streaming).
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         user = request.user
+        stream = get_stream_format(request)
         promo_codes = UserPromoCode.objects.filter(user=user)
+        if stream:
+            return stream_list_response(
+                stream, {"success": True}, 'promo_codes',
+                iterate_serialized(promo_codes.select_related('shop_item'), UserPromoCodeSerializer),
+            )
         serializer = UserPromoCodeSerializer(promo_codes, many=True)
         return Response({
             "success": True,
@@ -158,8 +172,10 @@ class DeletePromoCodeView(APIView):
                 "error": f"Promo code with ID {promo_code_id} not found or does not belong to you"
             }, status=status.HTTP_404_NOT_FOUND)
 
-        # Удаляем промокод
-        promo_code.delete()
+        # Удаляем промокод вместе с отметкой для синхронизации (GET /api/sync/)
+        with transaction.atomic():
+            promo_code.delete()
+            record_deletions('promo_code', [(user.id, promo_code_id)])
 
         return Response({
             "success": True,
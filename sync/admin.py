@@ -0,0 +1,17 @@
+from django.contrib import admin
+from .models import Tombstone
+
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'kind', 'object_id', 'deleted_at')
+    list_filter = ('kind',)
+    search_fields = ('user__username',)
+    raw_id_fields = ('user',)
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,184 @@
+"""
+Изменения списков пользователя с момента курсора (GET /api/sync/):
+наблюдения достопримечательностей, промокоды за квесты и из магазина,
+друзья и запросы дружбы.
+
+Курсор - момент начала предыдущей синхронизации. Новые и измененные
+строки выбираются диапазоном по индексу (пользователь, время изменения),
+удаленные - по отметкам Tombstone. Друг считается измененным, если с
+курсора создано ребро дружбы или изменился его профиль
+(CustomUser.profile_updated_at). Диапазон начинается на CURSOR_OVERLAP
+раньше курсора: транзакция, начатая до курсора и закоммиченная после,
+не теряется. Строки на границе могут прийти повторно - клиент применяет
+их как upsert.
+"""
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Tombstone
+
+CURSOR_VERSION = 1
+CURSOR_OVERLAP = timedelta(seconds=getattr(settings, 'SYNC_CURSOR_OVERLAP', 10))
+# Отметки об удалении старше этого удаляются; курсор старше - полная синхронизация
+TOMBSTONE_TTL = timedelta(seconds=getattr(settings, 'SYNC_TOMBSTONE_TTL', 30 * 24 * 3600))
+SECTIONS = ('landmarks', 'quest_promo_codes', 'promo_codes', 'friends', 'friend_requests')
+# Список Tombstone.kind -> раздел ответа
+TOMBSTONE_SECTIONS = {'friend': 'friends', 'promo_code': 'promo_codes'}
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(moment):
+    """Непрозрачный курсор для момента moment."""
+    micros = (moment - _EPOCH) // timedelta(microseconds=1)
+    return base64.urlsafe_b64encode(f'{CURSOR_VERSION}:{micros}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Момент, закодированный в курсоре.
+
+    Raises:
+        ValueError: Курсор поврежден или другой версии
+    """
+    try:
+        version, micros = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().split(':')
+        if int(version) != CURSOR_VERSION:
+            raise ValueError
+        return _EPOCH + timedelta(microseconds=int(micros))
+    except (ValueError, OverflowError):
+        raise ValueError("Invalid cursor")
+
+
+def record_deletions(kind, rows):
+    """
+    Сохраняет отметки об удалении. Вызывается в транзакции удаления.
+
+    Args:
+        kind: Tombstone.kind
+        rows: Пары (user_id, object_id) - чей список и что из него удалено
+    """
+    now = timezone.now()
+    Tombstone.objects.bulk_create(
+        [Tombstone(user_id=user_id, kind=kind, object_id=object_id, deleted_at=now) for user_id, object_id in rows]
+    )
+
+
+def _resolve(upserted, deleted):
+    """
+    Оставляет для каждого ID последнее событие: строка могла быть
+    удалена и создана снова (друг) в пределах одного диапазона.
+
+    Args:
+        upserted: {object_id: (время изменения, данные)}
+        deleted: {object_id: время удаления}
+    """
+    for object_id, deleted_at in list(deleted.items()):
+        if object_id in upserted:
+            if upserted[object_id][0] > deleted_at:
+                del deleted[object_id]
+            else:
+                del upserted[object_id]
+    return {
+        "upserted": [data for _changed_at, data in upserted.values()],
+        "deleted": sorted(deleted),
+    }
+
+
+def collect_changes(user_id, since=None):
+    """
+    Изменения списков пользователя с момента since (None - полный снимок).
+
+    Returns:
+        dict: {раздел: {"upserted": [...], "deleted": [...]}} для всех SECTIONS
+    """
+    from accounts.friends import FRIEND_FIELDS
+    from accounts.models import FriendEdge, FriendRequest
+    from accounts.serializers import FriendRequestSerializer
+    from landmarks.models import PlayerLandmarkObservation
+    from quests.models import QuestPromoCode
+    from quests.serializers import QuestPromoCodeSerializer
+    from shop.models import UserPromoCode
+    from shop.serializers import UserPromoCodeSerializer
+
+    def changed(queryset, field):
+        return queryset if since is None else queryset.filter(**{f'{field}__gte': since})
+
+    deleted = {section: {} for section in SECTIONS}
+    if since is not None:
+        tombstones = Tombstone.objects.filter(user_id=user_id, deleted_at__gte=since).values_list(
+            'kind', 'object_id', 'deleted_at'
+        )
+        for kind, object_id, deleted_at in tombstones:
+            section = deleted[TOMBSTONE_SECTIONS[kind]]
+            section[object_id] = max(deleted_at, section.get(object_id, deleted_at))
+
+    # Индекс (player, -observed_at); наблюдения не изменяются после создания
+    observations = changed(PlayerLandmarkObservation.objects.filter(player_id=user_id), 'observed_at')
+    landmarks = list(observations.order_by('-observed_at').values_list('landmark__external_id', flat=True))
+
+    quest_promo_codes = changed(QuestPromoCode.objects.filter(user_id=user_id), 'obtained_at')
+    quest_serializer = QuestPromoCodeSerializer()
+    quest_promo_upserts = {
+        promo.id: (promo.obtained_at, quest_serializer.to_representation(promo))
+        for promo in quest_promo_codes.select_related('quest').order_by('-obtained_at')
+    }
+
+    promo_codes = changed(UserPromoCode.objects.filter(user_id=user_id), 'purchased_at')
+    promo_serializer = UserPromoCodeSerializer()
+    promo_upserts = {
+        promo.id: (promo.purchased_at, promo_serializer.to_representation(promo))
+        for promo in promo_codes.select_related('shop_item').order_by('-purchased_at')
+    }
+
+    # Ребра пользователя по индексу (user, friend): и новые друзья, и друзья с измененным профилем
+    edges = FriendEdge.objects.filter(user_id=user_id)
+    if since is not None:
+        edges = edges.filter(Q(created_at__gte=since) | Q(friend__profile_updated_at__gte=since))
+    rows = edges.order_by('-created_at', '-id').values_list(
+        *(f'friend__{field}' for field in FRIEND_FIELDS), 'created_at', 'friend__profile_updated_at'
+    )
+    friend_upserts = {
+        row[0]: (max(row[-2], row[-1]), dict(zip(FRIEND_FIELDS, row[:-2])))
+        for row in rows
+    }
+
+    # Полный снимок - только необработанные запросы; изменения - любые смены статуса
+    # (клиент убирает из списков запросы со статусом не pending)
+    if since is None:
+        requests = FriendRequest.objects.filter(Q(to_user_id=user_id) | Q(from_user_id=user_id), status='pending')
+    else:
+        requests = FriendRequest.objects.filter(
+            Q(to_user_id=user_id, updated_at__gte=since) | Q(from_user_id=user_id, updated_at__gte=since)
+        )
+    friend_requests = FriendRequestSerializer(
+        requests.select_related('from_user', 'to_user').order_by('-created_at'), many=True
+    ).data
+
+    return {
+        "landmarks": {"upserted": landmarks, "deleted": []},
+        "quest_promo_codes": _resolve(quest_promo_upserts, deleted['quest_promo_codes']),
+        "promo_codes": _resolve(promo_upserts, deleted['promo_codes']),
+        "friends": _resolve(friend_upserts, deleted['friends']),
+        "friend_requests": {"upserted": friend_requests, "deleted": []},
+    }
+
+
+def purge_tombstones(batch_size=5000):
+    """
+    Удаляет отметки об удалении старше TOMBSTONE_TTL пачками.
+
+    Returns:
+        int: Количество удаленных отметок
+    """
+    horizon = timezone.now() - TOMBSTONE_TTL
+    deleted = 0
+    while True:
+        ids = list(Tombstone.objects.filter(deleted_at__lt=horizon).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Tombstone.objects.filter(id__in=ids).delete()[0]
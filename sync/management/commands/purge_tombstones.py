@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from sync.changes import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = "Удаляет отметки об удалении старше SYNC_TOMBSTONE_TTL. Запускать периодически (cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones(options['batch_size'])
+        self.stdout.write(f"Удалено отметок: {deleted}")
@@ -0,0 +1,33 @@
+from django.db import models
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+User = get_user_model()
+
+
+class Tombstone(models.Model):
+    """
+    Отметка об удалении строки из списка пользователя: по ней
+    GET /api/sync/ сообщает клиенту, что удалить из локальной копии.
+    Хранится SYNC_TOMBSTONE_TTL, после чего удаляется командой purge_tombstones.
+    """
+    KIND_CHOICES = [
+        ('friend', 'Друг'),
+        ('promo_code', 'Промокод магазина'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name="Пользователь")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="Список")
+    object_id = models.BigIntegerField(verbose_name="ID удаленного объекта")
+    deleted_at = models.DateTimeField(default=timezone.now, verbose_name="Дата удаления")
+
+    class Meta:
+        verbose_name = "Удаление"
+        verbose_name_plural = "Удаления"
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='sync_tombstone_user_time_idx'),
+            models.Index(fields=['deleted_at'], name='sync_tombstone_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.kind} {self.object_id} ({self.deleted_at})"
@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.friends import add_friendship
+
+from .changes import collect_changes
+
+User = get_user_model()
+
+
+class FriendChangesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='player', password='secret123')
+        self.friend = User.objects.create_user(username='friend', password='secret123')
+        add_friendship(self.user.id, self.friend.id)
+
+    def test_friend_level_change_is_synced(self):
+        since = timezone.now()
+        self.assertEqual(collect_changes(self.user.id, since)['friends']['upserted'], [])
+
+        self.friend.add_experience(10_000)
+
+        friends = collect_changes(self.user.id, since)['friends']['upserted']
+        self.assertEqual([friend['id'] for friend in friends], [self.friend.id])
+        self.assertEqual(friends[0]['level'], User.objects.get(id=self.friend.id).level)
+        self.assertGreater(friends[0]['level'], 1)
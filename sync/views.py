@@ -0,0 +1,46 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from rest_framework import status
+from django.utils import timezone
+from .changes import CURSOR_OVERLAP, TOMBSTONE_TTL, collect_changes, decode_cursor, encode_cursor
+
+
+class SyncView(APIView):
+    """
+    API endpoint для синхронизации после переподключения: изменения
+    списков игрока с момента курсора вместо полных списков.
+
+    **Параметры:**
+    - cursor: курсор из предыдущего ответа (без курсора - полный снимок)
+
+    **Ответ:**
+    - 200 OK: Разделы landmarks, quest_promo_codes, promo_codes, friends,
+      friend_requests с полями upserted и deleted, новый cursor.
+      reset = true - полный снимок (нет курсора или курсор устарел):
+      локальные списки нужно заменить, а не дополнить
+    - 400 Bad Request: Неверный курсор
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        now = timezone.now()
+        since = None
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                since = decode_cursor(cursor)
+            except ValueError as e:
+                return Response({
+                    "success": False,
+                    "error": str(e)
+                }, status=status.HTTP_400_BAD_REQUEST)
+            # Отметки об удалении старше TOMBSTONE_TTL уже удалены - нужен полный снимок
+            since = since - CURSOR_OVERLAP if since > now - TOMBSTONE_TTL else None
+
+        return Response({
+            "success": True,
+            "cursor": encode_cursor(now),
+            "reset": since is None,
+            **collect_changes(request.user.id, since),
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,46 @@
+from django.contrib import admin
+from .models import LedgerEntry, MaterializedBalance
+from .ledger import credit_coins, credit_experience, debit_coins
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    """
+    Журнал баланса только для чтения. Добавление записи из админки
+    начисляет (или списывает) валюту пользователю с источником admin_grant.
+    """
+    list_display = ('id', 'user', 'currency', 'amount', 'source', 'reference', 'created_at')
+    list_filter = ('currency', 'source', 'created_at')
+    search_fields = ('user__username', 'reference')
+    raw_id_fields = ('user',)
+    fields = ('user', 'currency', 'amount', 'reference')
+    list_per_page = 50
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        reference = obj.reference or f'admin:{request.user.username}'
+        if obj.currency == 'experience' and obj.amount < 0:
+            self.message_user(request, "Опыт можно только начислять", level='error')
+        elif obj.currency == 'coins' and obj.amount < 0:
+            if debit_coins(obj.user_id, -obj.amount, 'admin_grant', reference) is None:
+                self.message_user(request, "Недостаточно монет для списания", level='error')
+        elif obj.currency == 'coins':
+            credit_coins(obj.user_id, obj.amount, 'admin_grant', reference)
+        else:
+            credit_experience(obj.user_id, obj.amount, 'admin_grant', reference)
+
+
+@admin.register(MaterializedBalance)
+class MaterializedBalanceAdmin(admin.ModelAdmin):
+    list_display = ('user', 'currency', 'balance', 'last_entry_id', 'updated_at')
+    list_filter = ('currency',)
+    search_fields = ('user__username',)
+    readonly_fields = ('user', 'currency', 'balance', 'last_entry_id', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,103 @@
+"""
+Изменение баланса игрока через журнал.
+
+Каждое изменение - одна запись LedgerEntry и условный UPDATE с F() в той же
+транзакции. Баланс не читается и не сохраняется целиком через save(),
+поэтому параллельные запросы из разных воркеров не теряют обновления.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LedgerEntry
+
+User = get_user_model()
+
+
+def _invalidate_user_state(user_id):
+    from accounts.authentication import invalidate_auth_state
+    invalidate_auth_state(user_id)
+
+
+def credit_coins(user_id, amount, source, reference=''):
+    """
+    Начисляет монеты.
+
+    Returns:
+        int: Новый баланс монет
+    """
+    if amount < 0:
+        raise ValueError("Amount must be positive")
+
+    with transaction.atomic():
+        User.objects.filter(pk=user_id).update(coins=F('coins') + amount)
+        LedgerEntry.objects.create(user_id=user_id, currency='coins', amount=amount, source=source, reference=reference)
+        balance = User.objects.filter(pk=user_id).values_list('coins', flat=True).get()
+
+    _invalidate_user_state(user_id)
+    return balance
+
+
+def debit_coins(user_id, amount, source, reference=''):
+    """
+    Списывает монеты, если их достаточно (проверка и списание - один UPDATE).
+
+    Returns:
+        int | None: Новый баланс монет или None, если монет недостаточно
+    """
+    if amount < 0:
+        raise ValueError("Amount must be positive")
+
+    with transaction.atomic():
+        updated = User.objects.filter(pk=user_id, coins__gte=amount).update(coins=F('coins') - amount)
+        if not updated:
+            return None
+        LedgerEntry.objects.create(user_id=user_id, currency='coins', amount=-amount, source=source, reference=reference)
+        balance = User.objects.filter(pk=user_id).values_list('coins', flat=True).get()
+
+    _invalidate_user_state(user_id)
+    return balance
+
+
+def credit_experience(user_id, amount, source, reference=''):
+    """
+    Начисляет опыт и пересчитывает уровень по кривой уровней.
+
+    Returns:
+        dict: {'experience', 'level', 'total_experience', 'levels_gained'}
+    """
+    from accounts.leveling import get_level_curve
+
+    if amount < 0:
+        raise ValueError("Amount must be positive")
+
+    curve = get_level_curve()
+    with transaction.atomic():
+        # Увеличение накопленного опыта блокирует строку пользователя до конца транзакции
+        User.objects.filter(pk=user_id).update(total_experience=F('total_experience') + amount)
+        LedgerEntry.objects.create(user_id=user_id, currency='experience', amount=amount, source=source, reference=reference)
+        level, experience, total_experience = User.objects.filter(pk=user_id).values_list(
+            'level', 'experience', 'total_experience'
+        ).get()
+
+        # Для пользователей без заполненного накопленного опыта он восстанавливается по уровню
+        total_experience = max(total_experience, curve.threshold(level) + experience + amount)
+        new_level, new_experience = curve.split(total_experience)
+        levels_gained = max(new_level - level, 0)
+        fields = {'level': new_level, 'experience': new_experience, 'total_experience': total_experience}
+        if levels_gained:
+            # Уровень хранится в токене - старые токены получат актуальный уровень из БД
+            fields['auth_version'] = F('auth_version') + 1
+        if new_level != level:
+            # Уровень виден друзьям - синхронизация отдаст обновленный профиль
+            fields['profile_updated_at'] = timezone.now()
+        User.objects.filter(pk=user_id).update(**fields)
+
+    _invalidate_user_state(user_id)
+    return {
+        'experience': new_experience,
+        'level': new_level,
+        'total_experience': total_experience,
+        'levels_gained': levels_gained,
+    }
@@ -0,0 +1,165 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from accounts.leveling import get_level_curve
+from wallet.models import LedgerEntry, MaterializedBalance
+
+User = get_user_model()
+
+# Поле пользователя, с которым сверяется баланс по журналу
+BALANCE_FIELDS = {'coins': 'coins', 'experience': 'total_experience'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Инкрементально пересчитывает балансы по журналу (MaterializedBalance) "
+        "и сверяет их с балансами пользователей. Запускать периодически (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lag-seconds', type=int, default=60,
+            help="Не учитывать записи моложе N секунд (транзакции, которые еще могут коммититься)"
+        )
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--seed-opening-balances', action='store_true',
+            help=(
+                "Создать записи opening_balance: баланс пользователя минус сумма его записей в журнале "
+                "(однократно при внедрении; пользователи с opening_balance пропускаются)"
+            )
+        )
+
+    def handle(self, *args, **options):
+        if options['seed_opening_balances']:
+            created = self.seed_opening_balances(options['batch_size'])
+            self.stdout.write(f"Создано записей opening_balance: {created}")
+
+        horizon = LedgerEntry.objects.filter(
+            created_at__lt=timezone.now() - timedelta(seconds=options['lag_seconds'])
+        ).aggregate(max_id=Max('id'))['max_id'] or 0
+        cursor = MaterializedBalance.objects.aggregate(max_id=Max('last_entry_id'))['max_id'] or 0
+
+        applied = 0
+        while cursor < horizon:
+            upper = min(cursor + options['batch_size'], horizon)
+            applied += self.apply_range(cursor, upper)
+            cursor = upper
+        self.stdout.write(f"Учтено записей журнала: {applied}")
+
+        self.report_drift(horizon)
+
+    def apply_range(self, lower, upper):
+        """Добавляет к балансам суммы записей с id в (lower, upper]."""
+        totals = list(
+            LedgerEntry.objects.filter(id__gt=lower, id__lte=upper)
+            .values('user_id', 'currency')
+            .annotate(total=Sum('amount'))
+            .order_by()
+        )
+        if not totals:
+            # Курсор хранится в last_entry_id - двигаем его и для пустого диапазона
+            MaterializedBalance.objects.filter(last_entry_id=lower).update(last_entry_id=upper)
+            return 0
+
+        with transaction.atomic():
+            existing = {
+                (balance.user_id, balance.currency): balance
+                for balance in MaterializedBalance.objects.select_for_update().filter(
+                    user_id__in={row['user_id'] for row in totals}
+                )
+            }
+            to_create = []
+            for row in totals:
+                balance = existing.get((row['user_id'], row['currency']))
+                if balance is None:
+                    to_create.append(MaterializedBalance(
+                        user_id=row['user_id'], currency=row['currency'], balance=row['total'], last_entry_id=upper
+                    ))
+                else:
+                    balance.balance += row['total']
+            now = timezone.now()
+            for balance in existing.values():
+                balance.last_entry_id = upper
+                balance.updated_at = now
+            MaterializedBalance.objects.bulk_update(existing.values(), ['balance', 'last_entry_id', 'updated_at'])
+            MaterializedBalance.objects.bulk_create(to_create)
+            # Курсор - максимальный last_entry_id, фиксируем его на одной из записей
+            MaterializedBalance.objects.filter(last_entry_id=lower).update(last_entry_id=upper)
+
+        return LedgerEntry.objects.filter(id__gt=lower, id__lte=upper).count()
+
+    def report_drift(self, horizon):
+        """Сравнивает баланс по журналу с балансом пользователя (без пользователей с несведенными записями)."""
+        pending_users = LedgerEntry.objects.filter(id__gt=horizon).values('user_id')
+        drift = 0
+        for currency, field in BALANCE_FIELDS.items():
+            rows = MaterializedBalance.objects.filter(currency=currency).exclude(user_id__in=pending_users)
+            for user_id, balance, actual in rows.values_list('user_id', 'balance', f'user__{field}').iterator():
+                if balance != actual:
+                    drift += 1
+                    self.stdout.write(self.style.WARNING(
+                        f"Расхождение: user {user_id}, {currency}: по журналу {balance}, у пользователя {actual}"
+                    ))
+        # Ненулевой баланс без записей в журнале - opening_balance не создан
+        for currency, field in BALANCE_FIELDS.items():
+            missing = User.objects.exclude(**{field: 0}).exclude(
+                id__in=MaterializedBalance.objects.filter(currency=currency).values('user_id')
+            ).exclude(id__in=pending_users)
+            for user_id, actual in missing.values_list('id', field).iterator():
+                drift += 1
+                self.stdout.write(self.style.WARNING(
+                    f"Расхождение: user {user_id}, {currency}: в журнале нет записей, у пользователя {actual}"
+                ))
+        if drift:
+            self.stdout.write(self.style.ERROR(f"Найдено расхождений: {drift}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Балансы совпадают с журналом"))
+
+    def seed_opening_balances(self, batch_size):
+        """
+        Создает opening_balance = баланс пользователя - сумма его записей в журнале.
+        Записи, сделанные до запуска (журнал уже включен), учитываются. Строки
+        пользователей пачки блокируются: начисления пишут журнал в транзакции
+        UPDATE пользователя, поэтому баланс и сумма записей читаются согласованно.
+        """
+        curve = get_level_curve()
+        created = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                users = list(
+                    User.objects.select_for_update().filter(id__gt=last_id).order_by('id')
+                    .values_list('id', 'coins', 'level', 'experience', 'total_experience')[:batch_size]
+                )
+                if not users:
+                    return created
+                last_id = users[-1][0]
+                user_ids = [user[0] for user in users]
+                entries = LedgerEntry.objects.filter(user_id__in=user_ids)
+                seeded = set(entries.filter(source='opening_balance').values_list('user_id', 'currency'))
+                totals = {
+                    (row['user_id'], row['currency']): row['total']
+                    for row in entries.values('user_id', 'currency').annotate(total=Sum('amount')).order_by()
+                }
+                opening = []
+                for user_id, coins, level, experience, total_experience in users:
+                    targets = {
+                        'coins': coins,
+                        'experience': max(total_experience, curve.threshold(level) + experience),
+                    }
+                    for currency, target in targets.items():
+                        if (user_id, currency) in seeded:
+                            continue
+                        amount = target - totals.get((user_id, currency), 0)
+                        if amount:
+                            opening.append(LedgerEntry(
+                                user_id=user_id, currency=currency, amount=amount, source='opening_balance'
+                            ))
+                LedgerEntry.objects.bulk_create(opening)
+                created += len(opening)
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(choices=[('coins', 'Coins'), ('experience', 'Experience')], max_length=20, verbose_name='Валюта')),
+                ('amount', models.BigIntegerField(verbose_name='Сумма')),
+                ('source', models.CharField(choices=[('quest_reward', 'Quest Reward'), ('purchase', 'Purchase'), ('admin_grant', 'Admin Grant'), ('opening_balance', 'Opening Balance')], max_length=30, verbose_name='Источник')),
+                ('reference', models.CharField(blank=True, default='', help_text='Объект-основание, например quest:5 или shop_item:3', max_length=100, verbose_name='Ссылка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Запись журнала баланса',
+                'verbose_name_plural': 'Журнал баланса',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['user', 'currency', 'id'], name='wallet_ledg_user_id_e55775_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MaterializedBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(choices=[('coins', 'Coins'), ('experience', 'Experience')], max_length=20, verbose_name='Валюта')),
+                ('balance', models.BigIntegerField(default=0, verbose_name='Баланс по журналу')),
+                ('last_entry_id', models.BigIntegerField(default=0, verbose_name='Последняя учтенная запись')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='materialized_balances', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Баланс по журналу',
+                'verbose_name_plural': 'Балансы по журналу',
+                'constraints': [models.UniqueConstraint(fields=('user', 'currency'), name='wallet_materialized_balance_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+from django.db import models
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+CURRENCY_CHOICES = [
+    ('coins', 'Coins'),
+    ('experience', 'Experience'),
+]
+
+SOURCE_CHOICES = [
+    ('quest_reward', 'Quest Reward'),
+    ('purchase', 'Purchase'),
+    ('admin_grant', 'Admin Grant'),
+    ('opening_balance', 'Opening Balance'),
+]
+
+
+class LedgerEntry(models.Model):
+    """
+    Запись журнала изменений баланса (только добавление, записи не изменяются).
+    Положительная сумма - начисление, отрицательная - списание.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ledger_entries', verbose_name="Пользователь")
+    currency = models.CharField(max_length=20, choices=CURRENCY_CHOICES, verbose_name="Валюта")
+    amount = models.BigIntegerField(verbose_name="Сумма")
+    source = models.CharField(max_length=30, choices=SOURCE_CHOICES, verbose_name="Источник")
+    reference = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        verbose_name="Ссылка",
+        help_text="Объект-основание, например quest:5 или shop_item:3"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата")
+
+    class Meta:
+        verbose_name = "Запись журнала баланса"
+        verbose_name_plural = "Журнал баланса"
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['user', 'currency', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.amount:+} {self.currency} ({self.source})"
+
+
+class MaterializedBalance(models.Model):
+    """
+    Баланс, посчитанный по журналу периодической задачей (materialize_balances).
+    Используется для сверки с балансом пользователя.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='materialized_balances', verbose_name="Пользователь")
+    currency = models.CharField(max_length=20, choices=CURRENCY_CHOICES, verbose_name="Валюта")
+    balance = models.BigIntegerField(default=0, verbose_name="Баланс по журналу")
+    last_entry_id = models.BigIntegerField(default=0, verbose_name="Последняя учтенная запись")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    class Meta:
+        verbose_name = "Баланс по журналу"
+        verbose_name_plural = "Балансы по журналу"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'currency'], name='wallet_materialized_balance_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.balance} {self.currency}"
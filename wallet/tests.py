@@ -0,0 +1,40 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from wallet.ledger import credit_coins
+from wallet.models import LedgerEntry, MaterializedBalance
+
+User = get_user_model()
+
+
+def materialize(*args):
+    out = StringIO()
+    call_command('materialize_balances', '--lag-seconds=0', *args, stdout=out)
+    return out.getvalue()
+
+
+class SeedOpeningBalancesTests(TestCase):
+    """opening_balance учитывает записи, сделанные до запуска, и повторно не создается."""
+
+    def test_entries_written_before_seeding_are_subtracted(self):
+        user = User.objects.create_user(username='player', password='secret-password', coins=100)
+        credit_coins(user.id, 500, 'admin_grant')
+
+        output = materialize('--seed-opening-balances')
+        materialize('--seed-opening-balances')
+
+        opening = LedgerEntry.objects.filter(user=user, currency='coins', source='opening_balance')
+        self.assertEqual(list(opening.values_list('amount', flat=True)), [100])
+        self.assertEqual(MaterializedBalance.objects.get(user=user, currency='coins').balance, 600)
+        self.assertIn("Балансы совпадают с журналом", output)
+
+    def test_balance_without_entries_is_reported(self):
+        User.objects.create_user(username='player', password='secret-password', coins=100)
+
+        output = materialize()
+
+        self.assertIn("в журнале нет записей", output)
+        self.assertIn("Найдено расхождений", output)